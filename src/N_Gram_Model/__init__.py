@@ -1,5 +1,25 @@
 from .get_sentences import Get_Sentences
 
+from .tokenized_file_cache import Tokenized_File_Cache
+
+from .user_sentences import User_Sentences
+
+from .vocabulary import Vocabulary
+
 from .trigram_model import Trigram_Model
 
-from .linear_interpolation import Calculate_Linear_Interpolation
\ No newline at end of file
+from .file_counts import count_file
+
+from .successor_index import Successor_Index
+
+from .prefix_index import Prefix_Index
+
+from .sorted_array_model import Sorted_Array_Model
+
+from .n_gram_store import N_Gram_Store, N_Gram_Store_Model
+
+from .lazy_trigram_models import Lazy_Trigram_Models
+
+from .linear_interpolation import Calculate_Linear_Interpolation
+
+from .top_words_table import Top_Words_Table
\ No newline at end of file
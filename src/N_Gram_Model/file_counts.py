@@ -0,0 +1,39 @@
+'''
+Counts the n-grams of one corpus file in a worker process. Every file is counted with its own Vocabulary, so the files can be counted at the same time.
+The counts are returned with the words of the file's vocabulary, and Trigram_Model.add_file_counts() changes the word IDs to the IDs of the model's vocabulary.
+file_counts example = (
+                        ["<*>", "<STOP>", "This", "is"],                        words, where the index is the word ID in this file
+                        {"This": 1, "is": 1, "<STOP>": 1},                      unigram counts
+                        [bigram keys], [bigram counts],
+                        [trigram keys], [trigram counts],
+                        3                                                       all words count
+                      )
+'''
+
+import numpy as np
+
+from .get_sentences import Get_Sentences
+
+from .tokenized_file_cache import Tokenized_File_Cache
+
+from .trigram_model import Trigram_Model
+
+def count_file(file_path, start_symbol="<*>", end_symbol="<STOP>", token_cache_folder=None):
+    """
+    Takes the path to a corpus file. Returns the n-gram counts of the file.
+    If token_cache_folder is given, the sentences are read from the Tokenized_File_Cache in that folder, or saved to it if the file wasn't tokenized before.
+    Must be a module function so it can be sent to a worker process.
+    """
+    file_cache = Tokenized_File_Cache(token_cache_folder) if token_cache_folder is not None else None
+    
+    file_model = Trigram_Model(model_name=file_path, start_symbol=start_symbol, end_symbol=end_symbol)
+    file_model.add_sentences_to_model(Get_Sentences(end_symbol, file_cache=file_cache).iter_sentences(file_path))
+    
+    # The keys and counts are sent as NumPy arrays because they are much faster to send between processes than dicts
+    bigram_keys = np.fromiter(file_model.bigram_count.keys(), dtype=np.int64, count=len(file_model.bigram_count))
+    bigram_counts = np.fromiter(file_model.bigram_count.values(), dtype=np.int64, count=len(file_model.bigram_count))
+    
+    trigram_keys = np.fromiter(file_model.trigram_count.keys(), dtype=np.int64, count=len(file_model.trigram_count))
+    trigram_counts = np.fromiter(file_model.trigram_count.values(), dtype=np.int64, count=len(file_model.trigram_count))
+    
+    return file_model.vocabulary.words, file_model.unigram_count, bigram_keys, bigram_counts, trigram_keys, trigram_counts, file_model.all_words_count
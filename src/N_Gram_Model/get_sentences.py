@@ -5,19 +5,45 @@ self.sentence example = [
                             ["This", "is", "one", "sentence"],
                             ["This", "is" "another", "sentence"]
                         ]
+iter_sentences() yields the same sentences one at a time while the file is read, so only one sentence is kept in memory.
+With fast_tokenizer the file is read in blocks and every different token is only finalized once. The finalized word and sentence end of a token are kept in self.token_cache.
+self.token_cache example = {"virus.": ("virus", True), "(WHO)": ("WHO", False), "2020": ("", False)}
+With a Tokenized_File_Cache the sentences of a file that was already tokenized with the same special words are read from the cache instead.
 '''
 
+from hashlib import sha256
+
+from instrumentation import metrics
+
+# Number of characters read from the file at a time by the fast tokenizer
+BLOCK_SIZE = 1 << 20
+
+# Max number of different tokens in the token cache. The cache is cleared when it's full.
+MAX_CACHED_TOKENS = 1 << 20
+
+# Change when the tokenizer gives different words for the same file, so the files tokenized by the old tokenizer aren't read from a Tokenized_File_Cache
+TOKENIZER_VERSION = 1
+
 class Get_Sentences:
-    def __init__(self, END_SYMBOL) -> None:
+    def __init__(self, END_SYMBOL, fast_tokenizer=True, file_cache=None) -> None:
         self.END_SYMBOL = END_SYMBOL
         
+        # If True files are read in blocks and the tokens are finalized with self.token_cache. The sentences are the same either way.
+        self.fast_tokenizer = fast_tokenizer
+        
+        # Tokenized_File_Cache with the sentences of the files that were already tokenized. None means every file is tokenized.
+        self.file_cache = file_cache
+        
+        # Keys are tokens from the file and values are (finalized word, sentence end). Skipped tokens have an empty word.
+        self.token_cache = dict()
+        
         # 2d list with all the sentences and words for the current document.
         self.sentences = list()
         
         self.current_file_path = None
         
-        # List of completed files for the current document. If there are multiple same files in one document skips the duplicate files
-        self.completed_files = dict()
+        # Paths of the completed files for the current document. If there are multiple same files in one document skips the duplicate files
+        self.completed_files = set()
         
         # Special words that we change manually. 
         self.special_words = dict()
@@ -30,19 +56,160 @@ class Get_Sentences:
         # Checks if it's a valid file
         if not self.check_file_path: return []
         
+        # Get all sentences and words and return the sentences
+        self.sentences = list(self.iter_sentences(file_path))
+        
+        return self.sentences
+    
+    def iter_sentences(self, file_path):
+        '''
+        Yields every sentence found in the file from "file_path" path while the file is read. Every sentence is a list of words.
+        Doesn't yield anything if the file was already included.
+        '''
         # Check if we already included this file
         if file_path in self.completed_files: 
             print(f'\n\t"{file_path}" file already included. Skiping.\n')
-            return self.completed_files[file_path]
+            return
         
-        self.sentences = []
+        self.completed_files.add(file_path)
         self.current_file_path = file_path
         
-        # Get all sentences and words and return the sentences
-        self.sentences_from_file()
+        if self.file_cache is not None:
+            yield from self.iter_sentences_from_file_cache()
+            return
         
-        self.completed_files[file_path] = self.sentences
-        return self.sentences
+        yield from self.iter_tokenized_sentences()
+    
+    def iter_sentences_from_file_cache(self):
+        '''
+        Same as iter_sentences() but reads the sentences of self.current_file_path from self.file_cache. If they aren't in the cache the file is tokenized and saved to the cache.
+        '''
+        cache_path = self.file_cache.get_cache_path(self.current_file_path, self.get_tokenizer_key())
+        
+        all_sentences = self.file_cache.get_sentences(cache_path, self.END_SYMBOL)
+        if all_sentences is not None:
+            metrics.add('file_cache_hits')
+            yield from all_sentences
+            return
+        
+        metrics.add('file_cache_misses')
+        yield from self.file_cache.iter_and_save_sentences(cache_path, self.iter_tokenized_sentences())
+    
+    def iter_tokenized_sentences(self):
+        '''
+        Yields every sentence of self.current_file_path while the file is read and tokenized.
+        '''
+        metrics.add('files_read')
+        
+        if self.fast_tokenizer:
+            all_sentences = self.iter_sentences_from_blocks()
+        else:
+            all_sentences = self.iter_sentences_from_lines()
+        
+        yield from metrics.time_iterator('tokenize', all_sentences)
+    
+    def iter_sentences_from_lines(self):
+        '''
+        Same as iter_sentences() but reads self.current_file_path one line at a time and finalizes every word.
+        '''
+        sentence = []
+        with open(self.current_file_path, errors="ignore") as file:
+            for line in file:
+                for word in line.split():
+                    if not self.add_word(sentence, word) or not sentence: continue
+                    
+                    sentence.append(self.END_SYMBOL)
+                    yield sentence
+                    
+                    sentence = []
+        
+        # If the last sentence of file doesn't end with '.' or ';', we still add the last sentence.
+        if sentence:
+            sentence.append(self.END_SYMBOL)
+            yield sentence
+    
+    def iter_sentences_from_blocks(self):
+        '''
+        Same as iter_sentences() but reads self.current_file_path in blocks of BLOCK_SIZE characters and uses the token cache.
+        '''
+        token_cache = self.token_cache
+        END_SYMBOL = self.END_SYMBOL
+        
+        sentence = []
+        for word in self.iter_tokens():
+            token = token_cache.get(word)
+            
+            if token is None:
+                token = self.cache_token(word)
+            
+            finalized_word, sentence_end = token
+            
+            if finalized_word:
+                sentence.append(finalized_word)
+            
+            if sentence_end and sentence:
+                sentence.append(END_SYMBOL)
+                yield sentence
+                
+                sentence = []
+        
+        # If the last sentence of file doesn't end with '.' or ';', we still add the last sentence.
+        if sentence:
+            sentence.append(END_SYMBOL)
+            yield sentence
+    
+    def iter_tokens(self):
+        '''
+        Yields every token of self.current_file_path, the same as calling split() on every line. A token cut at the end of a block is joined with the next block.
+        '''
+        rest = ''
+        with open(self.current_file_path, errors="ignore") as file:
+            while True:
+                with metrics.timer('file_read'):
+                    block = file.read(BLOCK_SIZE)
+                
+                if not block: break
+                
+                metrics.add('characters_read', len(block))
+                
+                block = rest + block
+                tokens = block.split()
+                
+                # The last token might continue in the next block
+                if tokens and not block[-1].isspace():
+                    rest = tokens.pop()
+                else:
+                    rest = ''
+                
+                yield from tokens
+        
+        if rest: yield rest
+    
+    def cache_token(self, word):
+        '''
+        Finalizes the token the same way as add_word() and adds it to the token cache. Returns (finalized word, sentence end).
+        '''
+        if len(self.token_cache) >= MAX_CACHED_TOKENS:
+            self.token_cache.clear()
+        
+        if not word or word == "<p>" or not word[0].isalpha():
+            token = ('', False)
+        elif word.isalpha():
+            token = (self.check_finalized_word(word), False)
+        else:
+            token = self.get_finalized_word(word)
+        
+        self.token_cache[word] = token
+        
+        return token
+    
+    def get_tokenizer_key(self):
+        '''
+        Returns a hash of everything that changes the words of a tokenized file: TOKENIZER_VERSION and the special words.
+        '''
+        tokenizer_config = repr((TOKENIZER_VERSION, sorted(self.special_words.items())))
+        
+        return sha256(tokenizer_config.encode('utf-8')).hexdigest()[:16]
     
     def check_file_path(self):
         """
@@ -60,16 +227,6 @@ class Get_Sentences:
         
         return True
     
-    def sentences_from_file(self):        
-        sentence = []
-        with open(self.current_file_path, errors="ignore") as file:
-            for line in file:
-                for word in line.split():
-                    self.add_and_check_word(sentence, word)
-                    
-        # If the last sentence of file doesn't end with '.' or ';', we still add the last sentence.
-        if sentence: self.is_sentence_end(sentence)
-    
     def sentences_from_user(self, user_sentence):
         """
         Works with the sentence from the user during auto-complete
@@ -87,16 +244,22 @@ class Get_Sentences:
         '''
         Adds the finalized word to the sentence. Also checks if it's the end of the sentence and appends the sentence to self.sentences
         '''
+        if self.add_word(sentence, word):
+            self.is_sentence_end(sentence)
+    
+    def add_word(self, sentence, word):
+        '''
+        Adds the finalized word to the sentence. Returns True if the word ends the sentence.
+        '''
         if not word or word == "<p>" or not word[0].isalpha():
-            return
+            return False
         
         word, sentence_end = self.get_finalized_word(word)
                         
         if word:
             sentence.append(word)
         
-        if sentence_end:
-            self.is_sentence_end(sentence)
+        return sentence_end
     
     def get_finalized_word(self, word):
         """
@@ -142,6 +305,9 @@ class Get_Sentences:
         
         if special_word and word:
             self.special_words[special_word] = word
+            
+            # The cached tokens might use the old special words
+            self.token_cache.clear()
     
     def check_finalized_word(self, word):
         if word in self.special_words:
@@ -0,0 +1,114 @@
+'''
+Dict-like container of trigram models that only loads a model from its file the first time it's used.
+The pinned models (like "ALL") are always kept in memory. The other models are kept in least recently used order and the oldest model is removed when there are more than max_loaded_models.
+A removed model is loaded again from its file the next time it's used.
+Can be used by many threads. Getting a model that is already loaded doesn't take the lock, only loading and removing models do.
+self.model_paths example = {
+                             "ALL": ("model/all_trigram_models/ALL.bin", "model/all_trigram_models/ALL.top_words"),
+                             "Coronavirus": ("model/all_trigram_models/Coronavirus.bin", None)
+                           }
+'''
+
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from threading import Lock
+
+from instrumentation import metrics
+
+class Lazy_Trigram_Models(MutableMapping):
+    def __init__(self, model_paths, load_model, pinned_models=(), max_loaded_models=None) -> None:
+        # Keys are model names and values are (model file path, top words table file path or None)
+        self.model_paths = dict(model_paths)
+        
+        # Function that takes (model file path, top words table file path) and returns the loaded model
+        self.load_model = load_model
+        
+        # Names of the models that are never removed from memory
+        self.pinned_models = set(pinned_models)
+        
+        # Max number of models that aren't pinned that can be in memory at the same time. None means no limit.
+        self.max_loaded_models = max_loaded_models
+        
+        # Keys are model names and values are the loaded models. The most recently used model is last.
+        self.loaded_models = OrderedDict()
+        
+        # Only one thread at a time loads or removes models
+        self.lock = Lock()
+        
+        # Load the pinned models up front
+        for model_name in self.pinned_models:
+            if model_name in self.model_paths:
+                self[model_name]
+    
+    def __getitem__(self, model_name):
+        model = self.loaded_models.get(model_name)
+        if model is not None:
+            try:
+                self.loaded_models.move_to_end(model_name)
+            except KeyError:
+                # Another thread removed the model from memory, this thread can still use it
+                pass
+            
+            return model
+        
+        with self.lock:
+            # Another thread may have loaded the model while this thread was waiting
+            model = self.loaded_models.get(model_name)
+            if model is not None: return model
+            
+            if model_name not in self.model_paths:
+                raise KeyError(model_name)
+            
+            model = self.load_model(*self.model_paths[model_name])
+            
+            self.loaded_models[model_name] = model
+            self.evict_models()
+        
+        return model
+    
+    def __setitem__(self, model_name, model):
+        """
+        Adds a model that is already in memory. Models without a file are pinned because they can't be loaded again.
+        """
+        with self.lock:
+            if model_name not in self.model_paths:
+                self.model_paths[model_name] = (None, None)
+                self.pinned_models.add(model_name)
+            
+            self.loaded_models[model_name] = model
+            self.loaded_models.move_to_end(model_name)
+            self.evict_models()
+    
+    def __delitem__(self, model_name):
+        with self.lock:
+            del self.model_paths[model_name]
+            
+            self.loaded_models.pop(model_name, None)
+            self.pinned_models.discard(model_name)
+    
+    def __iter__(self):
+        # Iterate over a copy so models can be loaded or removed while iterating
+        return iter(list(self.model_paths))
+    
+    def __len__(self):
+        return len(self.model_paths)
+    
+    def __contains__(self, model_name):
+        return model_name in self.model_paths
+    
+    def is_loaded(self, model_name):
+        return model_name in self.loaded_models
+    
+    def evict_models(self):
+        """
+        Removes the least recently used models that aren't pinned until there are at most max_loaded_models of them in memory.
+        Called with the lock held. Every removed model is counted in the "models_evicted" metric instead of printed, so batch runs and the server don't write a line per eviction.
+        """
+        if self.max_loaded_models is None: return
+        
+        # Copy the names first because other threads can move the models they use to the end
+        unpinned_models = [model_name for model_name in list(self.loaded_models) if model_name not in self.pinned_models]
+        
+        for model_name in unpinned_models[:max(len(unpinned_models) - self.max_loaded_models, 0)]:
+            self.loaded_models.pop(model_name, None)
+            metrics.add('models_evicted')
@@ -1,63 +1,202 @@
 '''
 Take a trigram model and total words counts.
 For any given 2 words, stores the probabilities of the 3rd word in a max heap. 
+The bigram and trigram keys are packed with the Vocabulary of the trigram model. Without a vocabulary, one is built from the words of the unigram and the 'word word' keys of the bigram and trigram are packed with it.
+get_top_words() keeps its heap in local variables and only reads the model, so one Calculate_Linear_Interpolation can be used by many threads at the same time.
 '''
 
 from heapq import heappop, heappush, heapify
+from math import exp, inf, log
+
+import numpy as np
+
+from instrumentation import metrics
+
+from .vocabulary import ID_BITS, Vocabulary
+
+from .sorted_array_model import Word_Count_Array
 
 class Calculate_Linear_Interpolation:
-    def __init__(self, unigram, bigram, trigram, words_count, END_SYMBOL="<STOP>", START_SYMBOL='<*>') -> None:
+    def __init__(self, unigram, bigram, trigram, words_count, END_SYMBOL="<STOP>", START_SYMBOL='<*>', successor_index=None, top_words_table=None, prefix_index=None, UNKNOWN_SYMBOL='<UNK>', vocabulary=None) -> None:
+        # Without the Vocabulary of the trigram model the counts are from a caller that doesn't pack the keys
+        if vocabulary is None:
+            vocabulary, bigram, trigram = self.vocabulary_from_counts(unigram, bigram, trigram)
+        
         # Class variables
         self.unigram = unigram
         self.bigram = bigram
         self.trigram = trigram
         self.words_count = words_count
+        self.vocabulary = vocabulary
         self.end_symbol = END_SYMBOL
         self.start_symbol = START_SYMBOL
         
+        # Word that replaces the pruned words. Like the END_SYMBOL and START_SYMBOL, it's never shown as a next word.
+        self.unknown_symbol = UNKNOWN_SYMBOL
+        
+        # Weights of the trigram, bigram, and unigram estimates
+        self.lambda_1 = 0.8
+        self.lambda_2 = 0.15
+        self.lambda_3 = 0.05
+        
+        # Successor_Index of the trigram model. If it's None, predict_next_words goes through all the words in the unigram.
+        self.successor_index = successor_index
+        
+        # Top_Words_Table with the precomputed top words. If it's None, show_next_word always calculates the probabilities.
+        self.top_words_table = top_words_table
+        
+        # Prefix_Index of the trigram model. If it's None, get_top_words_with_prefix goes through all the words in the unigram.
+        self.prefix_index = prefix_index
+        
         self.words = None
         self.heap = None
     
+    def vocabulary_from_counts(self, unigram, bigram, trigram):
+        '''
+        Returns a new Vocabulary with all the words in the unigram, and the bigram and trigram with packed keys.
+        The bigram and trigram are only copied when their keys are 'word word' strings, packed keys are used as they are. Only the first key is checked, the keys of one dict all have the same type.
+        '''
+        vocabulary = Vocabulary()
+        
+        for word in unigram:
+            vocabulary.add_word(word)
+        
+        if isinstance(next(iter(bigram), None), str):
+            bigram = {vocabulary.key_from_words(key.split(' ')): count for key, count in bigram.items()}
+        
+        if isinstance(next(iter(trigram), None), str):
+            trigram = {vocabulary.key_from_words(key.split(' ')): count for key, count in trigram.items()}
+        
+        return vocabulary, bigram, trigram
+    
     def probability(self, word, word2, word1):
         '''
         Return the probability of q(word|word2, word1)
         Return the probability of "word2 word1 word" apperaing in a sentence
         '''
-        lambda_1 = 0.8
-        lambda_2 = 0.15
-        lambda_3 = 0.05
+        vocabulary = self.vocabulary
+        
+        return self.probability_of_ids(vocabulary.get_id(word), vocabulary.get_id(word2), vocabulary.get_id(word1))
+    
+    def probability_of_ids(self, word_id, word2_id, word1_id):
+        '''
+        Return the probability of q(word|word2, word1) where all the words are given as their vocabulary IDs.
+        A word ID is None when the word isn't in the vocabulary.
+        '''
+        # Linear Interpolation:
+        probability = self.trigram_likelihood(word_id, word2_id, word1_id) + self.bigram_likelihood(word_id, word1_id) + self.unigram_likelihood(word_id)
         
-        # Trigram maximum-likelihood estimate:
-        trigram_numerator_key = f'{word2} {word1} {word}'
-        trigram_denominator_key = f'{word2} {word1}'
+        return probability
+    
+    def trigram_likelihood(self, word_id, word2_id, word1_id):
+        '''
+        Return the trigram maximum-likelihood estimate of "word2 word1 word" multiplied by lambda_1
+        '''
+        if word_id is None or word2_id is None or word1_id is None:
+            return 0
+        
+        trigram_denominator_key = (word2_id << ID_BITS) | word1_id
+        trigram_numerator_key = (trigram_denominator_key << ID_BITS) | word_id
         numerator = self.trigram.get(trigram_numerator_key, 0)
         denominator = self.bigram.get(trigram_denominator_key, 0)
         if numerator == 0 or denominator == 0: 
-            trigram_likelihood = 0
-        else:
-            trigram_likelihood = lambda_1 * (numerator / denominator)
+            return 0
+        
+        return self.lambda_1 * (numerator / denominator)
+    
+    def bigram_likelihood(self, word_id, word1_id):
+        '''
+        Return the bigram maximum-likelihood estimate of "word1 word" multiplied by lambda_2
+        '''
+        if word_id is None or word1_id is None:
+            return 0
         
-        # Bigram maximum-likelihood estimate:
-        bigram_numerator_key = f'{word1} {word}'
+        bigram_numerator_key = (word1_id << ID_BITS) | word_id
         numerator = self.bigram.get(bigram_numerator_key, 0)
-        denominator = self.unigram.get(word1, 0)
+        denominator = self.unigram.get(self.vocabulary.words[word1_id], 0)
         if numerator == 0 or denominator == 0: 
-            bigram_likelihood = 0
-        else:
-            bigram_likelihood = lambda_2 * (numerator / denominator)
+            return 0
+        
+        return self.lambda_2 * (numerator / denominator)
+    
+    def unigram_likelihood(self, word_id):
+        '''
+        Return the unigram maximum-likelihood estimate of "word" multiplied by lambda_3
+        '''
+        if word_id is None:
+            return 0
         
-        # Unigram maximum-likehood estimate:
-        numerator = self.unigram.get(word, 0)
+        numerator = self.unigram.get(self.vocabulary.words[word_id], 0)
         denominator = self.words_count
         if numerator == 0 or denominator == 0: 
-            unigram_likelihood = 0
-        else:
-            unigram_likelihood = lambda_3 * (numerator / denominator)
+            return 0
         
-        # Linear Interpolation:
-        probability = trigram_likelihood + bigram_likelihood + unigram_likelihood
+        return self.lambda_3 * (numerator / denominator)
+    
+    def perplexity(self, sentences, unknown_word=None):
+        '''
+        Takes a 2d list of sentences and their words, with the END_SYMBOL at the end of every sentence. Returns the perplexity of the model on the sentences.
+        If unknown_word is given, the words that aren't in the unigram are replaced with it, like in a pruned model. Returns inf if a word has a probability of 0.
+        '''
+        log_probability = 0
+        words_count = 0
         
-        return probability
+        for sentence in sentences:
+            word2 = self.start_symbol
+            word1 = self.start_symbol
+            
+            for word in sentence:
+                if unknown_word is not None and word not in self.unigram:
+                    word = unknown_word
+                
+                probability = self.probability(word, word2, word1)
+                if probability <= 0:
+                    return inf
+                
+                log_probability += log(probability)
+                words_count += 1
+                
+                word2 = word1
+                word1 = word
+        
+        if words_count == 0:
+            return inf
+        
+        return exp(-log_probability / words_count)
+    
+    def probabilities_of_ids(self, all_word_ids, word2_id, word1_id):
+        '''
+        Returns a list with the probability of q(word|word2, word1) for every word ID in all_word_ids.
+        The counts of a Sorted_Array_Model are looked up for all the words at once, with the same calculation as probability_of_ids.
+        '''
+        if not isinstance(self.unigram, Word_Count_Array) or not all_word_ids:
+            return [self.probability_of_ids(word_id, word2_id, word1_id) for word_id in all_word_ids]
+        
+        word_ids = np.array(all_word_ids, dtype=np.int64)
+        
+        trigram_likelihoods = 0
+        if word2_id is not None and word1_id is not None:
+            trigram_denominator_key = (word2_id << ID_BITS) | word1_id
+            denominator = self.bigram.get(trigram_denominator_key, 0)
+            
+            if denominator != 0:
+                numerators = self.trigram.get_many((trigram_denominator_key << ID_BITS) | word_ids)
+                trigram_likelihoods = np.where(numerators != 0, self.lambda_1 * (numerators / denominator), 0)
+        
+        bigram_likelihoods = 0
+        if word1_id is not None:
+            denominator = self.unigram.get(self.vocabulary.words[word1_id], 0)
+            
+            if denominator != 0:
+                numerators = self.bigram.get_many((word1_id << ID_BITS) | word_ids)
+                bigram_likelihoods = np.where(numerators != 0, self.lambda_2 * (numerators / denominator), 0)
+        
+        unigram_likelihoods = 0
+        if self.words_count != 0:
+            numerators = self.unigram.id_counts.get_many(word_ids)
+            unigram_likelihoods = np.where(numerators != 0, self.lambda_3 * (numerators / self.words_count), 0)
+        
+        return (trigram_likelihoods + bigram_likelihoods + unigram_likelihoods + np.zeros(len(word_ids))).tolist()
     
     def show_next_word(self, name, show_top, word1, word2):
         '''
@@ -66,28 +205,104 @@ class Calculate_Linear_Interpolation:
         
         print(f'\n\tUsing "{name}" trigram model for this linear interpolation')
         
-        self.predict_next_words(word1, word2)
+        top_words = self.get_top_words(show_top, word1, word2)
         
-        self.print_word_and_probability(show_top, word1, word2)
+        if top_words:
+            self.print_top_words(top_words, word1, word2)
     
-    def predict_next_words(self, word2, word1):
+    def get_top_words(self, show_top, word2, word1):
+        '''
+        Given 2 words, returns a list of (word, probability) with the "show_top" most likely next words, from the highest to the lowest probability.
+        '''
+        # Use the precomputed top words if this context was compiled. Otherwise calculate the probabilities.
+        top_words = None
+        if self.top_words_table is not None:
+            top_words = self.top_words_table.get_top_words(word2, word1, show_top)
+        
+        metrics.add('top_words_table_misses' if top_words is None else 'top_words_table_hits')
+        
+        if top_words is None:
+            heap, words = self.score_next_words(word2, word1, show_top)
+            
+            top_words = self.get_next_words(show_top, heap, words)
+        
+        return top_words
+    
+    def predict_next_words(self, word2, word1, show_top=None):
         """
         Goes through all the words in the unigram and calculates the probability of that word appearing after "word2 word1". 
         Stores the probability of the words appearing in a max heap.
         Uses the self.words dict() to store the probability as it's keys and a list of word with that probability for it's values.
+        
+        If there is a successor_index and show_top is given, only goes through the words seen after "word2 word1" or "word1" and the words with the highest unigram count. The top "show_top" words are the same as going through all the words.
+        """
+        self.heap, self.words = self.score_next_words(word2, word1, show_top)
+    
+    def score_next_words(self, word2, word1, show_top=None):
+        """
+        Same as predict_next_words, but returns the (heap, words) instead of storing them in self.heap and self.words, so it's safe to call from many threads.
         """
-        self.words = {}
-        self.heap = []
-        heapify(self.heap)
+        vocabulary = self.vocabulary
+        word2_id = vocabulary.get_id(word2)
+        word1_id = vocabulary.get_id(word1)
         
-        for key in self.unigram:
-            probability = self.probability(key, word2, word1)
-            
-            heappush(self.heap, -1 * probability)
-            if probability in self.words:
-                self.words[probability].append(key)
-            else:
-                self.words[probability] = [key]
+        if self.successor_index is None or show_top is None:
+            all_word_ids = [vocabulary.word_ids[key] for key in self.unigram]
+        else:
+            all_word_ids = self.successor_index.get_candidate_ids(word2_id, word1_id, show_top)
+        
+        return self.score_word_ids(all_word_ids, word2_id, word1_id)
+    
+    def get_top_words_with_prefix(self, show_top, word2, word1, prefix):
+        """
+        Given 2 words and the start of the next word, returns a list of (word, probability) with the "show_top" most likely next words that start with the prefix, from the highest to the lowest probability.
+        If there is a prefix_index, only goes through the words that start with the prefix and can be in the top words.
+        """
+        # Every word starts with an empty prefix
+        if not prefix:
+            return self.get_top_words(show_top, word2, word1)
+        
+        vocabulary = self.vocabulary
+        word2_id = vocabulary.get_id(word2)
+        word1_id = vocabulary.get_id(word1)
+        
+        if self.prefix_index is None:
+            all_word_ids = [vocabulary.word_ids[key] for key in self.unigram if key.startswith(prefix)]
+        else:
+            all_word_ids = self.prefix_index.get_candidate_ids(prefix, word2_id, word1_id, show_top)
+        
+        metrics.add('prefix_completions')
+        
+        heap, words = self.score_word_ids(all_word_ids, word2_id, word1_id)
+        
+        return self.get_next_words(show_top, heap, words)
+    
+    def score_word_ids(self, all_word_ids, word2_id, word1_id):
+        """
+        Calculates the probability of every word ID appearing after "word2 word1". Returns the max heap of the probabilities and a dict() where keys are probabilities and values are the list of words with that probability.
+        """
+        words = {}
+        heap = []
+        heapify(heap)
+        
+        vocabulary = self.vocabulary
+        
+        with metrics.timer('interpolation'):
+            for word_id, probability in zip(all_word_ids, self.probabilities_of_ids(all_word_ids, word2_id, word1_id)):
+                key = vocabulary.words[word_id]
+                
+                heappush(heap, -1 * probability)
+                if probability in words:
+                    words[probability].append(key)
+                else:
+                    words[probability] = [key]
+        
+        if metrics.enabled:
+            metrics.add('predictions')
+            metrics.observe('interpolation_candidates', len(all_word_ids))
+            metrics.observe('interpolation_heap_size', len(heap))
+        
+        return heap, words
     
     def print_word_and_probability(self, show_top, word1, word2):
         """
@@ -95,27 +310,51 @@ class Calculate_Linear_Interpolation:
         """
         if not self.heap or not self.words: return
         
+        self.print_top_words(self.get_next_words(show_top), word1, word2)
+    
+    def print_top_words(self, top_words, word1, word2):
+        """
+        Takes a list of (word, probability) and prints the word and the probability.
+        """
         print(f'\n\tThe next word after: "{word1} {word2} ()" is:')
         
-        while self.heap:
+        for word, p in top_words:
+            p = round(p, 4)
+            print(f'\t\t"{word1} {word2} ({word})", with probability: {p*100}%\n')
+    
+    def get_next_words(self, show_top, heap=None, words=None):
+        """
+        Returns a list of (word, probability) with the "show_top" highest probabilities after predict_next_words. 
+        Uses the heap and words from score_next_words if they are given.
+        """
+        if heap is None:
+            heap, words = self.heap, self.words
+        
+        top_words = []
+        
+        while heap:
             if show_top == 0: break
             
-            p, word = self.get_highest_probabilities()
-            p = round(p, 4)
+            p, word = self.get_highest_probabilities(heap, words)
             
-            # We don't want to show the END_SYMBOL or START_SYMBOL, this way it will always suggest a word
-            if word != self.end_symbol and word != self.start_symbol:
-                print(f'\t\t"{word1} {word2} ({word})", with probability: {p*100}%\n')
+            # We don't want to show the END_SYMBOL, START_SYMBOL, or UNKNOWN_SYMBOL, this way it will always suggest a word
+            if word != self.end_symbol and word != self.start_symbol and word != self.unknown_symbol:
+                top_words.append((word, p))
                 show_top -= 1
+        
+        return top_words
     
-    def get_highest_probabilities(self):
+    def get_highest_probabilities(self, heap=None, words=None):
         """
         Returns the word and probability with the highest probability.
-        Removes those words and probability from the heap and self.words values.
+        Removes those words and probability from the heap and self.words values, or from the given heap and words.
         """
-        probability = -1 * heappop(self.heap)
+        if heap is None:
+            heap, words = self.heap, self.words
+        
+        probability = -1 * heappop(heap)
         
-        words_list = self.words[probability]
+        words_list = words[probability]
         word = words_list.pop()
          
         return probability, word
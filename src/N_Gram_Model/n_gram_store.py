@@ -0,0 +1,254 @@
+'''
+One table with the n-grams of all the documents, instead of a Trigram_Model for every document and a copy of all their counts in the "ALL" model.
+Every n-gram order has one N_Gram_Table: the sorted packed keys of every n-gram seen in any document, a total column with the counts of all the documents (the "ALL" model), and a sparse column for every document with only the rows of its n-grams.
+self.bigram_table example = N_Gram_Table(
+                                keys = [packed IDs of "This is", packed IDs of "is one", packed IDs of "is another"],
+                                total = [2, 1, 1],
+                                columns = {"Document 1": ([0, 1], [1, 1]), "Document 2": ([0, 2], [1, 1])}      rows and counts
+                            )
+Every document model and the "ALL" model is a read-only N_Gram_Store_Model, a Sorted_Array_Model whose counts are views of the table. The "ALL" model uses the keys and the total column directly.
+The store is built from the finished document models with NumPy, so the counts of the documents are never merged one n-gram at a time.
+'''
+
+import numpy as np
+
+from .sorted_array_model import Sorted_Array_Model, Sorted_Count_Array, Word_Count_Array
+
+class Count_Column:
+    def __init__(self, table_keys, rows, counts) -> None:
+        """
+        Takes the sorted keys of the table, the sorted rows of the keys that are in this column and a parallel array of counts.
+        Can be used the same way as a Sorted_Count_Array, but the keys are only stored once in the table.
+        """
+        self.table_keys = table_keys
+        self.rows = rows
+        self.counts = counts
+    
+    @property
+    def keys(self):
+        """
+        Sorted keys of this column. They are copied from the table every time, so it's only used to save or copy the counts.
+        """
+        return self.table_keys[self.rows]
+    
+    def __len__(self):
+        return len(self.rows)
+    
+    def __iter__(self):
+        return iter(self.keys.tolist())
+    
+    def __contains__(self, key):
+        return self.find(key) is not None
+    
+    def find(self, key):
+        """
+        Returns the index of the key in this column. Returns None if the key isn't found.
+        """
+        row = int(np.searchsorted(self.table_keys, key))
+        if row == len(self.table_keys) or self.table_keys[row] != key: return None
+        
+        index = int(np.searchsorted(self.rows, row))
+        if index == len(self.rows) or self.rows[index] != row: return None
+        
+        return index
+    
+    def get(self, key, default=0):
+        index = self.find(key)
+        
+        if index is None:
+            return default
+        
+        return int(self.counts[index])
+    
+    def get_many(self, keys):
+        """
+        Takes an array of keys. Returns an array with the count of every key, where the keys that aren't found have a count of 0.
+        """
+        if len(self.rows) == 0:
+            return np.zeros(len(keys), dtype=np.int64)
+        
+        rows = np.minimum(np.searchsorted(self.table_keys, keys), len(self.table_keys) - 1)
+        indexes = np.minimum(np.searchsorted(self.rows, rows), len(self.rows) - 1)
+        
+        found = (self.table_keys[rows] == keys) & (self.rows[indexes] == rows)
+        
+        return np.where(found, self.counts[indexes], 0)
+    
+    def items(self):
+        return zip(self.keys.tolist(), self.counts.tolist())
+    
+    def get_range(self, first_key, last_key):
+        """
+        Returns the keys that are >= first_key and < last_key.
+        """
+        first_row, last_row = np.searchsorted(self.table_keys, (first_key, last_key))
+        start, end = np.searchsorted(self.rows, (first_row, last_row))
+        
+        return self.table_keys[self.rows[start:end]]
+
+class Word_Count_Column(Word_Count_Array):
+    def __init__(self, vocabulary, word_ids, id_counts) -> None:
+        """
+        Same as Word_Count_Array but takes the counts of the word IDs as a Count_Column or Sorted_Count_Array of the table, so they aren't copied.
+        """
+        self.vocabulary = vocabulary
+        
+        # Word IDs in the same order as the unigram of the Trigram_Model. Used to go through the words in the same order.
+        self.word_ids = word_ids
+        
+        self.id_counts = id_counts
+
+class N_Gram_Table:
+    def __init__(self, all_keys, all_counts, column_names) -> None:
+        """
+        Takes a list with the keys of every column, a parallel list with their counts, and the names of the columns.
+        Stores every different key once, the total count of every key and a sparse column for every name.
+        """
+        keys = np.concatenate(all_keys) if all_keys else np.zeros(0, dtype=np.int64)
+        counts = np.concatenate(all_counts) if all_counts else np.zeros(0, dtype=np.int64)
+        
+        # Sorted keys of all the columns. The row of every key in the columns is its index here.
+        self.keys, rows = np.unique(keys, return_inverse=True)
+        rows = rows.reshape(-1)
+        
+        # Total count of every key in all the columns
+        self.total = np.bincount(rows, weights=counts, minlength=len(self.keys)).astype(np.uint32)
+        
+        # Keys are column names and values are (sorted rows, counts) of the keys in that column
+        self.columns = dict()
+        
+        start = 0
+        for column_name, column_keys in zip(column_names, all_keys):
+            end = start + len(column_keys)
+            
+            sort_order = np.argsort(rows[start:end], kind='stable')
+            self.columns[column_name] = (rows[start:end][sort_order].astype(np.int32), counts[start:end][sort_order].astype(np.uint32))
+            
+            start = end
+    
+    def get_column(self, column_name):
+        """
+        Returns a Count_Column with the counts of column_name.
+        """
+        rows, counts = self.columns[column_name]
+        
+        return Count_Column(self.keys, rows, counts)
+    
+    def get_total_column(self):
+        """
+        Returns a Sorted_Count_Array with the total counts. It uses the arrays of the table, nothing is copied.
+        """
+        return Sorted_Count_Array(self.keys, self.total)
+    
+    def get_size_in_bytes(self):
+        """
+        Returns the bytes of the keys, the total column and all the columns.
+        """
+        return self.keys.nbytes + self.total.nbytes + sum(rows.nbytes + counts.nbytes for rows, counts in self.columns.values())
+
+class N_Gram_Store_Model(Sorted_Array_Model):
+    """
+    Read-only model of one column of an N_Gram_Store, or of its total column. Can be used the same way as a Sorted_Array_Model.
+    """
+    def __init__(self, model_name, start_symbol, end_symbol, vocabulary, all_words_count, unigram_count, bigram_count, trigram_count) -> None:
+        super().__init__(model_name, start_symbol, end_symbol, vocabulary)
+        
+        self.all_words_count = all_words_count
+        self.unigram_count = unigram_count
+        self.bigram_count = bigram_count
+        self.trigram_count = trigram_count
+
+class N_Gram_Store:
+    def __init__(self, vocabulary, start_symbol="<*>", end_symbol="<STOP>") -> None:
+        # Vocabulary shared by all the document models
+        self.vocabulary = vocabulary
+        
+        self.START_SYMBOL = start_symbol
+        self.END_SYMBOL = end_symbol
+        
+        # N_Gram_Table of the word IDs, the packed bigrams and the packed trigrams. They are None until add_trigram_models() is called.
+        self.unigram_table = None
+        self.bigram_table = None
+        self.trigram_table = None
+        
+        # Keys are document names and values are the word IDs of the document in the same order as its unigram, and the all words count of the document
+        self.all_word_orders = dict()
+        self.all_words_counts = dict()
+        
+        # Word IDs of the total column in the same order as the unigram of the "ALL" model made with Trigram_Model.add_all_counts()
+        self.total_word_order = None
+    
+    def add_trigram_models(self, all_trigram_models):
+        """
+        Takes a dict() where keys are document names and values are finished Trigram_Model with this store's vocabulary, after fix_n_gram_count.
+        Stores all their counts in the tables. The dicts of the models aren't needed anymore.
+        """
+        document_names = list(all_trigram_models)
+        word_ids = self.vocabulary.word_ids
+        start_id = word_ids[self.START_SYMBOL]
+        
+        all_unigram_ids = []
+        all_unigram_counts = []
+        for document_name, trigram_model in all_trigram_models.items():
+            unigram_count = trigram_model.unigram_count
+            
+            all_unigram_ids.append(np.fromiter((word_ids[word] for word in unigram_count), dtype=np.int64, count=len(unigram_count)))
+            all_unigram_counts.append(np.fromiter(unigram_count.values(), dtype=np.int64, count=len(unigram_count)))
+            
+            self.all_word_orders[document_name] = all_unigram_ids[-1].astype(np.int32)
+            self.all_words_counts[document_name] = trigram_model.all_words_count
+        
+        self.unigram_table = N_Gram_Table(all_unigram_ids, all_unigram_counts, document_names)
+        self.bigram_table = self.n_gram_table(all_trigram_models, 'bigram_count')
+        self.trigram_table = self.n_gram_table(all_trigram_models, 'trigram_count')
+        
+        # Words in the order they are first seen in the documents. fix_n_gram_count() of the "ALL" model adds the START_SYMBOL after all the words.
+        all_ids = np.concatenate(all_unigram_ids) if all_unigram_ids else np.zeros(0, dtype=np.int64)
+        unique_ids, first_positions = np.unique(all_ids, return_index=True)
+        
+        total_word_order = unique_ids[np.argsort(first_positions, kind='stable')]
+        if start_id in unique_ids:
+            total_word_order = np.append(total_word_order[total_word_order != start_id], start_id)
+        
+        self.total_word_order = total_word_order.astype(np.int32)
+    
+    def n_gram_table(self, all_trigram_models, count_name):
+        """
+        Returns an N_Gram_Table with the "count_name" dict() of every model.
+        """
+        all_keys = []
+        all_counts = []
+        for trigram_model in all_trigram_models.values():
+            n_gram_count = getattr(trigram_model, count_name)
+            
+            all_keys.append(np.fromiter(n_gram_count.keys(), dtype=np.int64, count=len(n_gram_count)))
+            all_counts.append(np.fromiter(n_gram_count.values(), dtype=np.int64, count=len(n_gram_count)))
+        
+        return N_Gram_Table(all_keys, all_counts, list(all_trigram_models))
+    
+    def get_document_names(self):
+        return list(self.all_word_orders)
+    
+    def get_document_model(self, document_name):
+        """
+        Returns an N_Gram_Store_Model with the counts of the document's columns.
+        """
+        unigram_count = Word_Count_Column(self.vocabulary, self.all_word_orders[document_name], self.unigram_table.get_column(document_name))
+        
+        return N_Gram_Store_Model(document_name, self.START_SYMBOL, self.END_SYMBOL, self.vocabulary, self.all_words_counts[document_name], unigram_count, self.bigram_table.get_column(document_name), self.trigram_table.get_column(document_name))
+    
+    def get_total_model(self, model_name):
+        """
+        Returns an N_Gram_Store_Model named model_name with the total counts of all the documents, the same counts as adding every document model with Trigram_Model.add_all_counts().
+        """
+        unigram_count = Word_Count_Column(self.vocabulary, self.total_word_order, self.unigram_table.get_total_column())
+        
+        return N_Gram_Store_Model(model_name, self.START_SYMBOL, self.END_SYMBOL, self.vocabulary, sum(self.all_words_counts.values()), unigram_count, self.bigram_table.get_total_column(), self.trigram_table.get_total_column())
+    
+    def get_size_in_bytes(self):
+        """
+        Returns the bytes of all the tables and the word orders.
+        """
+        size = self.unigram_table.get_size_in_bytes() + self.bigram_table.get_size_in_bytes() + self.trigram_table.get_size_in_bytes()
+        
+        return size + self.total_word_order.nbytes + sum(word_order.nbytes for word_order in self.all_word_orders.values())
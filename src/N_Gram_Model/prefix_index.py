@@ -0,0 +1,89 @@
+'''
+Indexes the words of a trigram model in alphabetical order, so the words that start with a prefix are found with a binary search instead of going through all the words in the unigram.
+Calculate_Linear_Interpolation uses it to complete a word the user is still typing.
+All the words that start with a prefix are next to each other in self.sorted_words.
+self.sorted_words example = ["This", "is", "island", "it"]
+self.sorted_word_ids example = [ID of "This", ID of "is", ID of "island", ID of "it"]
+'''
+
+from bisect import bisect_left, bisect_right
+from heapq import nsmallest
+
+# The highest character. Every word that starts with a prefix is smaller than the prefix followed by this character.
+LAST_CHARACTER = chr(0x10FFFF)
+
+# If at most this many words start with the prefix, the ones with the highest counts are found by sorting them. Otherwise by going through the words with the highest counts.
+MAX_WORDS_TO_SORT = 5000
+
+class Prefix_Index:
+    def __init__(self, unigram, vocabulary, successor_index) -> None:
+        self.vocabulary = vocabulary
+        
+        # Successor_Index or Sorted_Array_Successor_Index of the same trigram model
+        self.successor_index = successor_index
+        
+        # All the words in the unigram sorted alphabetically, and their IDs in the same order
+        self.sorted_words = sorted(unigram)
+        
+        word_ids = vocabulary.word_ids
+        self.sorted_word_ids = [word_ids[word] for word in self.sorted_words]
+        
+        # IDs of all words in the unigram, sorted from the highest to the lowest count, in the same order as the successor index
+        self.words_by_count = [int(word_id) for word_id in successor_index.words_by_count]
+        
+        # Keys are word IDs and values are the position of the word in self.words_by_count
+        self.word_rank = {word_id: rank for rank, word_id in enumerate(self.words_by_count)}
+    
+    def get_range(self, prefix):
+        """
+        Returns the (first, last + 1) positions in self.sorted_words of the words that start with the prefix.
+        """
+        first = bisect_left(self.sorted_words, prefix)
+        last = bisect_right(self.sorted_words, prefix + LAST_CHARACTER, first)
+        
+        return first, last
+    
+    def get_words(self, prefix):
+        """
+        Returns all the words that start with the prefix, in alphabetical order.
+        """
+        first, last = self.get_range(prefix)
+        
+        return self.sorted_words[first:last]
+    
+    def get_candidate_ids(self, prefix, word2_id, word1_id, show_top, skip_count=3):
+        """
+        Returns the IDs of all the words that start with the prefix and can be in the top "show_top" words after "word2 word1", sorted by their position in the unigram.
+        Like the successor index, only the words seen after "word2 word1" or "word1" and the words with the highest unigram count are returned, because the other words only have the unigram estimate.
+        skip_count is how many words will be skipped when shown, like the START_SYMBOL, END_SYMBOL, and UNKNOWN_SYMBOL.
+        """
+        first, last = self.get_range(prefix)
+        prefix_word_ids = self.sorted_word_ids[first:last]
+        
+        words = self.vocabulary.words
+        successors = self.successor_index.get_successor_ids(word2_id, word1_id)
+        
+        # Go through the smaller of the words that start with the prefix and the successors
+        if len(prefix_word_ids) <= len(successors):
+            candidates = {word_id for word_id in prefix_word_ids if word_id in successors}
+        else:
+            candidates = {word_id for word_id in successors if words[word_id].startswith(prefix)}
+        
+        words_needed = show_top + skip_count
+        
+        if len(prefix_word_ids) <= MAX_WORDS_TO_SORT:
+            most_common_word_ids = nsmallest(words_needed + len(candidates), prefix_word_ids, key=self.word_rank.__getitem__)
+        else:
+            # Many words start with the prefix, so the ones with the highest counts are found after a few words
+            most_common_word_ids = (word_id for word_id in self.words_by_count if words[word_id].startswith(prefix))
+        
+        for word_id in most_common_word_ids:
+            if words_needed <= 0: break
+            
+            if word_id in candidates: continue
+            
+            candidates.add(word_id)
+            words_needed -= 1
+        
+        word_position = self.successor_index.word_position
+        return sorted(candidates, key=lambda word_id: word_position[word_id])
@@ -0,0 +1,476 @@
+'''
+Read-only trigram model that stores the counts in sorted NumPy arrays instead of dicts.
+Built from a finished Trigram_Model after fix_n_gram_count. Every n-gram order has a sorted array of packed keys and a parallel array of counts. Lookups use a binary search with np.searchsorted.
+self.trigram_count example = Sorted_Count_Array(
+                                keys = [packed IDs of "<*> <*> This", packed IDs of "This is one"],
+                                counts = [1, 1]
+                             )
+Can be used by Calculate_Linear_Interpolation the same way as a Trigram_Model.
+
+The model can be saved to a versioned binary file and opened with mmap. The file has:
+    - header: MAGIC, FILE_VERSION, model name length, all words count, vocabulary size and bytes, and the number of unigrams, bigrams, trigrams.
+    - the model name
+    - vocabulary block: all words separated by '\n'. A word ID is the position of the word in this block.
+    - unigram, bigram, trigram blocks: int64 packed keys followed by uint32 counts.
+Every block starts at a multiple of 8 bytes. Only the vocabulary is parsed when the file is opened, the count arrays are used directly from the mmap.
+'''
+
+import mmap
+import struct
+
+import numpy as np
+
+from .vocabulary import Vocabulary, ID_BITS, ID_MASK
+
+from .trigram_model import Trigram_Model
+
+from .prefix_index import Prefix_Index
+
+MAGIC = b'NGRAMBIN'
+FILE_VERSION = 1
+
+# magic, version, model name length, all words count, vocabulary size, vocabulary bytes, unigram size, bigram size, trigram size
+HEADER = struct.Struct('<8sIIQQQQQQ')
+
+class Sorted_Count_Array:
+    def __init__(self, keys, counts) -> None:
+        """
+        Takes a sorted array of packed keys and a parallel array of counts.
+        """
+        self.keys = keys
+        self.counts = counts
+    
+    def __len__(self):
+        return len(self.keys)
+    
+    def __iter__(self):
+        return iter(self.keys.tolist())
+    
+    def __contains__(self, key):
+        return self.find(key) is not None
+    
+    def find(self, key):
+        """
+        Returns the index of the key in self.keys. Returns None if the key isn't found.
+        """
+        index = int(np.searchsorted(self.keys, key))
+        
+        if index < len(self.keys) and self.keys[index] == key:
+            return index
+        
+        return None
+    
+    def get(self, key, default=0):
+        index = self.find(key)
+        
+        if index is None:
+            return default
+        
+        return int(self.counts[index])
+    
+    def get_many(self, keys):
+        """
+        Takes an array of keys. Returns an array with the count of every key, where the keys that aren't found have a count of 0.
+        """
+        if len(self.keys) == 0:
+            return np.zeros(len(keys), dtype=np.int64)
+        
+        indexes = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        
+        return np.where(self.keys[indexes] == keys, self.counts[indexes], 0)
+    
+    def items(self):
+        return zip(self.keys.tolist(), self.counts.tolist())
+    
+    def get_range(self, first_key, last_key):
+        """
+        Returns the keys that are >= first_key and < last_key.
+        """
+        start = np.searchsorted(self.keys, first_key)
+        end = np.searchsorted(self.keys, last_key)
+        
+        return self.keys[start:end]
+
+class Word_Count_Array:
+    def __init__(self, vocabulary, word_ids, counts) -> None:
+        """
+        Takes the vocabulary, the IDs of all the words in the same order as the unigram of the Trigram_Model and a parallel array of counts.
+        Keys are words like the unigram of the Trigram_Model, but the counts are stored in a Sorted_Count_Array of the word IDs.
+        """
+        self.vocabulary = vocabulary
+        
+        # Word IDs in the same order as the unigram of the Trigram_Model. Used to go through the words in the same order.
+        self.word_ids = word_ids
+        
+        sort_order = np.argsort(word_ids, kind='stable')
+        self.id_counts = Sorted_Count_Array(word_ids[sort_order], counts[sort_order])
+    
+    def __len__(self):
+        return len(self.word_ids)
+    
+    def __iter__(self):
+        words = self.vocabulary.words
+        
+        return (words[word_id] for word_id in self.word_ids.tolist())
+    
+    def __contains__(self, word):
+        return self.get(word, None) is not None
+    
+    def __getitem__(self, word):
+        count = self.get(word, None)
+        
+        if count is None:
+            raise KeyError(word)
+        
+        return count
+    
+    def get(self, word, default=0):
+        word_id = self.vocabulary.get_id(word)
+        
+        if word_id is None:
+            return default
+        
+        return self.id_counts.get(word_id, default)
+    
+    def items(self):
+        return zip(self, self.get_counts_in_order().tolist())
+    
+    def get_counts_in_order(self):
+        """
+        Returns the counts in the same order as self.word_ids.
+        """
+        return self.id_counts.counts[np.searchsorted(self.id_counts.keys, self.word_ids)]
+
+class Word_Position_Array:
+    def __init__(self, word_ids) -> None:
+        """
+        Takes the word IDs of a model in the same order as its unigram. Can be used the same way as the word_position dict() of Successor_Index.
+        Only the words of the model are stored, sorted by ID, so the size doesn't depend on a vocabulary shared by many models.
+        """
+        # Sorted word IDs of the model and a parallel array with the position of every word in the unigram.
+        # When the word IDs are already sorted the array is used as it is and the position is the index.
+        if np.all(word_ids[1:] > word_ids[:-1]):
+            self.word_ids = word_ids
+            self.positions = None
+        else:
+            sort_order = np.argsort(word_ids, kind='stable')
+            
+            self.word_ids = word_ids[sort_order].astype(np.int32)
+            self.positions = sort_order.astype(np.int32)
+    
+    def __len__(self):
+        return len(self.word_ids)
+    
+    def __getitem__(self, word_id):
+        """
+        Returns the position of the word in the unigram. Words that aren't in the unigram have the position 0.
+        """
+        index = int(self.word_ids.searchsorted(word_id))
+        if index == len(self.word_ids) or self.word_ids.item(index) != word_id: return 0
+        
+        return index if self.positions is None else self.positions.item(index)
+    
+    def get_many(self, word_ids):
+        """
+        Takes an array of word IDs. Returns an array with the position of every word in the unigram, where the words that aren't in the unigram have the position 0.
+        """
+        if len(self.word_ids) == 0:
+            return np.zeros(len(word_ids), dtype=np.int32)
+        
+        indexes = np.minimum(self.word_ids.searchsorted(word_ids), len(self.word_ids) - 1)
+        positions = indexes if self.positions is None else self.positions[indexes]
+        
+        return np.where(self.word_ids[indexes] == word_ids, positions, 0)
+
+class Sorted_Array_Successor_Index:
+    def __init__(self, sorted_array_model) -> None:
+        """
+        Same as Successor_Index but uses the sorted keys of a Sorted_Array_Model.
+        All the trigrams with the same context "word2 word1" are next to each other in the sorted keys, so no extra dict is needed.
+        """
+        self.vocabulary = sorted_array_model.vocabulary
+        self.bigram_count = sorted_array_model.bigram_count
+        self.trigram_count = sorted_array_model.trigram_count
+        
+        unigram_count = sorted_array_model.unigram_count
+        word_ids = unigram_count.word_ids
+        
+        # Position of every word ID of the model in the unigram
+        self.word_position = Word_Position_Array(word_ids)
+        
+        # IDs of all words in the unigram, sorted from the highest to the lowest count. Words with the same count are sorted by the last position first.
+        counts = unigram_count.get_counts_in_order()
+        positions = np.arange(len(word_ids))
+        self.words_by_count = word_ids[np.lexsort((-positions, -counts.astype(np.int64)))]
+    
+    def get_candidate_ids(self, word2_id, word1_id, show_top, skip_count=3):
+        """
+        Returns the IDs of all the words that can be in the top "show_top" words after "word2 word1", sorted by their position in the unigram.
+        """
+        candidates = self.get_successor_ids(word2_id, word1_id)
+        
+        words_needed = show_top + skip_count
+        for word_id in self.words_by_count[:words_needed + len(candidates)].tolist():
+            if words_needed <= 0: break
+            
+            if word_id in candidates: continue
+            
+            candidates.add(word_id)
+            words_needed -= 1
+        
+        # All the candidates are sorted by their positions at once
+        candidate_ids = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        
+        return candidate_ids[np.argsort(self.word_position.get_many(candidate_ids), kind='stable')].tolist()
+    
+    def get_successor_ids(self, word2_id, word1_id):
+        """
+        Returns a set with the IDs of all the words seen after "word2 word1" or after "word1".
+        """
+        successors = set()
+        if word1_id is not None:
+            if word2_id is not None:
+                context = (((word2_id << ID_BITS) | word1_id) << ID_BITS)
+                successors.update((self.trigram_count.get_range(context, context + (1 << ID_BITS)) & ID_MASK).tolist())
+            
+            context = word1_id << ID_BITS
+            successors.update((self.bigram_count.get_range(context, context + (1 << ID_BITS)) & ID_MASK).tolist())
+        
+        return successors
+    
+    def get_candidate_words(self, word2, word1, show_top, skip_count=3):
+        """
+        Returns all the words that can be in the top "show_top" words after "word2 word1", sorted by their position in the unigram.
+        """
+        word2_id = self.vocabulary.get_id(word2)
+        word1_id = self.vocabulary.get_id(word1)
+        
+        words = self.vocabulary.words
+        return [words[word_id] for word_id in self.get_candidate_ids(word2_id, word1_id, show_top, skip_count)]
+
+class Sorted_Array_Model:
+    def __init__(self, model_name="", start_symbol="<*>", end_symbol="<STOP>", vocabulary=None) -> None:
+        # Class variables
+        self.model_name = model_name
+        
+        self.START_SYMBOL = start_symbol
+        self.END_SYMBOL = end_symbol
+        
+        self.vocabulary = vocabulary
+        
+        # All words count including all "end_symbol"
+        self.all_words_count = 0
+        
+        # Word_Count_Array with words as keys and Sorted_Count_Array with packed keys for the bigrams and trigrams
+        self.unigram_count = None
+        self.bigram_count = None
+        self.trigram_count = None
+        
+        # Sorted_Array_Successor_Index built from the sorted keys. It's None until get_successor_index() is called.
+        self.successor_index = None
+        
+        # Prefix_Index with the words in alphabetical order. It's None until get_prefix_index() is called.
+        self.prefix_index = None
+        
+        # Top_Words_Table with the precomputed top words for every context.
+        self.top_words_table = None
+        
+        # mmap of the binary model file when the model is loaded from a file
+        self.file_map = None
+    
+    def get_model_information(self):
+        """
+        Returns a list with current models information where:
+        list[0] = model_name
+        list[1-3] = unigram, bigram, trigram
+        list[4] = all_words_count
+        list[5] = vocabulary
+        """
+        info = [self.model_name, self.unigram_count, self.bigram_count, self.trigram_count, self.all_words_count, self.vocabulary]
+        
+        return info
+    
+    def add_trigram_model(self, trigram_model):
+        """
+        Takes a finished Trigram_Model, after fix_n_gram_count, and copies all of its counts into sorted arrays.
+        """
+        self.model_name = trigram_model.model_name
+        self.START_SYMBOL = trigram_model.START_SYMBOL
+        self.END_SYMBOL = trigram_model.END_SYMBOL
+        self.vocabulary = trigram_model.vocabulary
+        self.all_words_count = trigram_model.all_words_count
+        self.top_words_table = trigram_model.top_words_table
+        self.successor_index = None
+        self.prefix_index = None
+        
+        word_ids = self.vocabulary.word_ids
+        unigram_ids = np.fromiter((word_ids[word] for word in trigram_model.unigram_count), dtype=np.int64, count=len(trigram_model.unigram_count))
+        unigram_counts = np.fromiter(trigram_model.unigram_count.values(), dtype=np.uint32, count=len(trigram_model.unigram_count))
+        self.unigram_count = Word_Count_Array(self.vocabulary, unigram_ids, unigram_counts)
+        
+        self.bigram_count = self.sorted_count_array(trigram_model.bigram_count)
+        self.trigram_count = self.sorted_count_array(trigram_model.trigram_count)
+        
+        return self.model_name
+    
+    def to_trigram_model(self, vocabulary=None):
+        """
+        Returns a Trigram_Model with the same counts that can be updated. The word IDs are changed to the IDs of "vocabulary".
+        """
+        trigram_model = Trigram_Model(self.model_name, self.START_SYMBOL, self.END_SYMBOL, vocabulary)
+        
+        model_counts = (
+            self.vocabulary.words, dict(self.unigram_count.items()),
+            self.bigram_count.keys, self.bigram_count.counts.astype(np.int64),
+            self.trigram_count.keys, self.trigram_count.counts.astype(np.int64),
+            self.all_words_count
+        )
+        trigram_model.add_file_counts(model_counts)
+        
+        return trigram_model
+    
+    def sorted_count_array(self, n_gram_count):
+        """
+        Takes a dict() where keys are packed n-grams and values are counts. Returns a Sorted_Count_Array with the same keys and counts.
+        """
+        keys = np.fromiter(n_gram_count.keys(), dtype=np.int64, count=len(n_gram_count))
+        counts = np.fromiter(n_gram_count.values(), dtype=np.uint32, count=len(n_gram_count))
+        
+        sort_order = np.argsort(keys, kind='stable')
+        
+        return Sorted_Count_Array(keys[sort_order], counts[sort_order])
+    
+    def get_successor_index(self):
+        """
+        Returns the Sorted_Array_Successor_Index for this model. The index is only built once.
+        """
+        if self.successor_index is None:
+            self.successor_index = Sorted_Array_Successor_Index(self)
+        
+        return self.successor_index
+    
+    def get_prefix_index(self):
+        """
+        Returns the Prefix_Index for this model. The index is only built once.
+        """
+        if self.prefix_index is None:
+            self.prefix_index = Prefix_Index(self.unigram_count, self.vocabulary, self.get_successor_index())
+        
+        return self.prefix_index
+    
+    def save_model_to_file(self, paths_to_all_files):
+        """
+        Saves this model to a binary file based on paths_to_all_files path.
+        The file only has the words used by this model, so the word IDs are changed to the position of the word in the unigram.
+        Returns the words of the file, so the top words table can be saved with the same word IDs.
+        """
+        if self.model_name not in paths_to_all_files: return
+        
+        current_model_file_path = paths_to_all_files[self.model_name]
+        
+        words, unigram_counts, bigram, trigram = self.get_compact_arrays()
+        
+        name_bytes = str(self.model_name).encode('utf-8')
+        vocabulary_bytes = '\n'.join(words).encode('utf-8')
+        
+        with open(current_model_file_path, 'wb') as output_file:
+            header = HEADER.pack(MAGIC, FILE_VERSION, len(name_bytes), self.all_words_count, len(words), len(vocabulary_bytes), len(unigram_counts), len(bigram.keys), len(trigram.keys))
+            output_file.write(header)
+            
+            self.write_block(output_file, name_bytes)
+            self.write_block(output_file, vocabulary_bytes)
+            
+            self.write_block(output_file, np.arange(len(unigram_counts), dtype=np.int64).tobytes())
+            self.write_block(output_file, unigram_counts.astype(np.uint32).tobytes())
+            
+            for n_gram_count in (bigram, trigram):
+                self.write_block(output_file, n_gram_count.keys.astype(np.int64).tobytes())
+                self.write_block(output_file, n_gram_count.counts.astype(np.uint32).tobytes())
+        
+        print(f'\t\t- Added "{self.model_name}" model to the binary file "{current_model_file_path}"')
+        
+        return words
+    
+    def write_block(self, output_file, block):
+        """
+        Writes the bytes to the output_file and pads the file to a multiple of 8 bytes.
+        """
+        output_file.write(block)
+        output_file.write(b'\0' * (-len(block) % 8))
+    
+    def get_compact_arrays(self):
+        """
+        Returns the words, the unigram counts and the bigram and trigram Sorted_Count_Array where the word IDs are the position of the word in the unigram.
+        Words that are only in the bigrams or trigrams, like START_SYMBOL before fix_n_gram_count, are added after the unigram words.
+        """
+        unigram_ids = self.unigram_count.word_ids
+        
+        n_gram_ids = np.concatenate((self.bigram_count.keys >> ID_BITS, self.bigram_count.keys & ID_MASK, self.trigram_count.keys >> (2 * ID_BITS), (self.trigram_count.keys >> ID_BITS) & ID_MASK))
+        missing_ids = np.setdiff1d(n_gram_ids, unigram_ids)
+        
+        old_ids = np.concatenate((unigram_ids, missing_ids))
+        
+        # Index is the old word ID and value is the new word ID
+        new_ids = np.zeros(len(self.vocabulary), dtype=np.int64)
+        new_ids[old_ids] = np.arange(len(old_ids), dtype=np.int64)
+        
+        words = [self.vocabulary.words[word_id] for word_id in old_ids.tolist()]
+        
+        bigram_keys = (new_ids[self.bigram_count.keys >> ID_BITS] << ID_BITS) | new_ids[self.bigram_count.keys & ID_MASK]
+        trigram_keys = (new_ids[self.trigram_count.keys >> (2 * ID_BITS)] << (2 * ID_BITS)) | (new_ids[(self.trigram_count.keys >> ID_BITS) & ID_MASK] << ID_BITS) | new_ids[self.trigram_count.keys & ID_MASK]
+        
+        bigram_order = np.argsort(bigram_keys, kind='stable')
+        trigram_order = np.argsort(trigram_keys, kind='stable')
+        
+        bigram = Sorted_Count_Array(bigram_keys[bigram_order], self.bigram_count.counts[bigram_order])
+        trigram = Sorted_Count_Array(trigram_keys[trigram_order], self.trigram_count.counts[trigram_order])
+        
+        return words, self.unigram_count.get_counts_in_order(), bigram, trigram
+    
+    def get_model_from_file(self, file_path):
+        """
+        Opens the binary model file from file_path with mmap. Only the vocabulary is parsed, the counts are used directly from the file.
+        The model gets its own Vocabulary from the file. Returns the model name.
+        """
+        with open(file_path, 'rb') as file:
+            file_map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        magic, version, name_length, all_words_count, vocabulary_size, vocabulary_length, unigram_size, bigram_size, trigram_size = HEADER.unpack_from(file_map, 0)
+        
+        if magic != MAGIC:
+            raise ValueError(f'"{file_path}" is not a binary trigram model file.')
+        if version != FILE_VERSION:
+            raise ValueError(f'"{file_path}" has version {version}, only version {FILE_VERSION} is supported.')
+        
+        offset = HEADER.size
+        
+        self.model_name = bytes(file_map[offset:offset + name_length]).decode('utf-8')
+        offset += name_length + (-name_length % 8)
+        
+        words = bytes(file_map[offset:offset + vocabulary_length]).decode('utf-8').split('\n') if vocabulary_size else []
+        offset += vocabulary_length + (-vocabulary_length % 8)
+        
+        self.vocabulary = Vocabulary()
+        self.vocabulary.set_words(words)
+        
+        all_arrays = []
+        for size in (unigram_size, bigram_size, trigram_size):
+            keys = np.frombuffer(file_map, dtype=np.int64, count=size, offset=offset)
+            offset += 8 * size
+            
+            counts = np.frombuffer(file_map, dtype=np.uint32, count=size, offset=offset)
+            offset += 4 * size + (-(4 * size) % 8)
+            
+            all_arrays.append((keys, counts))
+        
+        self.all_words_count = all_words_count
+        self.unigram_count = Word_Count_Array(self.vocabulary, all_arrays[0][0], all_arrays[0][1])
+        self.bigram_count = Sorted_Count_Array(all_arrays[1][0], all_arrays[1][1])
+        self.trigram_count = Sorted_Count_Array(all_arrays[2][0], all_arrays[2][1])
+        self.successor_index = None
+        self.prefix_index = None
+        
+        # Keep the mmap open while the arrays use it
+        self.file_map = file_map
+        
+        return self.model_name
@@ -0,0 +1,103 @@
+'''
+Indexes the words that were seen after every context of a trigram model.
+Calculate_Linear_Interpolation uses it to only score the words that can beat the unigram estimate instead of every word in the unigram.
+All words are stored as their Vocabulary IDs.
+self.trigram_successors example = {
+                                    packed IDs of "This is": [ID of "one", ID of "another"]
+                                  }
+self.bigram_successors example = {
+                                    ID of "is": [ID of "one", ID of "another"]
+                                 }
+'''
+
+from .vocabulary import ID_BITS, ID_MASK
+
+class Successor_Index:
+    def __init__(self, unigram, bigram, trigram, vocabulary) -> None:
+        self.vocabulary = vocabulary
+        
+        # Keys are the packed IDs of 'word2 word1' and values are a list of the IDs of all the words seen after 'word2 word1'
+        self.trigram_successors = dict()
+        
+        # Keys are the ID of 'word1' and values are a list of the IDs of all the words seen after 'word1'
+        self.bigram_successors = dict()
+        
+        # Keys are word IDs and values are the position of the word in the unigram. Used to keep the same order as a scan over the unigram.
+        self.word_position = dict()
+        
+        # IDs of all words in the unigram, sorted from the highest to the lowest count. Words with the same count are sorted by the last position first.
+        self.words_by_count = list()
+        
+        self.build_index(unigram, bigram, trigram)
+    
+    def build_index(self, unigram, bigram, trigram):
+        """
+        Goes through all the bigrams and trigrams once and adds the last word to the list of its context.
+        The context of a trigram key is the bigram key of its first 2 words, and the context of a bigram key is the ID of its first word.
+        """
+        for trigram_key in trigram:
+            context = trigram_key >> ID_BITS
+            word_id = trigram_key & ID_MASK
+            
+            if context in self.trigram_successors:
+                self.trigram_successors[context].append(word_id)
+            else:
+                self.trigram_successors[context] = [word_id]
+        
+        for bigram_key in bigram:
+            context = bigram_key >> ID_BITS
+            word_id = bigram_key & ID_MASK
+            
+            if context in self.bigram_successors:
+                self.bigram_successors[context].append(word_id)
+            else:
+                self.bigram_successors[context] = [word_id]
+        
+        word_ids = self.vocabulary.word_ids
+        for position, word in enumerate(unigram):
+            self.word_position[word_ids[word]] = position
+        
+        words = self.vocabulary.words
+        self.words_by_count = sorted(self.word_position, key=lambda word_id: (-unigram[words[word_id]], -self.word_position[word_id]))
+    
+    def get_candidate_words(self, word2, word1, show_top, skip_count=3):
+        """
+        Returns all the words that can be in the top "show_top" words after "word2 word1", sorted by their position in the unigram.
+        """
+        word2_id = self.vocabulary.get_id(word2)
+        word1_id = self.vocabulary.get_id(word1)
+        
+        words = self.vocabulary.words
+        return [words[word_id] for word_id in self.get_candidate_ids(word2_id, word1_id, show_top, skip_count)]
+    
+    def get_candidate_ids(self, word2_id, word1_id, show_top, skip_count=3):
+        """
+        Returns the IDs of all the words that can be in the top "show_top" words after "word2 word1", sorted by their position in the unigram.
+        Words that were never seen after "word2 word1" or after "word1" only have the unigram estimate, so only the ones with the highest counts are added.
+        skip_count is how many words will be skipped when shown, like the START_SYMBOL, END_SYMBOL, and UNKNOWN_SYMBOL.
+        """
+        candidates = self.get_successor_ids(word2_id, word1_id)
+        
+        words_needed = show_top + skip_count
+        for word_id in self.words_by_count:
+            if words_needed <= 0: break
+            
+            if word_id in candidates: continue
+            
+            candidates.add(word_id)
+            words_needed -= 1
+        
+        return sorted(candidates, key=self.word_position.__getitem__)
+    
+    def get_successor_ids(self, word2_id, word1_id):
+        """
+        Returns a set with the IDs of all the words seen after "word2 word1" or after "word1".
+        """
+        successors = set()
+        if word1_id is not None:
+            if word2_id is not None:
+                successors.update(self.trigram_successors.get((word2_id << ID_BITS) | word1_id, ()))
+            
+            successors.update(self.bigram_successors.get(word1_id, ()))
+        
+        return successors
@@ -0,0 +1,168 @@
+'''
+On-disk cache of tokenized corpus files. A file is tokenized once and its sentences are saved as word IDs, keyed by the sha256 of the file's content and the tokenizer key of Get_Sentences.
+Later builds, and files with the same content under a different path, read the word IDs instead of tokenizing the file again. A file that changed has a different hash, so its old cache file is never used.
+
+Every cache file has:
+    - header: MAGIC, FILE_VERSION, vocabulary size and bytes, number of tokens and sentences.
+    - vocabulary block: all words of the file separated by '\n'. A word ID is the position of the word in this block.
+    - tokens block: uint32 word ID of every word, sentence after sentence, without the END_SYMBOL.
+    - sentence ends block: int64 position in the tokens block where every sentence ends.
+Every block starts at a multiple of 8 bytes. The END_SYMBOL is added when the sentences are read, so the cache doesn't depend on it.
+'''
+
+import struct
+
+from array import array
+from hashlib import sha256
+from os import getpid, listdir, makedirs, remove, replace, stat
+from os.path import isfile, join
+
+import numpy as np
+
+from instrumentation import metrics
+
+MAGIC = b'TOKCACHE'
+FILE_VERSION = 1
+
+# magic, version, vocabulary size, vocabulary bytes, token count, sentence count
+HEADER = struct.Struct('<8sIQQQQ')
+
+# Extension of the cache files
+CACHE_EXTENSION = '.tok'
+
+class Tokenized_File_Cache:
+    def __init__(self, cache_folder) -> None:
+        # Folder with the cache files. It's created if it doesn't exist.
+        self.cache_folder = cache_folder
+        makedirs(cache_folder, exist_ok=True)
+        
+        # Keys are (file path, size, mtime) and values are the content hash, so a file is only hashed once
+        self.file_hashes = dict()
+    
+    def get_file_hash(self, file_path):
+        """
+        Returns the sha256 of the file's content.
+        """
+        file_stat = stat(file_path)
+        file_key = (file_path, file_stat.st_size, file_stat.st_mtime_ns)
+        
+        if file_key in self.file_hashes:
+            return self.file_hashes[file_key]
+        
+        file_hash = sha256()
+        with metrics.timer('file_cache_hash'):
+            with open(file_path, 'rb') as file:
+                for block in iter(lambda: file.read(1 << 20), b''):
+                    file_hash.update(block)
+        
+        self.file_hashes[file_key] = file_hash.hexdigest()
+        
+        return self.file_hashes[file_key]
+    
+    def get_cache_path(self, file_path, tokenizer_key):
+        """
+        Returns the path to the cache file of the file's content tokenized with tokenizer_key.
+        """
+        return join(self.cache_folder, f'{self.get_file_hash(file_path)}-{tokenizer_key}{CACHE_EXTENSION}')
+    
+    def get_sentences(self, cache_path, END_SYMBOL):
+        """
+        Returns a 2d list with the sentences in the cache file, where every sentence ends with END_SYMBOL. Returns None if there isn't a valid cache file.
+        """
+        if not isfile(cache_path): return
+        
+        with metrics.timer('file_cache_read'):
+            with open(cache_path, 'rb') as file:
+                file_bytes = file.read()
+            
+            if len(file_bytes) < HEADER.size: return
+            
+            magic, version, vocabulary_size, vocabulary_length, token_count, sentence_count = HEADER.unpack_from(file_bytes, 0)
+            if magic != MAGIC or version != FILE_VERSION: return
+            
+            offset = HEADER.size
+            
+            words = file_bytes[offset:offset + vocabulary_length].decode('utf-8').split('\n') if vocabulary_size else []
+            offset += vocabulary_length + (-vocabulary_length % 8)
+            
+            word_ids = np.frombuffer(file_bytes, dtype=np.uint32, count=token_count, offset=offset)
+            offset += 4 * token_count + (-(4 * token_count) % 8)
+            
+            sentence_ends = np.frombuffer(file_bytes, dtype=np.int64, count=sentence_count, offset=offset).tolist()
+            
+            # Every word ID is changed to its word at once, then the words are cut into sentences
+            all_words = np.array(words, dtype=object)[word_ids].tolist()
+            
+            all_sentences = []
+            sentence_start = 0
+            for sentence_end in sentence_ends:
+                sentence = all_words[sentence_start:sentence_end]
+                sentence.append(END_SYMBOL)
+                all_sentences.append(sentence)
+                
+                sentence_start = sentence_end
+        
+        metrics.add('file_cache_tokens', token_count)
+        
+        return all_sentences
+    
+    def iter_and_save_sentences(self, cache_path, all_sentences):
+        """
+        Yields every sentence of all_sentences and saves their words to the cache file after the last one. Every sentence must end with the END_SYMBOL.
+        If the sentences aren't all used the cache file isn't saved.
+        """
+        # Keys are the words of the file and values are their word IDs in the cache file
+        word_ids = dict()
+        
+        tokens = array('I')
+        sentence_ends = array('q')
+        
+        for sentence in all_sentences:
+            for word in sentence[:-1]:
+                word_id = word_ids.get(word)
+                
+                if word_id is None:
+                    word_id = word_ids[word] = len(word_ids)
+                
+                tokens.append(word_id)
+            
+            sentence_ends.append(len(tokens))
+            
+            yield sentence
+        
+        self.save_file(cache_path, list(word_ids), tokens, sentence_ends)
+    
+    def save_file(self, cache_path, words, tokens, sentence_ends):
+        """
+        Saves the words, the word ID of every token and the end of every sentence to the cache file.
+        The file is written to a temporary file first, so a worker process never reads a cache file that isn't finished.
+        """
+        vocabulary_bytes = '\n'.join(words).encode('utf-8')
+        temporary_path = f'{cache_path}.{getpid()}.tmp'
+        
+        with metrics.timer('file_cache_write'):
+            with open(temporary_path, 'wb') as output_file:
+                output_file.write(HEADER.pack(MAGIC, FILE_VERSION, len(words), len(vocabulary_bytes), len(tokens), len(sentence_ends)))
+                
+                self.write_block(output_file, vocabulary_bytes)
+                self.write_block(output_file, tokens.tobytes())
+                self.write_block(output_file, sentence_ends.tobytes())
+            
+            replace(temporary_path, cache_path)
+    
+    def write_block(self, output_file, block):
+        """
+        Writes the bytes to the output_file and pads the file to a multiple of 8 bytes.
+        """
+        output_file.write(block)
+        output_file.write(b'\0' * (-len(block) % 8))
+    
+    def clear(self):
+        """
+        Removes all the cache files.
+        """
+        for file in listdir(self.cache_folder):
+            if file.endswith(CACHE_EXTENSION):
+                remove(join(self.cache_folder, file))
+        
+        self.file_hashes.clear()
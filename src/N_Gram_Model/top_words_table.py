@@ -0,0 +1,403 @@
+'''
+Precomputes the top words after every context that was seen in a trigram model. Given 2 words, the top words can be found with one lookup instead of calculating the linear interpolation.
+self.top_words example = {
+                            packed IDs of "This is": (("one", 0.45), ("another", 0.3), ("a", 0.01))
+                         }
+The probabilities can be quantized to 8 or 16 bits. A quantized probability is stored as the level of its log between MIN_LOG_PROBABILITY and 0, and the words are ranked by the quantized probabilities.
+After compact(), or after it's loaded from a file, the table is stored in NumPy arrays instead of the dict:
+self.contexts example = [packed IDs of "This is", ...] sorted
+self.word_ids example = [[ID of "one", ID of "another", ID of "a"], ...]
+self.scores example = [[0.45, 0.3, 0.01], ...] or the quantized levels
+
+The table is saved to a versioned binary file with the same padded blocks as the binary models, and opened with mmap. The file has:
+    - header: MAGIC, FILE_VERSION, model name length, top words count, quantization bits (0 if not quantized), vocabulary size and bytes, and the number of contexts.
+    - the model name
+    - vocabulary block: the words of the table separated by '\n'. A word ID is the position of the word in this block.
+    - contexts block: int64 sorted packed contexts.
+    - word IDs block: uint32 top word IDs of every context.
+    - scores block: float64 probabilities, or the uint8 or uint16 quantized levels.
+Every block starts at a multiple of 8 bytes. When the words of the file are the first words of the table's vocabulary, the arrays are used directly from the mmap.
+'''
+
+import mmap
+import struct
+
+from math import log
+
+import numpy as np
+
+from .vocabulary import Vocabulary, ID_BITS, ID_MASK
+
+# Lowest log probability that can be quantized. Smaller probabilities get the lowest level.
+MIN_LOG_PROBABILITY = -24.0
+
+# Keys are the number of bits of a quantized probability and values are the dtype of the levels
+QUANTIZED_DTYPES = {8: np.uint8, 16: np.uint16}
+
+# Keys are the number of bits and values are the probability of every level, shared by all the tables
+LEVEL_PROBABILITIES = {bits: np.exp(MIN_LOG_PROBABILITY * (1 - np.arange(1 << bits) / ((1 << bits) - 1))) for bits in QUANTIZED_DTYPES}
+
+# Word ID in self.word_ids after the last word of a context that has less than top_words_count words
+NO_WORD_ID = 0xFFFFFFFF
+
+MAGIC = b'TOPWORDS'
+FILE_VERSION = 2
+
+# magic, version, model name length, top words count, quantization bits, vocabulary size, vocabulary bytes, number of contexts
+HEADER = struct.Struct('<8sIIIIQQQ')
+
+class Top_Words_Table:
+    def __init__(self, model_name="", top_words_count=3, vocabulary=None, quantization_bits=None) -> None:
+        # Class variables
+        self.model_name = model_name
+        
+        # How many words are stored for each context
+        self.top_words_count = top_words_count
+        
+        # Vocabulary of the trigram model. The contexts are packed with it.
+        if vocabulary is None:
+            vocabulary = Vocabulary()
+        self.vocabulary = vocabulary
+        
+        # Keys are the packed IDs of 'word2 word1' and values are a tuple of (word, probability) sorted from the highest to the lowest probability
+        self.top_words = dict()
+        
+        # Number of bits of the quantized probabilities, 8 or 16. None means the probabilities aren't quantized.
+        if quantization_bits is not None and quantization_bits not in QUANTIZED_DTYPES:
+            raise ValueError(f'quantization_bits must be one of {sorted(QUANTIZED_DTYPES)} or None, not {quantization_bits}.')
+        self.quantization_bits = quantization_bits
+        
+        # NumPy arrays of the table after compact(). They are None while the table is stored in self.top_words.
+        self.contexts = None
+        self.word_ids = None
+        self.scores = None
+        
+        # mmap of the binary table file when the table is loaded from a file
+        self.file_map = None
+    
+    def compile_table(self, linear_interpolation):
+        """
+        Takes a Calculate_Linear_Interpolation with a successor_index and the same vocabulary as this table. Calculates the top words for every context "word2 word1" found in the trigram model.
+        All contexts that end with the same "word1" share the bigram and unigram estimates, so the words are only sorted once per "word1".
+        """
+        successor_index = linear_interpolation.successor_index
+        skip_words = {self.vocabulary.get_id(linear_interpolation.end_symbol), self.vocabulary.get_id(linear_interpolation.start_symbol), self.vocabulary.get_id(linear_interpolation.unknown_symbol)}
+        words_needed = self.top_words_count + len(skip_words)
+        
+        # Keys are the ID of 'word1' and values are a list of the IDs of all 'word2' that were seen before 'word1'
+        contexts_per_word1 = dict()
+        for context in successor_index.trigram_successors:
+            word2 = context >> ID_BITS
+            word1 = context & ID_MASK
+            
+            if word1 in contexts_per_word1:
+                contexts_per_word1[word1].append(word2)
+            else:
+                contexts_per_word1[word1] = [word2]
+        
+        for word1, all_word2 in contexts_per_word1.items():
+            most_trigram_words = max(len(successor_index.trigram_successors[(word2 << ID_BITS) | word1]) for word2 in all_word2)
+            
+            ranked_words = self.rank_words_after(linear_interpolation, word1, words_needed + most_trigram_words)
+            
+            for word2 in all_word2:
+                self.add_context(linear_interpolation, word2, word1, ranked_words, skip_words, words_needed)
+    
+    def rank_words_after(self, linear_interpolation, word1, words_needed):
+        """
+        Takes the ID of "word1". Returns a list of (probability, word ID) sorted the same way predict_next_words pops them, when "word2 word1 word" was never seen.
+        Has all the words seen after "word1" and at least "words_needed" words that were never seen after "word1".
+        """
+        successor_index = linear_interpolation.successor_index
+        word_position = successor_index.word_position
+        
+        bigram_words = successor_index.bigram_successors.get(word1, ())
+        
+        ranked_words = [(linear_interpolation.bigram_likelihood(word, word1) + linear_interpolation.unigram_likelihood(word), word) for word in bigram_words]
+        
+        # Words never seen after "word1" only have the unigram estimate.
+        seen_words = set(bigram_words)
+        for word in successor_index.words_by_count:
+            if words_needed <= 0: break
+            
+            if word in seen_words: continue
+            
+            ranked_words.append((linear_interpolation.unigram_likelihood(word), word))
+            words_needed -= 1
+        
+        ranked_words.sort(key=lambda p_word: (-p_word[0], -word_position[p_word[1]]))
+        
+        return ranked_words
+    
+    def add_context(self, linear_interpolation, word2, word1, ranked_words, skip_words, words_needed):
+        """
+        Takes the IDs of "word2" and "word1". Adds the top words after "word2 word1" to the table. Words seen after "word2 word1" get the full probability, the rest of the words are taken from ranked_words.
+        """
+        word_position = linear_interpolation.successor_index.word_position
+        
+        context = (word2 << ID_BITS) | word1
+        trigram_words = linear_interpolation.successor_index.trigram_successors[context]
+        
+        candidates = [(linear_interpolation.probability_of_ids(word, word2, word1), word) for word in trigram_words]
+        
+        seen_words = set(trigram_words)
+        for p, word in ranked_words:
+            if words_needed <= 0: break
+            
+            if word in seen_words: continue
+            
+            candidates.append((p, word))
+            words_needed -= 1
+        
+        # Rank the words by the probabilities that are stored, so quantized probabilities that are equal are ranked like predict_next_words ranks equal probabilities
+        if self.quantization_bits is not None:
+            candidates = [(self.dequantize(self.quantize(p)), word) for p, word in candidates]
+        
+        candidates.sort(key=lambda p_word: (-p_word[0], -word_position[p_word[1]]))
+        
+        top_words = []
+        for p, word in candidates:
+            if len(top_words) == self.top_words_count: break
+            
+            # We don't want to show the END_SYMBOL, START_SYMBOL, or UNKNOWN_SYMBOL
+            if word not in skip_words:
+                top_words.append((self.vocabulary.words[word], p))
+        
+        self.top_words[context] = tuple(top_words)
+    
+    def get_top_words(self, word2, word1, show_top):
+        """
+        Returns a list of (word, probability) with the "show_top" highest probabilities after "word2 word1".
+        Returns None if the context wasn't compiled or the table has less than "show_top" words for every context.
+        """
+        if show_top > self.top_words_count: return None
+        
+        word2_id = self.vocabulary.get_id(word2)
+        word1_id = self.vocabulary.get_id(word1)
+        if word2_id is None or word1_id is None: return None
+        
+        context = self.vocabulary.bigram_key(word2_id, word1_id)
+        
+        if self.contexts is not None:
+            return self.get_compact_top_words(context, show_top)
+        
+        top_words = self.top_words.get(context)
+        if top_words is None: return None
+        
+        return list(top_words[:show_top])
+    
+    def get_compact_top_words(self, context, show_top):
+        """
+        Returns a list of (word, probability) with the "show_top" highest probabilities after the packed context from the compact arrays. Returns None if the context wasn't compiled.
+        """
+        contexts = self.contexts
+        
+        row = int(contexts.searchsorted(context))
+        if row == len(contexts) or contexts.item(row) != context: return None
+        
+        word_ids = self.word_ids[row].tolist()[:show_top]
+        
+        if self.quantization_bits is None:
+            probabilities = self.scores[row].tolist()
+        else:
+            probabilities = LEVEL_PROBABILITIES[self.quantization_bits][self.scores[row]].tolist()
+        
+        if NO_WORD_ID in word_ids:
+            word_ids = word_ids[:word_ids.index(NO_WORD_ID)]
+        
+        words = self.vocabulary.words
+        
+        return [(words[word_id], p) for word_id, p in zip(word_ids, probabilities)]
+    
+    def get_all_top_words(self):
+        """
+        Returns an iterator of (packed context, tuple of (word, probability)) for every context in the table, from the dict or from the compact arrays.
+        """
+        if self.contexts is None:
+            return iter(self.top_words.items())
+        
+        return ((context, tuple(self.get_compact_top_words(context, self.top_words_count))) for context in self.contexts.tolist())
+    
+    def quantize(self, p):
+        """
+        Returns the level of the probability p, from 0 for MIN_LOG_PROBABILITY or less to 2 ** quantization_bits - 1 for a probability of 1.
+        """
+        highest_level = (1 << self.quantization_bits) - 1
+        log_p = max(log(p), MIN_LOG_PROBABILITY) if p > 0 else MIN_LOG_PROBABILITY
+        
+        return round((1 - log_p / MIN_LOG_PROBABILITY) * highest_level)
+    
+    def dequantize(self, level):
+        """
+        Returns the probability of a quantized level.
+        """
+        return float(LEVEL_PROBABILITIES[self.quantization_bits][level])
+    
+    def compact(self):
+        """
+        Moves the table from self.top_words to sorted NumPy arrays. Every context uses 8 bytes for the packed IDs, 4 bytes for every word ID, and 8 bytes for every probability, or 1 or 2 bytes when the probabilities are quantized.
+        Words are stored as IDs of self.vocabulary, so the table doesn't keep a tuple and a float for every word.
+        """
+        if self.contexts is not None: return
+        
+        self.contexts, self.word_ids, self.scores = self.get_compact_arrays()
+        
+        self.top_words = dict()
+    
+    def get_compact_arrays(self):
+        """
+        Returns the sorted contexts, the word IDs and the scores of the table as NumPy arrays. The table isn't changed.
+        """
+        if self.contexts is not None:
+            return self.contexts, self.word_ids, self.scores
+        
+        get_id = self.vocabulary.get_id
+        
+        all_word_ids = []
+        all_scores = []
+        for top_words in self.top_words.values():
+            word_ids = [get_id(word) for word, _ in top_words]
+            scores = [p if self.quantization_bits is None else self.quantize(p) for _, p in top_words]
+            
+            # Contexts with less words are padded to top_words_count
+            padding = self.top_words_count - len(top_words)
+            all_word_ids.append(word_ids + [NO_WORD_ID] * padding)
+            all_scores.append(scores + [0] * padding)
+        
+        contexts = np.fromiter(self.top_words, dtype=np.int64, count=len(self.top_words))
+        sort_order = np.argsort(contexts, kind='stable')
+        
+        shape = (len(contexts), self.top_words_count)
+        score_dtype = np.float64 if self.quantization_bits is None else QUANTIZED_DTYPES[self.quantization_bits]
+        
+        word_ids = np.array(all_word_ids, dtype=np.uint32).reshape(shape)[sort_order]
+        scores = np.array(all_scores, dtype=score_dtype).reshape(shape)[sort_order]
+        
+        return contexts[sort_order], word_ids, scores
+    
+    def change_word_ids(self, contexts, word_ids, scores, new_ids):
+        """
+        Takes the compact arrays and an array where the index is the old word ID and the value is the new word ID.
+        Returns the arrays with the new word IDs, sorted by the new contexts.
+        """
+        contexts = (new_ids[contexts >> ID_BITS] << ID_BITS) | new_ids[contexts & ID_MASK]
+        
+        found = word_ids != NO_WORD_ID
+        word_ids = np.where(found, new_ids[np.where(found, word_ids, 0)], NO_WORD_ID).astype(np.uint32)
+        
+        sort_order = np.argsort(contexts, kind='stable')
+        
+        return contexts[sort_order], word_ids[sort_order], scores[sort_order]
+    
+    def get_size_in_bytes(self):
+        """
+        Returns the bytes used by the compact arrays. Returns None if the table isn't compact.
+        """
+        if self.contexts is None: return None
+        
+        return self.contexts.nbytes + self.word_ids.nbytes + self.scores.nbytes
+    
+    def save_table_to_file(self, paths_to_all_files, words=None):
+        """
+        Saves this table to a binary file based on paths_to_all_files path.
+        If words is given, like the words of the binary model file, the word IDs of the file are the positions in words, so the table loaded next to that model uses the arrays from the file without changing them.
+        Otherwise the file only has the words used by this table.
+        """
+        if self.model_name not in paths_to_all_files: return
+        
+        current_table_file_path = paths_to_all_files[self.model_name]
+        
+        contexts, word_ids, scores = self.get_compact_arrays()
+        
+        if words is None:
+            used_ids = np.concatenate((contexts >> ID_BITS, contexts & ID_MASK, word_ids[word_ids != NO_WORD_ID].astype(np.int64)))
+            words = [self.vocabulary.words[word_id] for word_id in np.unique(used_ids).tolist()]
+        
+        # Index is the word ID in the vocabulary and value is the word ID in the file
+        new_ids = np.zeros(len(self.vocabulary), dtype=np.int64)
+        for word_id, word in enumerate(words):
+            old_id = self.vocabulary.get_id(word)
+            
+            if old_id is not None:
+                new_ids[old_id] = word_id
+        
+        contexts, word_ids, scores = self.change_word_ids(contexts, word_ids, scores, new_ids)
+        
+        name_bytes = str(self.model_name).encode('utf-8')
+        vocabulary_bytes = '\n'.join(words).encode('utf-8')
+        
+        with open(current_table_file_path, 'wb') as output_file:
+            header = HEADER.pack(MAGIC, FILE_VERSION, len(name_bytes), self.top_words_count, self.quantization_bits or 0, len(words), len(vocabulary_bytes), len(contexts))
+            output_file.write(header)
+            
+            self.write_block(output_file, name_bytes)
+            self.write_block(output_file, vocabulary_bytes)
+            
+            self.write_block(output_file, contexts.tobytes())
+            self.write_block(output_file, word_ids.tobytes())
+            self.write_block(output_file, scores.tobytes())
+        
+        print(f'\t\t- Added "{self.model_name}" top words table to the file "{current_table_file_path}"')
+    
+    def write_block(self, output_file, block):
+        """
+        Writes the bytes to the output_file and pads the file to a multiple of 8 bytes.
+        """
+        output_file.write(block)
+        output_file.write(b'\0' * (-len(block) % 8))
+    
+    def get_table_from_file(self, file_path):
+        """
+        Opens the binary table file from file_path with mmap. Only the vocabulary is parsed, the arrays are used directly from the file when its words are the first words of self.vocabulary.
+        Otherwise the words are added to self.vocabulary and the arrays are changed to its word IDs. The table is compact after it's loaded. Returns the model name of the table.
+        """
+        with open(file_path, 'rb') as file:
+            file_map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        magic, version, name_length, top_words_count, quantization_bits, vocabulary_size, vocabulary_length, contexts_size = HEADER.unpack_from(file_map, 0)
+        
+        if magic != MAGIC:
+            raise ValueError(f'"{file_path}" is not a top words table file.')
+        if version != FILE_VERSION:
+            raise ValueError(f'"{file_path}" has version {version}, only version {FILE_VERSION} is supported.')
+        
+        offset = HEADER.size
+        
+        self.model_name = bytes(file_map[offset:offset + name_length]).decode('utf-8')
+        offset += name_length + (-name_length % 8)
+        
+        words = bytes(file_map[offset:offset + vocabulary_length]).decode('utf-8').split('\n') if vocabulary_size else []
+        offset += vocabulary_length + (-vocabulary_length % 8)
+        
+        self.top_words_count = top_words_count
+        self.quantization_bits = quantization_bits or None
+        
+        shape = (contexts_size, top_words_count)
+        score_dtype = np.float64 if self.quantization_bits is None else QUANTIZED_DTYPES[self.quantization_bits]
+        
+        contexts = np.frombuffer(file_map, dtype=np.int64, count=contexts_size, offset=offset)
+        offset += contexts.nbytes
+        
+        word_ids = np.frombuffer(file_map, dtype=np.uint32, count=contexts_size * top_words_count, offset=offset).reshape(shape)
+        offset += word_ids.nbytes + (-word_ids.nbytes % 8)
+        
+        scores = np.frombuffer(file_map, dtype=score_dtype, count=contexts_size * top_words_count, offset=offset).reshape(shape)
+        
+        if len(self.vocabulary) == 0:
+            self.vocabulary.set_words(words)
+        
+        if self.vocabulary.words[:len(words)] == words:
+            # Keep the mmap open while the arrays use it
+            self.file_map = file_map
+        else:
+            # Index is the word ID in the file and value is the word ID in self.vocabulary
+            new_ids = np.array([self.vocabulary.add_word(word) for word in words], dtype=np.int64)
+            
+            contexts, word_ids, scores = self.change_word_ids(contexts, word_ids, scores, new_ids)
+        
+        self.contexts = contexts
+        self.word_ids = word_ids
+        self.scores = scores
+        self.top_words = dict()
+        
+        return self.model_name
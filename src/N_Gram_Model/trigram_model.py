@@ -1,27 +1,57 @@
 '''
 Given a 2d list of sentence and all words in the sentence, it count all words, unigram, bigram, and trigram.
 "*" and "STOP" are special symbols to represents the start and end of a sentence and must be give when the class is initialized.
+Bigrams and trigrams are stored under packed integer keys made from the word IDs of the Vocabulary.
 '''
 
+from time import perf_counter
+
+import numpy as np
+
+from instrumentation import metrics
+
+from .successor_index import Successor_Index
+
+from .prefix_index import Prefix_Index
+
+from .vocabulary import Vocabulary, ID_BITS, ID_MASK
+
 class Trigram_Model:
-    def __init__(self, model_name="", start_symbol="<*>", end_symbol="<STOP>") -> None:
+    def __init__(self, model_name="", start_symbol="<*>", end_symbol="<STOP>", vocabulary=None) -> None:
         # Class variables
         self.model_name = model_name
         
         self.START_SYMBOL = start_symbol
         self.END_SYMBOL = end_symbol
         
+        # Vocabulary with the word IDs. Models that are added together with add_all_counts must share the same Vocabulary.
+        if vocabulary is None:
+            vocabulary = Vocabulary()
+        self.vocabulary = vocabulary
+        
+        self.START_ID = self.vocabulary.add_word(self.START_SYMBOL)
+        self.END_ID = self.vocabulary.add_word(self.END_SYMBOL)
+        
         # All words count including all "end_symbol"
         self.all_words_count = 0
         
-        # Keys are 'word word word' and values are counts
+        # Keys are the packed IDs of 'word word word' and values are counts
         self.trigram_count = dict()
         
-        # Keys are 'word word' and values are counts
+        # Keys are the packed IDs of 'word word' and values are counts
         self.bigram_count = dict()
         
         # Keys are 'word' and values are counts
         self.unigram_count = dict()
+        
+        # Successor_Index built from the counts. It's None until get_successor_index() is called or after the counts change.
+        self.successor_index = None
+        
+        # Prefix_Index with the words in alphabetical order. It's None until get_prefix_index() is called or after the counts change.
+        self.prefix_index = None
+        
+        # Top_Words_Table with the precomputed top words for every context. It's None until a table is added or after the counts change.
+        self.top_words_table = None
     
     def get_model_information(self):
         """ 
@@ -29,66 +59,140 @@ class Trigram_Model:
         list[0] = model_name
         list[1-3] = unigram, bigram, trigram
         list[4] = all_words_count
+        list[5] = vocabulary
         """
-        info = [self.model_name, self.unigram_count, self.bigram_count, self.trigram_count, self.all_words_count]
+        info = [self.model_name, self.unigram_count, self.bigram_count, self.trigram_count, self.all_words_count, self.vocabulary]
         
         return info
     
     def add_sentences_to_model(self, sentences):
         """
-        Takes a 2d list of all sentence and words. Counts and adds unigram, bigram, and trigram to the model.
+        Takes a 2d list or an iterator of all sentence and words, like Get_Sentences.iter_sentences(). Counts and adds unigram, bigram, and trigram to the model.
         """
+        self.clear_precomputed()
+        
+        if metrics.enabled:
+            self.add_timed_sentences_to_model(sentences)
+            return
+        
         for sentence in sentences:
             self.update_model_with_sentence(sentence)
     
+    def add_timed_sentences_to_model(self, sentences):
+        """
+        Same as add_sentences_to_model but adds the counting time, sentences, and tokens to the metrics. Only the time spent counting is timed, not the time spent getting the sentences from an iterator.
+        """
+        words_count = self.all_words_count
+        sentence_count = 0
+        seconds = 0
+        
+        for sentence in sentences:
+            start = perf_counter()
+            self.update_model_with_sentence(sentence)
+            seconds += perf_counter() - start
+            
+            sentence_count += 1
+        
+        metrics.observe('count_seconds', seconds)
+        metrics.add('sentences_counted', sentence_count)
+        metrics.add('tokens_counted', self.all_words_count - words_count)
+    
     def update_model_with_sentence(self, sentence):
         """
         Takes a list of words that represents one sentences.
         When calculating the trigram model adds "START_SYMBOL START_SYMBOL" to the start of the sentence.
         """
-        previous_word = self.START_SYMBOL
-        previous_2nd_word = self.START_SYMBOL
+        previous_word = self.START_ID
+        previous_2nd_word = self.START_ID
                 
         for index, word in enumerate(sentence):
+            word_id = self.vocabulary.add_word(word)
+            
+            # Use the vocabulary's word so every model shares the same string
+            word = self.vocabulary.words[word_id]
+            
             # Unigram counts and all words count(including all self.END_SYMBOL)
             self.all_words_count += 1
             self.unigram_count[word] = self.unigram_count.get(word, 0) + 1
             
             # Bigram and trigram counts
             if index == 0:
-                self.add_one_bigram_trigram(previous_2nd_word, previous_word, word)
+                self.add_one_bigram_trigram(previous_2nd_word, previous_word, word_id)
                 
-                previous_word = word
+                previous_word = word_id
             else:
-                self.add_one_bigram_trigram(previous_2nd_word, previous_word, word)
+                self.add_one_bigram_trigram(previous_2nd_word, previous_word, word_id)
                 
                 previous_2nd_word = previous_word
-                previous_word = word
+                previous_word = word_id
 
     def add_one_bigram_trigram(self, second_previous, previous, word):
-        bigram_key = f'{previous} {word}'
+        """
+        Takes the IDs of 3 words and adds one to the bigram "previous word" and the trigram "second_previous previous word".
+        """
+        bigram_key = (previous << ID_BITS) | word
         self.bigram_count[bigram_key] = self.bigram_count.get(bigram_key, 0) + 1
         
-        trigram_key = f'{second_previous} {previous} {word}'
+        trigram_key = (second_previous << (2 * ID_BITS)) | bigram_key
         self.trigram_count[trigram_key] = self.trigram_count.get(trigram_key, 0) + 1
     
     def add_all_counts(self, unigram_count, bigram_count, trigram_count, all_words_count):
         """
         Takes unigram_count, bigram_count, and trigram_count where key is the n-gram and value is the count.
+        The bigram and trigram keys must be packed with this model's vocabulary.
         Takes all_words_count which is int and is the count of all words.
         Adds all of these to the trigram model.
         """
         self.all_words_count += all_words_count
+        self.clear_precomputed()
         
-        for word, count in unigram_count.items():
-            self.unigram_count[word] = self.unigram_count.get(word, 0) + count
+        metrics.add('n_grams_merged', len(unigram_count) + len(bigram_count) + len(trigram_count))
         
-        for bigram, count in bigram_count.items():
-            self.bigram_count[bigram] = self.bigram_count.get(bigram, 0) + count
-        
-        for trigram, count in trigram_count.items():
-            self.trigram_count[trigram] = self.trigram_count.get(trigram, 0) + count
+        with metrics.timer('merge'):
+            for word, count in unigram_count.items():
+                self.unigram_count[word] = self.unigram_count.get(word, 0) + count
+            
+            for bigram, count in bigram_count.items():
+                self.bigram_count[bigram] = self.bigram_count.get(bigram, 0) + count
+            
+            for trigram, count in trigram_count.items():
+                self.trigram_count[trigram] = self.trigram_count.get(trigram, 0) + count
             
+    def remove_all_counts(self, unigram_count, bigram_count, trigram_count, all_words_count):
+        """
+        Same as add_all_counts but subtracts the counts from the trigram model. N-grams with a count of 0 are removed.
+        """
+        self.all_words_count -= all_words_count
+        self.clear_precomputed()
+        
+        for n_gram_count, other_n_gram_count in ((self.unigram_count, unigram_count), (self.bigram_count, bigram_count), (self.trigram_count, trigram_count)):
+            for n_gram, count in other_n_gram_count.items():
+                new_count = n_gram_count.get(n_gram, 0) - count
+                
+                if new_count > 0:
+                    n_gram_count[n_gram] = new_count
+                else:
+                    n_gram_count.pop(n_gram, None)
+    
+    def add_file_counts(self, file_counts):
+        """
+        Takes the counts of one file from count_file(), or any counts in the same format, where the keys are packed with another vocabulary.
+        Changes the word IDs to the IDs of this model's vocabulary and adds the counts to the model.
+        """
+        words, unigram_count, bigram_keys, bigram_counts, trigram_keys, trigram_counts, all_words_count = file_counts
+        
+        # The index is the word ID in the file and the value is the word ID in this model's vocabulary
+        new_ids = np.array([self.vocabulary.add_word(word) for word in words], dtype=np.int64)
+        
+        bigram_keys = (new_ids[bigram_keys >> ID_BITS] << ID_BITS) | new_ids[bigram_keys & ID_MASK]
+        trigram_keys = (new_ids[trigram_keys >> (2 * ID_BITS)] << (2 * ID_BITS)) | (new_ids[(trigram_keys >> ID_BITS) & ID_MASK] << ID_BITS) | new_ids[trigram_keys & ID_MASK]
+        
+        # Use the vocabulary's words so every model shares the same string
+        vocabulary_words = self.vocabulary.words
+        unigram_count = {vocabulary_words[self.vocabulary.word_ids[word]]: count for word, count in unigram_count.items()}
+        
+        self.add_all_counts(unigram_count, dict(zip(bigram_keys.tolist(), bigram_counts.tolist())), dict(zip(trigram_keys.tolist(), trigram_counts.tolist())), all_words_count)
+    
     def save_model_to_file(self, paths_to_all_files):
         """
         Saves this trigram model to a txt file based on path_to_file path.
@@ -121,17 +225,19 @@ class Trigram_Model:
             output_file.write(line)
         
         for bigram, count in self.bigram_count.items():
-            line = bigram + '\t' + str(count) + '\n'
+            line = self.vocabulary.words_from_key(bigram, 2) + '\t' + str(count) + '\n'
             output_file.write(line)
         
         for trigram, count in self.trigram_count.items():
-            line = trigram + '\t' + str(count) + '\n'
+            line = self.vocabulary.words_from_key(trigram, 3) + '\t' + str(count) + '\n'
             output_file.write(line)
             
     def get_model_from_file(self, file_path):
         """
         Gets the trigram model from the file_path. Adds the unigram, bigram, trigram, model name, and model word count from the file to the current Trigram_Model object.
         """
+        self.clear_precomputed()
+        
         with open(file_path) as file:
             for line in file:
                 self.model_from_file(line)
@@ -154,13 +260,16 @@ class Trigram_Model:
             
         # Add unigram, n_gram[0] = word and line [1] = count
         elif line_length == 2:
-            self.unigram_count[n_gram[0]] = self.unigram_count.get(n_gram[0], 0) + int(line[1])
-        # Add bigram, n_gram[0] = bigram, and line [2] = count
+            word = self.vocabulary.words[self.vocabulary.add_word(n_gram[0])]
+            self.unigram_count[word] = self.unigram_count.get(word, 0) + int(line[1])
+        # Add bigram, line[0:2] = bigram, and line [2] = count
         elif line_length == 3:
-            self.bigram_count[n_gram[0]] = self.bigram_count.get(n_gram[0], 0) + int(line[2])
-        # Add trigram, n_gram[0] trigram, and line [3] = count
+            bigram_key = self.vocabulary.key_from_words(line[0:2])
+            self.bigram_count[bigram_key] = self.bigram_count.get(bigram_key, 0) + int(line[2])
+        # Add trigram, line[0:3] trigram, and line [3] = count
         elif line_length == 4:
-            self.trigram_count[n_gram[0]] = self.trigram_count.get(n_gram[0], 0) + int(line[3])
+            trigram_key = self.vocabulary.key_from_words(line[0:3])
+            self.trigram_count[trigram_key] = self.trigram_count.get(trigram_key, 0) + int(line[3])
             
     def fix_n_gram_count(self):
         """
@@ -169,8 +278,124 @@ class Trigram_Model:
         """
         end_symbol_count = self.unigram_count[self.END_SYMBOL]
         
-        bigram_key = f'{self.START_SYMBOL} {self.START_SYMBOL}'
+        bigram_key = self.vocabulary.bigram_key(self.START_ID, self.START_ID)
         self.bigram_count[bigram_key] = end_symbol_count
         
         unigram_key = f'{self.START_SYMBOL}'
         self.unigram_count[unigram_key] = end_symbol_count
+        
+        self.clear_precomputed()
+    
+    def prune(self, min_unigram_count=1, min_bigram_count=1, min_trigram_count=1, max_vocabulary_size=None, unknown_word='<UNK>'):
+        """
+        Removes the rare n-grams so the model is smaller. Must be called after fix_n_gram_count.
+        Words with a count lower than min_unigram_count, and the words after the "max_vocabulary_size" most common words, are replaced with the unknown_word. Their unigram, bigram, and trigram counts are added to the counts of the unknown_word, so the counts used as denominators by Calculate_Linear_Interpolation still add up.
+        Then bigrams with a count lower than min_bigram_count and trigrams with a count lower than min_trigram_count are removed. A bigram is kept if it's the first 2 words of a trigram that is kept, because it's the denominator of that trigram.
+        The START_SYMBOL and END_SYMBOL are never replaced or removed, and all_words_count doesn't change.
+        
+        Returns a dict() with the number of unigrams, bigrams, and trigrams before and after.
+        """
+        report = {'before': self.get_n_gram_sizes()}
+        
+        # The most common words are kept, words with the same count are kept in the same order as the unigram
+        all_words = [word for word in sorted(self.unigram_count, key=self.unigram_count.__getitem__, reverse=True) if word not in (self.START_SYMBOL, self.END_SYMBOL)]
+        
+        kept_words = [word for word in all_words if self.unigram_count[word] >= min_unigram_count]
+        if max_vocabulary_size is not None:
+            kept_words = kept_words[:max_vocabulary_size]
+        
+        if len(kept_words) < len(all_words):
+            self.replace_words(set(all_words).difference(kept_words), unknown_word)
+        
+        self.trigram_count = {trigram: count for trigram, count in self.trigram_count.items() if count >= min_trigram_count}
+        
+        # The denominators of the trigrams that are kept, and "START_SYMBOL START_SYMBOL" from fix_n_gram_count
+        all_contexts = {trigram >> ID_BITS for trigram in self.trigram_count}
+        all_contexts.add(self.vocabulary.bigram_key(self.START_ID, self.START_ID))
+        
+        self.bigram_count = {bigram: count for bigram, count in self.bigram_count.items() if count >= min_bigram_count or bigram in all_contexts}
+        
+        self.clear_precomputed()
+        
+        report['after'] = self.get_n_gram_sizes()
+        
+        return report
+    
+    def replace_words(self, replaced_words, unknown_word='<UNK>'):
+        """
+        Replaces every word in replaced_words with the unknown_word in the unigram, bigram, and trigram counts. The counts of the n-grams that are the same after the words are replaced are added together.
+        """
+        unknown_id = self.vocabulary.add_word(unknown_word)
+        unknown_word = self.vocabulary.words[unknown_id]
+        
+        unigram_count = dict()
+        for word, count in self.unigram_count.items():
+            if word in replaced_words:
+                word = unknown_word
+            
+            unigram_count[word] = unigram_count.get(word, 0) + count
+        
+        self.unigram_count = unigram_count
+        
+        # The index is the word ID and the value is the new word ID
+        new_ids = np.arange(len(self.vocabulary), dtype=np.int64)
+        new_ids[[self.vocabulary.word_ids[word] for word in replaced_words]] = unknown_id
+        
+        self.bigram_count = self.replace_word_ids(self.bigram_count, new_ids, 2)
+        self.trigram_count = self.replace_word_ids(self.trigram_count, new_ids, 3)
+        
+        self.clear_precomputed()
+    
+    def replace_word_ids(self, n_gram_count, new_ids, n):
+        """
+        Takes a dict() with packed n-gram keys and counts, and an array where the index is the word ID and the value is the new word ID.
+        Returns a new dict() with the keys packed with the new IDs. The counts of the keys that are the same with the new IDs are added together.
+        """
+        if not n_gram_count: return dict()
+        
+        keys = np.fromiter(n_gram_count.keys(), dtype=np.int64, count=len(n_gram_count))
+        counts = np.fromiter(n_gram_count.values(), dtype=np.int64, count=len(n_gram_count))
+        
+        new_keys = np.zeros_like(keys)
+        for position in range(n):
+            shift = position * ID_BITS
+            new_keys |= new_ids[(keys >> shift) & ID_MASK] << shift
+        
+        unique_keys, inverse = np.unique(new_keys, return_inverse=True)
+        
+        new_counts = np.zeros(len(unique_keys), dtype=np.int64)
+        np.add.at(new_counts, inverse, counts)
+        
+        return dict(zip(unique_keys.tolist(), new_counts.tolist()))
+    
+    def get_n_gram_sizes(self):
+        """
+        Returns a dict() with the number of unigrams, bigrams, and trigrams in the model.
+        """
+        return {'unigrams': len(self.unigram_count), 'bigrams': len(self.bigram_count), 'trigrams': len(self.trigram_count)}
+    
+    def clear_precomputed(self):
+        """
+        Removes the successor index, the prefix index, and the top words table. Called when the counts change.
+        """
+        self.successor_index = None
+        self.prefix_index = None
+        self.top_words_table = None
+    
+    def get_successor_index(self):
+        """
+        Returns the Successor_Index for this model. The index is only built once and is built again after the counts change.
+        """
+        if self.successor_index is None:
+            self.successor_index = Successor_Index(self.unigram_count, self.bigram_count, self.trigram_count, self.vocabulary)
+        
+        return self.successor_index
+    
+    def get_prefix_index(self):
+        """
+        Returns the Prefix_Index for this model. The index is only built once and is built again after the counts change.
+        """
+        if self.prefix_index is None:
+            self.prefix_index = Prefix_Index(self.unigram_count, self.vocabulary, self.get_successor_index())
+        
+        return self.prefix_index
@@ -0,0 +1,75 @@
+'''
+Splits the text of a user into sentences one input at a time. Only the new words are finalized, the sentences that were already split are kept, so every input costs the same however long the text is.
+self.sentences has the same sentences as Get_Sentences.sentences_from_user() for all the text so far. Every sentence ends with END_SYMBOL, also the unfinished sentence at the end.
+self.sentences example = [
+                            ["This", "is", "one", "sentence", "<STOP>"],
+                            ["This", "is", "<STOP>"]
+                         ]
+'''
+
+from .get_sentences import Get_Sentences
+
+class User_Sentences:
+    def __init__(self, END_SYMBOL) -> None:
+        self.END_SYMBOL = END_SYMBOL
+        
+        # Finalizes the words the same way as the corpus files
+        self.get_sentences = Get_Sentences(END_SYMBOL=END_SYMBOL)
+        
+        # 2d list with all the sentences and words so far
+        self.sentences = list()
+        
+        # True if the last sentence in self.sentences isn't finished
+        self.sentence_is_open = False
+    
+    def add_text(self, user_text):
+        """
+        Takes the next words of the user. The first word doesn't continue the last word of the previous text.
+        The sentences in self.sentences are changed in place. Returns the number of sentences that were finished by the new words.
+        """
+        finished_count = 0
+        
+        for word in user_text.split():
+            new_words = []
+            sentence_end = self.get_sentences.add_word(new_words, word)
+            
+            if new_words:
+                self.add_to_open_sentence(new_words[0])
+            
+            if sentence_end and self.sentence_is_open:
+                self.sentence_is_open = False
+                finished_count += 1
+        
+        return finished_count
+    
+    def add_to_open_sentence(self, word):
+        """
+        Adds the finalized word to the end of the unfinished sentence, before its END_SYMBOL. Starts a new sentence if the last one is finished.
+        """
+        if self.sentence_is_open:
+            self.sentences[-1].insert(-1, word)
+        else:
+            self.sentences.append([word, self.END_SYMBOL])
+            self.sentence_is_open = True
+    
+    def get_finished_count(self):
+        return len(self.sentences) - self.sentence_is_open
+    
+    def get_finished_sentences(self):
+        """
+        Returns a list with the finished sentences.
+        """
+        return self.sentences[:-1] if self.sentence_is_open else self.sentences[:]
+    
+    def get_open_sentence(self):
+        """
+        Returns a list with the words of the unfinished sentence, without the END_SYMBOL. It's empty if the last sentence is finished.
+        """
+        return self.sentences[-1][:-1] if self.sentence_is_open else []
+    
+    def reset(self):
+        """
+        Removes all the sentences.
+        """
+        self.sentences = list()
+        self.sentence_is_open = False
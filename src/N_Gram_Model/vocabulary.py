@@ -0,0 +1,101 @@
+'''
+Maps every word to an integer ID. All the trigram models that are built or loaded together share one Vocabulary, so a word has the same ID in every model.
+Bigrams and trigrams are stored under one packed integer key where every word ID takes ID_BITS bits.
+self.words example = ["<*>", "<STOP>", "This", "is"]
+self.word_ids example = {"<*>": 0, "<STOP>": 1, "This": 2, "is": 3}
+bigram key of "This is" = (2 << ID_BITS) | 3
+'''
+
+# Number of bits for one word ID. A trigram key takes 3 * ID_BITS = 63 bits.
+ID_BITS = 21
+MAX_WORDS = 1 << ID_BITS
+ID_MASK = MAX_WORDS - 1
+
+class Vocabulary:
+    def __init__(self) -> None:
+        # List of all words where the index is the word ID
+        self.words = list()
+        
+        # Keys are words and values are the word ID
+        self.word_ids = dict()
+    
+    def __len__(self):
+        return len(self.words)
+    
+    def add_word(self, word):
+        """
+        Returns the ID of the word. Adds the word to the vocabulary if it's a new word.
+        """
+        word_id = self.word_ids.get(word)
+        
+        if word_id is None:
+            word_id = len(self.words)
+            
+            if word_id >= MAX_WORDS:
+                raise ValueError(f'The vocabulary can only have {MAX_WORDS} words.')
+            
+            self.word_ids[word] = word_id
+            self.words.append(word)
+        
+        return word_id
+    
+    def set_words(self, words):
+        """
+        Replaces all the words in the vocabulary. The ID of every word is its index in the words list.
+        """
+        self.words = list(words)
+        self.word_ids = {word: word_id for word_id, word in enumerate(self.words)}
+    
+    def get_id(self, word):
+        """
+        Returns the ID of the word. Returns None if the word isn't in the vocabulary.
+        """
+        return self.word_ids.get(word)
+    
+    def get_word(self, word_id):
+        return self.words[word_id]
+    
+    def bigram_key(self, word2_id, word1_id):
+        """
+        Returns the packed key of the bigram "word2 word1"
+        """
+        return (word2_id << ID_BITS) | word1_id
+    
+    def trigram_key(self, word2_id, word1_id, word_id):
+        """
+        Returns the packed key of the trigram "word2 word1 word"
+        """
+        return (word2_id << (2 * ID_BITS)) | (word1_id << ID_BITS) | word_id
+    
+    def split_bigram_key(self, bigram_key):
+        """
+        Returns the IDs (word2_id, word1_id) of the bigram key.
+        """
+        return bigram_key >> ID_BITS, bigram_key & ID_MASK
+    
+    def split_trigram_key(self, trigram_key):
+        """
+        Returns the IDs (word2_id, word1_id, word_id) of the trigram key.
+        """
+        return trigram_key >> (2 * ID_BITS), (trigram_key >> ID_BITS) & ID_MASK, trigram_key & ID_MASK
+    
+    def key_from_words(self, words):
+        """
+        Takes a list of 2 or 3 words and returns the packed key. Adds the words to the vocabulary if they are new words.
+        """
+        key = 0
+        for word in words:
+            key = (key << ID_BITS) | self.add_word(word)
+        
+        return key
+    
+    def words_from_key(self, key, n):
+        """
+        Takes a packed key of a n-gram. Returns the words of the n-gram as 'word word word'.
+        """
+        word_ids = []
+        for _ in range(n):
+            word_ids.append(key & ID_MASK)
+            key >>= ID_BITS
+        
+        return ' '.join(self.words[word_id] for word_id in reversed(word_ids))
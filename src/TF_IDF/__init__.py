@@ -2,4 +2,10 @@ from .documents_frequency import Documents_Frequency
 
 from .tf_idf import TF_IDF
 
+from .tf_idf_index import TF_IDF_Index
+
+from .running_query_counts import Running_Query_Counts
+
+from .document_matrix import Document_Matrix
+
 from .cosine_similarity import Cosine_Similarity
\ No newline at end of file
@@ -6,7 +6,7 @@ class Cosine_Similarity:
     
     def calculate_similarity(self, all_document_names, all_document_frequency):
         """
-        Takes a document frequency matrix. Compares all the documents to the last document. Returns the document that is most similar to the last document based on all_document_names. 
+        Takes document frequency postings. Compares all the documents to the last document. Returns the document that is most similar to the last document based on all_document_names. 
         """
         if not all_document_frequency: return
         
@@ -24,7 +24,7 @@ class Cosine_Similarity:
     
     def similarity(self, all_document_frequency, doc_1, doc_2):
         """
-        Takes document frequency matrix. Also takes the index of 2 different documents in the document frequency matrix.
+        Takes document frequency postings. Also takes the index of 2 different documents in the document frequency postings.
         
         Calculates the cosine similarity between the two documents and returns the result.
         """
@@ -33,15 +33,9 @@ class Cosine_Similarity:
         d2_squared = 0
 
         for _, doc_count in all_document_frequency.items():
-            if len(doc_count) > doc_1:
-                doc1_count = doc_count[doc_1]
-            else:
-                doc1_count = 0
-            
-            if len(doc_count) > doc_2:
-                doc2_count = doc_count[doc_2]
-            else:
-                doc2_count = 0
+            # Documents that don't contain the word have a count of 0
+            doc1_count = doc_count.get(doc_1, 0)
+            doc2_count = doc_count.get(doc_2, 0)
             
             numerator += (doc1_count * doc2_count)
             d1_squared += doc1_count ** 2
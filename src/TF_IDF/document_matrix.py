@@ -0,0 +1,187 @@
+'''
+Sparse NumPy matrix of the documents of a Documents_Frequency. Finds the most similar document for many user texts at once.
+Every user text is scored as if it was added as one more document, the same as TF_IDF_Index. The IDF of a word in a user text is log2((D + 1) / (document count + 1)), which is the same for every text, so all the texts can be scored together.
+The matrix is stored in CSR arrays with one row for every word: only the documents that contain the word are stored, the same as the {doc: count} postings.
+The squared norm of a document only changes for the words that are also in the user text, so the changes are stored in the same CSR arrays and only the postings of the user text's words are read.
+self.word_rows example = {"virus": 0, "government": 1}
+self.indptr example = [0, 2, 3]         the postings of row 0 are at [0, 2) and the postings of row 1 are at [2, 3)
+self.indices example = [0, 4, 4]        document numbers
+self.data example = [0.8, 1.2, 2.1]     TF-IDF weights
+'''
+
+import numpy as np
+
+from instrumentation import metrics
+
+from .tf_idf import TF_IDF
+
+class Document_Matrix:
+    def __init__(self, document_frequency) -> None:
+        # The Documents_Frequency with the document counts. It isn't changed by the matrix.
+        self.document_frequency = document_frequency
+        
+        self.tf_idf = TF_IDF()
+        
+        # Number of documents including one user text
+        self.total_number_of_documents = document_frequency.total_number_of_documents + 1
+        
+        # Keys are words and values are the row of the word in the matrices
+        self.word_rows = dict()
+        
+        # IDF of every word for a user text that contains the word
+        self.query_idf = None
+        
+        # CSR arrays of the (words x documents) matrix. The postings of a row are at [indptr[row], indptr[row + 1]) in indices and data.
+        self.indptr = None
+        
+        # Document number of every posting
+        self.indices = None
+        
+        # TF-IDF weight of the document with query_idf for every posting
+        self.data = None
+        
+        # Change in the document's squared norm when a user text contains the word, for every posting
+        self.squared_norm_changes = None
+        
+        # Squared TF-IDF norm of every document when the user text doesn't contain any of its words
+        self.squared_norms = None
+        
+        self.build_matrix()
+    
+    def build_matrix(self):
+        """
+        Builds the CSR arrays from the document frequency postings.
+        """
+        all_document_frequency = self.document_frequency.all_document_frequency
+        bag_of_words_and_count = self.document_frequency.bag_of_words_and_document_count
+        
+        number_of_words = len(all_document_frequency)
+        number_of_documents = self.document_frequency.total_number_of_documents
+        
+        self.query_idf = np.zeros(number_of_words)
+        self.squared_norms = np.zeros(number_of_documents)
+        
+        indptr = [0] * (number_of_words + 1)
+        indices = []
+        data = []
+        squared_norm_changes = []
+        
+        for row, (word, counts_per_doc) in enumerate(all_document_frequency.items()):
+            self.word_rows[word] = row
+            
+            document_count = bag_of_words_and_count[word]
+            
+            idf_weight = self.tf_idf.idf_weight(self.total_number_of_documents, document_count + 1)
+            base_idf_weight = self.tf_idf.idf_weight(self.total_number_of_documents, document_count)
+            
+            self.query_idf[row] = idf_weight
+            
+            for doc_number, count in counts_per_doc.items():
+                tf_weight = self.tf_idf.tf_weight(count)
+                
+                indices.append(doc_number)
+                data.append(tf_weight * idf_weight)
+                squared_norm_changes.append((tf_weight * idf_weight) ** 2 - (tf_weight * base_idf_weight) ** 2)
+                
+                self.squared_norms[doc_number] += (tf_weight * base_idf_weight) ** 2
+            
+            indptr[row + 1] = len(indices)
+        
+        self.indptr = np.array(indptr, dtype=np.int64)
+        self.indices = np.array(indices, dtype=np.int32)
+        self.data = np.array(data, dtype=np.float64)
+        self.squared_norm_changes = np.array(squared_norm_changes, dtype=np.float64)
+    
+    def get_postings(self, rows):
+        """
+        Takes an array of word rows. Returns the positions of all their postings in the CSR arrays and the number of postings of every row.
+        """
+        starts = self.indptr[rows]
+        lengths = self.indptr[rows + 1] - starts
+        
+        # Every posting is the start of its row plus its position in the row
+        row_offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        
+        return row_offsets + np.arange(len(row_offsets)), lengths
+    
+    def calculate_similarities(self, all_query_counts):
+        """
+        Takes a list with the word counts of every user text from Documents_Frequency.get_query_counts().
+        Returns a (texts x documents) NumPy array with the cosine similarity between every user text and every document.
+        The user texts are kept sparse, as lists of (text, word row, weight), and the product with the documents only reads the postings of their words.
+        """
+        query_index = []
+        query_rows = []
+        query_weights = []
+        query_squared_norms = np.zeros(len(all_query_counts))
+        
+        # Words that aren't in any document are in 0 documents before the user text is added
+        unknown_word_idf = self.tf_idf.idf_weight(self.total_number_of_documents, 1)
+        
+        for query, query_counts in enumerate(all_query_counts):
+            for word, query_count in query_counts.items():
+                row = self.word_rows.get(word)
+                
+                idf_weight = unknown_word_idf if row is None else self.query_idf[row]
+                
+                query_weight = self.tf_idf.tf_weight(query_count) * idf_weight
+                query_squared_norms[query] += query_weight ** 2
+                
+                if row is None: continue
+                
+                query_index.append(query)
+                query_rows.append(row)
+                query_weights.append(query_weight)
+        
+        number_of_documents = len(self.squared_norms)
+        
+        # Dot products and squared document norms for every user text, as flat (texts x documents) arrays
+        numerators = np.zeros(len(all_query_counts) * number_of_documents)
+        document_squared_norms = np.tile(self.squared_norms, len(all_query_counts))
+        
+        if query_index:
+            positions, lengths = self.get_postings(np.array(query_rows, dtype=np.int64))
+            
+            # Cell of every posting in the flat (texts x documents) arrays
+            cells = np.repeat(np.array(query_index, dtype=np.int64), lengths) * number_of_documents + self.indices[positions]
+            
+            numerators += np.bincount(cells, weights=np.repeat(query_weights, lengths) * self.data[positions], minlength=len(numerators))
+            document_squared_norms += np.bincount(cells, weights=self.squared_norm_changes[positions], minlength=len(numerators))
+        
+        numerators = numerators.reshape(len(all_query_counts), number_of_documents)
+        document_squared_norms = document_squared_norms.reshape(len(all_query_counts), number_of_documents)
+        
+        denominators = np.sqrt(np.maximum(document_squared_norms, 0)) * np.sqrt(query_squared_norms)[:, None]
+        
+        similarities = np.zeros_like(numerators)
+        np.divide(numerators, denominators, out=similarities, where=(numerators != 0) & (denominators != 0))
+        
+        return similarities
+    
+    def find_most_similar_documents(self, all_query_counts, top_k=3):
+        """
+        Takes a list with the word counts of every user text.
+        Returns a list with one (most similar document name, [(document name, similarity)]) tuple for every user text, where the list has the top "top_k" documents.
+        Same as Cosine_Similarity, if documents have the same similarity the last one comes first.
+        """
+        if not all_query_counts: return []
+        
+        all_documents_name = self.document_frequency.all_documents_name
+        number_of_documents = len(self.squared_norms)
+        
+        metrics.add('routing_queries', len(all_query_counts))
+        
+        with metrics.timer('batch_routing'):
+            similarities = self.calculate_similarities(all_query_counts)
+        
+        # Sort the documents from the last one to the first one so the last one comes first when the similarities are the same
+        reversed_order = np.argsort(-similarities[:, ::-1], axis=1, kind='stable')[:, :top_k]
+        top_documents = number_of_documents - 1 - reversed_order
+        
+        results = []
+        for query, documents in enumerate(top_documents):
+            top_scores = [(all_documents_name[document], float(similarities[query, document])) for document in documents]
+            
+            results.append((top_scores[0][0] if top_scores else None, top_scores))
+        
+        return results
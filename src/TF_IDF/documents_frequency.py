@@ -3,12 +3,18 @@
 #! - Add stops words in the initialized_stopwords() method.
 '''
 
+from .tf_idf_index import TF_IDF_Index
+
+from .document_matrix import Document_Matrix
+
 class Documents_Frequency:
     def __init__(self, end_symbol="<STOP>") -> None:
         """
         Tracks of the frequency of words in each document.
         """
-        # Keys are all unique words. Values is a list with the index represents one document and elements representing the number of times the words appear in that document. 
+        # Keys are all unique words. Values is a dict where the keys are the index of a document and values are the number of times the word appears in that document.
+        # Documents that don't contain the word aren't stored.
+        # self.all_document_frequency example = {"virus": {0: 12, 3: 2}}
         self.all_document_frequency = dict()
         
         # Keys are all unique words and values are how many documents contain that word
@@ -22,6 +28,12 @@ class Documents_Frequency:
         self.total_number_of_documents = 0
         self.all_documents_name = list()
         self.END_SYMBOL = end_symbol
+        
+        # TF_IDF_Index built from the documents. It's None until get_tf_idf_index() is called or after the documents change.
+        self.tf_idf_index = None
+        
+        # Document_Matrix built from the documents. It's None until get_document_matrix() is called or after the documents change.
+        self.document_matrix = None
     
     def add_one_document(self, document_name, document):
         '''
@@ -29,6 +41,7 @@ class Documents_Frequency:
         '''
         if not document: return
         
+        self.clear_precomputed()
         added_to_bag = set()
         
         # Iterate over all words in the document
@@ -51,12 +64,14 @@ class Documents_Frequency:
         '''
         if not self.all_documents_name: return
 
+        self.clear_precomputed()
         self.all_documents_name.pop()
         self.total_number_of_documents -= 1
         
         # Loop through all words and remove the last document's count.
+        last_document = self.total_number_of_documents
         for word, count_per_doc in self.all_document_frequency.items():
-            user_word_count = count_per_doc.pop()
+            user_word_count = count_per_doc.pop(last_document, 0)
             if user_word_count == 0: continue
             
             # If there was a word count, then we update bag_of_words_and_document_count by decreasing it by one.
@@ -72,15 +87,88 @@ class Documents_Frequency:
             self.all_document_frequency.pop(word, None)
             self.bag_of_words_and_document_count.pop(word, None)
             
-    def add_word_to_model(self, word, added_to_bag, document):
+    def update_document(self, document_name, document):
+        '''
+        Takes the name and the new unigram count of a document. Replaces the counts of the document, or adds it as a new document if it isn't in the model.
+        '''
+        if document_name not in self.all_documents_name:
+            self.add_one_document(document_name, document)
+            return
+        
+        self.clear_precomputed()
+        document_index = self.all_documents_name.index(document_name)
+        
+        self.remove_document_counts(document_index)
+        
+        # Add the new counts at the same document index
+        added_to_bag = set()
+        for word in document:
+            self.add_word_to_model(word, added_to_bag, document, document_index)
+    
+    def remove_document(self, document_name):
+        '''
+        Removes the document from the model. The documents after it move down by one index.
+        '''
+        if document_name not in self.all_documents_name: return
+        
+        self.clear_precomputed()
+        document_index = self.all_documents_name.index(document_name)
+        
+        self.remove_document_counts(document_index)
+        
+        for count_per_doc in self.all_document_frequency.values():
+            if any(document > document_index for document in count_per_doc):
+                moved_counts = {(document - 1 if document > document_index else document): count for document, count in count_per_doc.items()}
+                
+                count_per_doc.clear()
+                count_per_doc.update(moved_counts)
+        
+        self.all_documents_name.pop(document_index)
+        self.total_number_of_documents -= 1
+    
+    def remove_document_counts(self, document_index):
+        '''
+        Removes the counts of the document at document_index from all words. Words that aren't in any document anymore are removed.
+        '''
+        words_to_remove = []
+        for word, count_per_doc in self.all_document_frequency.items():
+            if count_per_doc.pop(document_index, 0) == 0: continue
+            
+            self.bag_of_words_and_document_count[word] = self.bag_of_words_and_document_count.get(word, 1) - 1
+            
+            if self.bag_of_words_and_document_count[word] == 0:
+                words_to_remove.append(word)
+        
+        for word in words_to_remove:
+            self.all_document_frequency.pop(word, None)
+            self.bag_of_words_and_document_count.pop(word, None)
+    
+    def prune(self, min_word_count=1):
+        '''
+        Removes the words that appear less than min_word_count times in all the documents together. Returns the number of words that were removed.
+        '''
+        words_to_remove = [word for word, count_per_doc in self.all_document_frequency.items() if sum(count_per_doc.values()) < min_word_count]
+        
+        for word in words_to_remove:
+            self.all_document_frequency.pop(word, None)
+            self.bag_of_words_and_document_count.pop(word, None)
+        
+        if words_to_remove:
+            self.clear_precomputed()
+        
+        return len(words_to_remove)
+    
+    def add_word_to_model(self, word, added_to_bag, document, document_index=None):
         """
-        Adds one word to the model if it's a valid word.
+        Adds one word to the model if it's a valid word. The word is added to the document at document_index, or to a new last document if it's None.
         """
-        # Skip words that won't be useful for TF-IDF calculation
-        if word == self.END_SYMBOL or word in self.stop_words or len(word) <= 1:
-            return
+        if document_index is None:
+            document_index = self.total_number_of_documents
         
-        processed_word = word.lower()
+        processed_word = self.get_processed_word(word)
+        
+        # Skip words that won't be useful for TF-IDF calculation
+        if processed_word is None: return
         
         # Update bag_of_words_and_document_count.
         if processed_word not in added_to_bag:
@@ -91,39 +179,82 @@ class Documents_Frequency:
         # Update document frequency
         if processed_word in self.all_document_frequency:
             doc_word_count = self.all_document_frequency[processed_word]
-
-            while len(doc_word_count) < self.total_number_of_documents + 1:
-                doc_word_count.append(0)
-
-            doc_word_count[self.total_number_of_documents] += document[word]
         else:
-            doc_word_count = []
-            
-            for _ in range(self.total_number_of_documents + 1):
-                doc_word_count.append(0)
+            doc_word_count = {}
+            self.all_document_frequency[processed_word] = doc_word_count
+        
+        doc_word_count[document_index] = doc_word_count.get(document_index, 0) + document[word]
+    
+    def get_processed_word(self, word):
+        """
+        Returns the word as it's stored in the model. Returns None if the word won't be useful for TF-IDF calculation.
+        """
+        if word == self.END_SYMBOL or word in self.stop_words or len(word) <= 1:
+            return
+        
+        return word.lower()
+    
+    def get_query_counts(self, document):
+        """
+        Takes the unigram count of a document that isn't added to the model, like the user's sentences.
+        Returns a dict where keys are the processed words and values are how many times they appear in the document.
+        """
+        query_counts = {}
+        
+        for word, count in document.items():
+            processed_word = self.get_processed_word(word)
+            if processed_word is None: continue
             
-            doc_word_count[self.total_number_of_documents] += document[word]
+            query_counts[processed_word] = query_counts.get(processed_word, 0) + count
         
-        self.all_document_frequency[processed_word] = doc_word_count
+        return query_counts
+    
+    def get_tf_idf_index(self):
+        """
+        Returns the TF_IDF_Index of the documents. The index is only built once and is built again after the documents change.
+        """
+        if self.tf_idf_index is None:
+            self.tf_idf_index = TF_IDF_Index(self)
+        
+        return self.tf_idf_index
+    
+    def get_document_matrix(self):
+        """
+        Returns the Document_Matrix of the documents. The matrix is only built once and is built again after the documents change.
+        """
+        if self.document_matrix is None:
+            self.document_matrix = Document_Matrix(self)
+        
+        return self.document_matrix
+    
+    def clear_precomputed(self):
+        """
+        Removes the TF_IDF_Index and the Document_Matrix. Called when the documents change.
+        """
+        self.tf_idf_index = None
+        self.document_matrix = None
     
     def finalize_document_frequency(self):
         """
-        Finalize the model by adding 0 to all_document_frequency values until len(values) < total_number_of_documents.
+        Finalize the model. Documents that don't contain a word aren't stored, so there is nothing to add.
         """
-        for word in self.all_document_frequency:
-            word_count_in_doc = self.all_document_frequency[word]
-
-            while len(word_count_in_doc) < self.total_number_of_documents:
-                    word_count_in_doc.append(0)
+        return
+    
+    def get_counts_per_document(self, word):
+        """
+        Returns a list with the count of the word in every document, including the documents that don't contain the word.
+        """
+        count_per_doc = self.all_document_frequency.get(word, {})
+        
+        return [count_per_doc.get(document, 0) for document in range(self.total_number_of_documents)]
     
     def print_document_frequency(self):
         """
         Prints the current model's information.
         """
-        self.finalize_document_frequency()
         print("\n\tDocument Frequency: \t", self.all_documents_name)
         for word in self.all_document_frequency:
-            print("\t\t", word, "\t\t", self.all_document_frequency[word])
+            print("\t\t", word, "\t\t", self.get_counts_per_document(word))
     
     
     def initialized_stopwords(self):
@@ -141,10 +272,10 @@ class Documents_Frequency:
         """
         Saves the document frequency and bag_and_count model to their respective file paths. Also adds the total number of documents and all_documents_name to the end of the bag_and_count file.
         """
-        # Create a file and save the document frequency to the document_frequency_model_output_path
+        # Create a file and save the document frequency to the document_frequency_model_output_path. Every count is saved as "document_index:count".
         with open(document_frequency_model_output_path, 'w') as output_file:
             for word, count_per_doc in self.all_document_frequency.items():
-                cpd_str = " ".join(str(c) for c in count_per_doc)
+                cpd_str = " ".join(f'{document}:{c}' for document, c in count_per_doc.items())
                 line = word + '\t' + cpd_str + '\n'
                 output_file.write(line)
         
@@ -171,22 +302,40 @@ class Documents_Frequency:
     def get_document_frequency_from_file(self, file_path):
         """
         Gets the document frequency from the file_path. Adds the document frequency model from the file.
+        Reads the "document_index:count" files and the older files that have a count for every document.
         """
+        self.clear_precomputed()
+        
         with open(file_path) as file:
             for line in file:
                 line = line.split()
                 
-                all_count_per_doc = []
+                all_count_per_doc = {}
                 
-                for count_of_doc in range(1, len(line)):
-                    all_count_per_doc.append(float(line[count_of_doc]))
+                for document, count_of_doc in enumerate(line[1:]):
+                    if ':' in count_of_doc:
+                        document, count_of_doc = count_of_doc.split(':')
+                    
+                    count_of_doc = self.count_from_string(count_of_doc)
+                    if count_of_doc != 0:
+                        all_count_per_doc[int(document)] = count_of_doc
                 
                 self.all_document_frequency[line[0]] = all_count_per_doc
     
+    def count_from_string(self, count):
+        """
+        Takes a count from the document frequency file. Returns an int if it's a whole number, otherwise returns a float.
+        """
+        count = float(count)
+        
+        return int(count) if count.is_integer() else count
+    
     def get_bag_and_count_model_from_file(self, file_path):
         """
         Gets the bag_of_words_and_document_count model from the file_path. Adds the bag_of_words_and_document_count model, total_number_of_documents, and all_documents_name from the file.
         """
+        self.clear_precomputed()
+        
         with open(file_path) as file:
             for line in file:
                 line = line.split()
@@ -0,0 +1,248 @@
+'''
+Word counts of a user's session that are updated one sentence at a time, and the similarity of the session to every document of a TF_IDF_Index.
+Adding or removing a sentence only looks at the words of that sentence and the documents that contain them, so finding the most similar document doesn't depend on how long the session is.
+The similarities are the same as TF_IDF_Index.calculate_similarities() with all the counts, up to rounding.
+
+Routing can follow the recent topic:
+    - window_size: only the last "window_size" sentences are counted.
+    - decay: every time a sentence is added the older counts are multiplied by decay. Counts below MIN_DECAYED_COUNT are removed. All the counts change, so the similarities are calculated again for the words that are left.
+self.query_counts example = {"virus": 2, "spreading": 1}
+'''
+
+from collections import deque
+from math import sqrt
+
+from instrumentation import metrics
+
+# Decayed counts below this have a TF weight of 0 or less, so the word is removed
+MIN_DECAYED_COUNT = 0.5
+
+class Running_Query_Counts:
+    def __init__(self, document_frequency, window_size=None, decay=None) -> None:
+        if window_size is not None and decay is not None:
+            raise ValueError('Use either window_size or decay, not both.')
+        if window_size is not None and window_size < 1:
+            raise ValueError(f'window_size must be at least 1, not {window_size}.')
+        if decay is not None and not 0 < decay <= 1:
+            raise ValueError(f'decay must be more than 0 and at most 1, not {decay}.')
+        
+        # The Documents_Frequency with the documents. It isn't changed.
+        self.document_frequency = document_frequency
+        
+        # Number of sentences that are counted. None means all the sentences.
+        self.window_size = window_size
+        
+        # Factor between 0 and 1 the older counts are multiplied by when a sentence is added. None means the counts don't decay.
+        self.decay = decay
+        
+        # Keys are processed words and values are how many times they appear in the counted sentences
+        self.query_counts = dict()
+        
+        # Counts of every sentence in the window, the oldest first. Only used with window_size.
+        self.window = deque()
+        
+        self.clear_similarities()
+    
+    def clear_similarities(self):
+        """
+        Removes the similarity state. It's calculated again from self.query_counts the next time it's used.
+        """
+        # TF_IDF_Index the similarity state was calculated with
+        self.tf_idf_index = None
+        
+        # Keys are document indexes and values are the dot product with the query, the change in the document's squared norm, and how many query words the document has
+        self.numerators = dict()
+        self.squared_norm_changes = dict()
+        self.matched_words = dict()
+        
+        self.query_squared_norm = 0
+    
+    def add_sentence(self, sentence):
+        """
+        Takes the words of a finished sentence. Adds its counts with the window and decay of this session.
+        """
+        sentence_counts = self.get_sentence_counts(sentence)
+        
+        if self.decay is not None:
+            self.decay_counts()
+        
+        self.add_counts(sentence_counts)
+        
+        if self.window_size is not None:
+            self.window.append(sentence_counts)
+            
+            while len(self.window) > self.window_size:
+                self.remove_counts(self.window.popleft())
+    
+    def add_sentences(self, all_sentences):
+        for sentence in all_sentences:
+            self.add_sentence(sentence)
+    
+    def get_sentence_counts(self, sentence):
+        """
+        Returns a dict where keys are the processed words of the sentence and values are how many times they appear, like Documents_Frequency.get_query_counts().
+        """
+        sentence_counts = {}
+        
+        for word in sentence:
+            processed_word = self.document_frequency.get_processed_word(word)
+            if processed_word is None: continue
+            
+            sentence_counts[processed_word] = sentence_counts.get(processed_word, 0) + 1
+        
+        return sentence_counts
+    
+    def add_counts(self, sentence_counts):
+        """
+        Adds the counts to the query and updates the similarities of the documents that contain the words.
+        """
+        for word, count in sentence_counts.items():
+            old_count = self.query_counts.get(word, 0)
+            self.set_count(word, old_count, old_count + count)
+    
+    def remove_counts(self, sentence_counts):
+        """
+        Removes counts that were added with add_counts() and updates the similarities of the documents that contain the words.
+        """
+        for word, count in sentence_counts.items():
+            old_count = self.query_counts.get(word, 0)
+            self.set_count(word, old_count, old_count - count)
+    
+    def decay_counts(self):
+        """
+        Multiplies all the counts by self.decay and removes the counts below MIN_DECAYED_COUNT. The similarities are calculated again the next time they are used.
+        """
+        self.query_counts = {word: count * self.decay for word, count in self.query_counts.items() if count * self.decay >= MIN_DECAYED_COUNT}
+        
+        self.clear_similarities()
+    
+    def set_count(self, word, old_count, new_count):
+        """
+        Changes the count of the word from old_count to new_count and updates the similarity state.
+        """
+        if new_count > 0:
+            self.query_counts[word] = new_count
+        else:
+            new_count = 0
+            self.query_counts.pop(word, None)
+        
+        if self.tf_idf_index is None: return
+        
+        # Without any words the query norm is exactly 0 again
+        if not self.query_counts:
+            self.clear_similarities()
+            return
+        
+        self.update_similarities(word, old_count, new_count)
+    
+    def update_similarities(self, word, old_count, new_count):
+        """
+        Updates the dot products and norms the same way as TF_IDF_Index.calculate_similarities() for one word whose count changed from old_count to new_count.
+        """
+        tf_idf_index = self.tf_idf_index
+        tf_idf = tf_idf_index.tf_idf
+        
+        all_document_frequency = self.document_frequency.all_document_frequency
+        document_count = self.document_frequency.bag_of_words_and_document_count.get(word, 0)
+        
+        # IDF of the word when the user's text is added as a document
+        idf_weight = tf_idf.idf_weight(tf_idf_index.total_number_of_documents, document_count + 1)
+        
+        old_query_weight = tf_idf.tf_weight(old_count) * idf_weight
+        new_query_weight = tf_idf.tf_weight(new_count) * idf_weight
+        self.query_squared_norm += new_query_weight ** 2 - old_query_weight ** 2
+        
+        if word not in all_document_frequency: return
+        
+        # IDF that was used for the word in squared_norms
+        base_idf_weight = tf_idf.idf_weight(tf_idf_index.total_number_of_documents, document_count)
+        
+        metrics.add('routing_postings', len(all_document_frequency[word]))
+        
+        for doc_number, count in all_document_frequency[word].items():
+            tf_weight = tf_idf.tf_weight(count)
+            
+            self.numerators[doc_number] = self.numerators.get(doc_number, 0) + tf_weight * idf_weight * (new_query_weight - old_query_weight)
+            
+            squared_norm_change = (tf_weight * idf_weight) ** 2 - (tf_weight * base_idf_weight) ** 2
+            
+            if old_count == 0:
+                self.squared_norm_changes[doc_number] = self.squared_norm_changes.get(doc_number, 0) + squared_norm_change
+                self.matched_words[doc_number] = self.matched_words.get(doc_number, 0) + 1
+            elif new_count == 0:
+                self.squared_norm_changes[doc_number] -= squared_norm_change
+                self.matched_words[doc_number] -= 1
+                
+                # The document doesn't have any query word, so its similarity is exactly 0 again
+                if self.matched_words[doc_number] == 0:
+                    del self.numerators[doc_number]
+                    del self.squared_norm_changes[doc_number]
+                    del self.matched_words[doc_number]
+    
+    def get_tf_idf_index(self):
+        """
+        Returns the TF_IDF_Index of the documents. If it isn't the index of the similarity state, the state is calculated again from all the counts.
+        """
+        tf_idf_index = self.document_frequency.get_tf_idf_index()
+        
+        if tf_idf_index is not self.tf_idf_index:
+            self.clear_similarities()
+            self.tf_idf_index = tf_idf_index
+            
+            for word, count in self.query_counts.items():
+                self.update_similarities(word, 0, count)
+        
+        return tf_idf_index
+    
+    def find_most_similar_document(self, open_sentence=None):
+        """
+        Returns the name of the document that is most similar to the counted sentences, the same as TF_IDF_Index.find_most_similar_document(). Returns None if there aren't any documents.
+        If open_sentence is given, its words are only counted for this call, like the sentence the user is still typing.
+        Only the documents that have a query word are looked at, so it can be called after every word without going through the session again.
+        """
+        if not open_sentence:
+            return self.get_most_similar_document()
+        
+        sentence_counts = self.get_sentence_counts(open_sentence)
+        
+        self.add_counts(sentence_counts)
+        try:
+            return self.get_most_similar_document()
+        finally:
+            self.remove_counts(sentence_counts)
+    
+    def get_most_similar_document(self):
+        """
+        Returns the name of the document that is most similar to the counts in self.query_counts.
+        """
+        metrics.add('routing_queries')
+        
+        with metrics.timer('routing'):
+            squared_norms = self.get_tf_idf_index().squared_norms
+            if not squared_norms: return
+            
+            # If documents have the same similarity the last one is used, so without a similarity above 0 it's the last document
+            highest_similarity = 0
+            model_with_highest = len(squared_norms) - 1
+            
+            query_norm = sqrt(max(self.query_squared_norm, 0))
+            
+            for doc_number, numerator in self.numerators.items():
+                denominator = sqrt(squared_norms[doc_number] + self.squared_norm_changes[doc_number]) * query_norm
+                
+                if numerator == 0 or denominator == 0: continue
+                
+                s = numerator / denominator
+                if s > highest_similarity or (s == highest_similarity and doc_number > model_with_highest):
+                    highest_similarity = s
+                    model_with_highest = doc_number
+        
+        return self.document_frequency.all_documents_name[model_with_highest]
+    
+    def reset(self):
+        """
+        Removes all the counts.
+        """
+        self.query_counts = dict()
+        self.window.clear()
+        self.clear_similarities()
@@ -6,67 +6,52 @@ class TF_IDF:
     
     def calculate_TF_IDF(self, all_document_frequency, total_number_of_documents, bag_of_words_and_count):
         '''
-        Takes documents frequency matrix, total number of documents, and how many documents contain each word.
+        Takes documents frequency postings, total number of documents, and how many documents contain each word.
         
-        Calculates the TF_IDF and updates the documents frequency matrix in place.
+        Calculates the TF_IDF and updates the documents frequency postings in place.
         '''
-        # Loop through each word 
+        # Loop through each word
         for word, counts_per_doc in all_document_frequency.items():
-            # Loop through all the documents
-            for doc_number in range(total_number_of_documents):
-                # TF calculation
-                if counts_per_doc[doc_number] == 0:
-                    tf_weight = 0
-                else:
-                    if counts_per_doc[doc_number] <= 0:
-                        tf_weight = 1
-                    else:
-                        tf_weight = 1 + log(counts_per_doc[doc_number], 2)
-                
-                # IDF calculation
-                idf_calculation = total_number_of_documents / bag_of_words_and_count[word]
-                idf_weight = log(idf_calculation, 2)
-                
-                # Weight
-                tf_idf_weight = tf_weight * idf_weight
-                
-                counts_per_doc[doc_number] = tf_idf_weight
-                
+            # IDF calculation
+            idf_weight = self.idf_weight(total_number_of_documents, bag_of_words_and_count[word])
+            
+            # Loop through the documents that contain the word
+            for doc_number, count in counts_per_doc.items():
+                counts_per_doc[doc_number] = self.tf_weight(count) * idf_weight
+    
     def calculate_new_TF_IDF(self, all_document_frequency, total_number_of_documents, bag_of_words_and_count):
         '''
-        Takes documents frequency matrix, total number of documents, and how many documents contain each word.
+        Takes documents frequency postings, total number of documents, and how many documents contain each word.
         
-        Calculates the TF_IDF and returns a new  documents frequency matrix with the TF_IDF values.
+        Calculates the TF_IDF and returns new documents frequency postings with the TF_IDF values.
         '''
         tf_idf_matrix = {}
         
-        # Loop through each word 
+        # Loop through each word
         for word, counts_per_doc in all_document_frequency.items():
-            # Loop through all the documents
-            tf_idf_per_doc = []
-            
-            for doc_number in range(total_number_of_documents):
-                # TF calculation
-                if counts_per_doc[doc_number] == 0:
-                    tf_weight = 0
-                else:
-                    if counts_per_doc[doc_number] <= 0:
-                        tf_weight = 1
-                    else:
-                        tf_weight = 1 + log(counts_per_doc[doc_number], 2)
-                
-                # IDF calculation
-                idf_calculation = total_number_of_documents / bag_of_words_and_count[word]
-                idf_weight = log(idf_calculation, 2)
-                
-                # Weight
-                tf_idf_weight = tf_weight * idf_weight
-                
-                tf_idf_per_doc.append(tf_idf_weight)
+            # IDF calculation
+            idf_weight = self.idf_weight(total_number_of_documents, bag_of_words_and_count[word])
             
-            # Add the word and the TF_IDF values to the TF_IDF matrix model.
-            tf_idf_matrix[word] = tf_idf_per_doc
+            # Add the word and the TF_IDF values of the documents that contain the word to the TF_IDF model.
+            tf_idf_matrix[word] = {doc_number: self.tf_weight(count) * idf_weight for doc_number, count in counts_per_doc.items()}
         
         return tf_idf_matrix
-                
-                
\ No newline at end of file
+    
+    def tf_weight(self, count):
+        '''
+        Returns the TF weight of a word that appears "count" times in a document.
+        '''
+        if count == 0:
+            return 0
+        elif count <= 0:
+            return 1
+        else:
+            return 1 + log(count, 2)
+    
+    def idf_weight(self, total_number_of_documents, document_count):
+        '''
+        Returns the IDF weight of a word that appears in "document_count" documents.
+        '''
+        idf_calculation = total_number_of_documents / document_count
+        
+        return log(idf_calculation, 2)
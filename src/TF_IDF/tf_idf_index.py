@@ -0,0 +1,106 @@
+'''
+Read-only TF-IDF index over the documents of a Documents_Frequency. Finds the document that is most similar to a user's text without adding the text to the Documents_Frequency.
+The user's text is scored as if it was added as one more document, so the results are the same as adding it, calculating the TF-IDF, and using Cosine_Similarity.
+The squared norm of every document is calculated once with the IDF of (total_number_of_documents + 1) documents. A query only changes the IDF of its own words, so only the documents that contain a query word are updated.
+self.squared_norms example = [12.5, 3.25]
+'''
+
+from math import sqrt
+
+from instrumentation import metrics
+
+from .tf_idf import TF_IDF
+
+class TF_IDF_Index:
+    def __init__(self, document_frequency) -> None:
+        # The Documents_Frequency with the document counts. It isn't changed by the index.
+        self.document_frequency = document_frequency
+        
+        self.tf_idf = TF_IDF()
+        
+        # Number of documents including the user's text
+        self.total_number_of_documents = document_frequency.total_number_of_documents + 1
+        
+        # Squared TF-IDF norm of every document, where the index is the document index
+        self.squared_norms = [0] * document_frequency.total_number_of_documents
+        
+        self.build_index()
+    
+    def build_index(self):
+        """
+        Calculates the squared norm of every document using the IDF of each word when the user's text doesn't contain the word.
+        """
+        bag_of_words_and_count = self.document_frequency.bag_of_words_and_document_count
+        
+        for word, counts_per_doc in self.document_frequency.all_document_frequency.items():
+            idf_weight = self.tf_idf.idf_weight(self.total_number_of_documents, bag_of_words_and_count[word])
+            
+            for doc_number, count in counts_per_doc.items():
+                self.squared_norms[doc_number] += (self.tf_idf.tf_weight(count) * idf_weight) ** 2
+    
+    def calculate_similarities(self, query_counts):
+        """
+        Takes the word counts of the user's text from Documents_Frequency.get_query_counts().
+        Returns a list with the cosine similarity between the user's text and every document. Only the documents that contain a query word are looked at, all others have a similarity of 0.
+        """
+        all_document_frequency = self.document_frequency.all_document_frequency
+        bag_of_words_and_count = self.document_frequency.bag_of_words_and_document_count
+        
+        # Keys are document indexes and values are the dot product with the user's text and the change in the document's squared norm
+        numerators = {}
+        squared_norm_changes = {}
+        query_squared_norm = 0
+        
+        for word, query_count in query_counts.items():
+            document_count = bag_of_words_and_count.get(word, 0)
+            
+            # IDF of the word when the user's text is added as a document
+            idf_weight = self.tf_idf.idf_weight(self.total_number_of_documents, document_count + 1)
+            
+            query_weight = self.tf_idf.tf_weight(query_count) * idf_weight
+            query_squared_norm += query_weight ** 2
+            
+            if word not in all_document_frequency: continue
+            
+            # IDF that was used for the word in squared_norms
+            base_idf_weight = self.tf_idf.idf_weight(self.total_number_of_documents, document_count)
+            
+            metrics.add('routing_postings', len(all_document_frequency[word]))
+            
+            for doc_number, count in all_document_frequency[word].items():
+                tf_weight = self.tf_idf.tf_weight(count)
+                
+                numerators[doc_number] = numerators.get(doc_number, 0) + tf_weight * idf_weight * query_weight
+                squared_norm_changes[doc_number] = squared_norm_changes.get(doc_number, 0) + (tf_weight * idf_weight) ** 2 - (tf_weight * base_idf_weight) ** 2
+        
+        similarities = [0] * len(self.squared_norms)
+        for doc_number, numerator in numerators.items():
+            denominator = sqrt(self.squared_norms[doc_number] + squared_norm_changes[doc_number]) * sqrt(query_squared_norm)
+            
+            if numerator == 0 or denominator == 0: continue
+            
+            similarities[doc_number] = numerator / denominator
+        
+        return similarities
+    
+    def find_most_similar_document(self, query_counts):
+        """
+        Takes the word counts of the user's text. Returns the name of the document that is most similar to the user's text.
+        Same as Cosine_Similarity, if documents have the same similarity the last one is returned.
+        """
+        metrics.add('routing_queries')
+        
+        with metrics.timer('routing'):
+            similarities = self.calculate_similarities(query_counts)
+        
+        if not similarities: return
+        
+        highest_similarity = float('-inf')
+        model_with_highest = None
+        
+        for document, s in enumerate(similarities):
+            if s >= highest_similarity:
+                highest_similarity = s
+                model_with_highest = document
+        
+        return self.document_frequency.all_documents_name[model_with_highest]
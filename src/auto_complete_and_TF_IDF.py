@@ -1,70 +1,150 @@
 
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice, repeat
+from os import cpu_count, remove
+
+from os.path import isdir, isfile
+
 from path_to_files import Path_To_Files
 
-from N_Gram_Model import Get_Sentences, Trigram_Model, Calculate_Linear_Interpolation
+from corpus_manifest import Corpus_Manifest
+
+from instrumentation import metrics
 
-from TF_IDF import Documents_Frequency, TF_IDF, Cosine_Similarity
+from N_Gram_Model import Get_Sentences, Tokenized_File_Cache, Vocabulary, Trigram_Model, Sorted_Array_Model, N_Gram_Store, Lazy_Trigram_Models, Calculate_Linear_Interpolation, Top_Words_Table, count_file
+
+from TF_IDF import Documents_Frequency
 
 class N_Gram_And_TF_IDF_Models:
-    def __init__(self, START_SYMBOL="<*>", END_SYMBOL="<STOP>", ALL_MODEL_NAME="ALL") -> None:
+    def __init__(self, START_SYMBOL="<*>", END_SYMBOL="<STOP>", ALL_MODEL_NAME="ALL", use_token_cache=True) -> None:
         # Class variables
         self.START_SYMBOL = START_SYMBOL
         self.END_SYMBOL = END_SYMBOL
         self.ALL_MODEL_NAME = ALL_MODEL_NAME
         
+        # If True the tokenized corpus files are cached in the "model" folder, so building the models again doesn't tokenize the files that didn't change
+        self.use_token_cache = use_token_cache
+        
         # The n-gram and TF-IDF models
         self.all_trigram_models = None
         self.df = None
+        
+        # Vocabulary shared by all the trigram models
+        self.vocabulary = None
+        
+        # N_Gram_Store with the counts of all the document models when they share one table. It's None until share_trigram_models() is called.
+        self.n_gram_store = None
+        
+        # Corpus_Manifest with the corpus files in the models. It's None until the models are created from the corpus.
+        self.manifest = None
+        
+        # If True the models loaded from the "model" folder use the compact storage: txt models are changed to Sorted_Array_Model and the top words tables are stored in NumPy arrays
+        self.compact_models = False
     
         self.path = Path_To_Files()
     
-    def create_models_from_corpus(self):
+    def create_models_from_corpus(self, parallel=False, workers=None, shared_store=False):
         """
         Creates new n-gram and TF-IDF model based on the documents in the "corpus" folder.
+        If parallel is True the files are counted in "workers" worker processes. workers defaults to the number of CPUs.
+        If shared_store is True the document models are stored in one N_Gram_Store and the ALL_MODEL_NAME model is its total column instead of a copy of all the counts, see share_trigram_models().
         
         Returns a dict() where the keys are the document name and values are the Trigram_Gram_Model object instances. Also returns an Documents_Frequency object instance. 
         """
         # Get all paths to all document in the "corpus" folder
         all_document_paths_from_corpus = self.path.get_all_documents_file_from_corpus()
         
+        self.vocabulary = Vocabulary()
+        
         # Creates all n-gram models from the documents found in the "corpus" folder
-        self.all_trigram_models = self.trigram_models_from_corpus(all_document_paths_from_corpus)
+        if parallel:
+            self.all_trigram_models = self.trigram_models_from_corpus(all_document_paths_from_corpus, workers or cpu_count() or 1, add_all_model=not shared_store)
+        else:
+            self.all_trigram_models = self.trigram_models_from_corpus(all_document_paths_from_corpus, add_all_model=not shared_store)
         
         # Creates all document frequency models from documents in all_trigram_models except for ALL_MODEL_NAME
         self.df = self.df_model_from_corpus()
         
+        # The ALL_MODEL_NAME model is added as the total column of the store
+        if shared_store:
+            self.share_trigram_models()
+        
+        # Keep track of the files in the models so the models can be updated later with update_models_from_corpus()
+        self.manifest = Corpus_Manifest()
+        self.manifest.add_corpus(all_document_paths_from_corpus)
+        
         return self.all_trigram_models, self.df
         
-    def trigram_models_from_corpus(self, all_document_paths_from_corpus):
+    def get_token_cache_folder(self):
+        """
+        Returns the folder of the Tokenized_File_Cache in the "model" folder, or None if the files shouldn't be cached or there isn't a "model" folder.
+        """
+        if not self.use_token_cache or not isdir('model'): return
+        
+        return self.path.get_token_cache_path()
+    
+    def get_sentences(self):
+        """
+        Returns a new Get_Sentences for the corpus files. The files that were already tokenized are read from the token cache.
+        """
+        token_cache_folder = self.get_token_cache_folder()
+        file_cache = Tokenized_File_Cache(token_cache_folder) if token_cache_folder is not None else None
+        
+        return Get_Sentences(self.END_SYMBOL, file_cache=file_cache)
+    
+    def trigram_models_from_corpus(self, all_document_paths_from_corpus, workers=None, add_all_model=True):
         """
         Takes dictionary where keys are the document name and values are all the paths to file that belong to that dictionary.
         Returns a dictionary where keys are document name and values are Trigram_Model objects for that document.
         Trigram_Model has unigram, bigram, trigrams, and all words counts.
+        If workers is given, the files are counted in that many worker processes and the counts of every file are added to its document's model in the same order as counting them here.
+        If add_all_model is False the ALL_MODEL_NAME model isn't created.
+        """
+        if workers is None:
+            return self.trigram_models_from_files(all_document_paths_from_corpus, add_all_model=add_all_model)
+        
+        all_file_paths = [file_path for all_paths in all_document_paths_from_corpus.values() for file_path in all_paths]
+        
+        # Map: count every file in a worker process. Reduce: add the counts of every file to its document's model and the "ALL" model.
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            all_file_counts = executor.map(count_file, all_file_paths, repeat(self.START_SYMBOL), repeat(self.END_SYMBOL), repeat(self.get_token_cache_folder()))
+            
+            return self.trigram_models_from_files(all_document_paths_from_corpus, all_file_counts, add_all_model)
+    
+    def trigram_models_from_files(self, all_document_paths_from_corpus, all_file_counts=None, add_all_model=True):
+        """
+        Takes dictionary where keys are the document name and values are all the paths to file that belong to that dictionary.
+        Also takes an iterator with the counts of every file from count_file(), in the same order as the files. If it's None the files are counted here.
+        Returns a dictionary where keys are document name and values are Trigram_Model objects for that document.
+        If add_all_model is False the counts of the documents aren't added to an ALL_MODEL_NAME model.
         """
         # Get all sentences found in the files in "all_document_paths_from_corpus"
-        get_sentences_per_document = Get_Sentences(self.END_SYMBOL)
+        get_sentences_per_document = self.get_sentences()
         
         # Initialize Trigram_Model objects for the entire corpus.
-        entire_corpus_model = Trigram_Model(model_name=self.ALL_MODEL_NAME, start_symbol=self.START_SYMBOL, end_symbol=self.END_SYMBOL)
+        entire_corpus_model = Trigram_Model(model_name=self.ALL_MODEL_NAME, start_symbol=self.START_SYMBOL, end_symbol=self.END_SYMBOL, vocabulary=self.vocabulary)
         
         all_trigram_models = dict()
 
         # Loop through all documents in the "corpus" folder
         for document_name, all_paths in all_document_paths_from_corpus.items():
-            documents_trigram_model = Trigram_Model(model_name=document_name, start_symbol=self.START_SYMBOL, end_symbol=self.END_SYMBOL)
+            documents_trigram_model = Trigram_Model(model_name=document_name, start_symbol=self.START_SYMBOL, end_symbol=self.END_SYMBOL, vocabulary=self.vocabulary)
             
             # Loop through all files in the current document
             for file_path in all_paths:
-                # Get all sentence from this file
-                all_sentences = get_sentences_per_document.get_all_sentences(file_path)
+                if all_file_counts is not None:
+                    # Adds the counts of this file from the worker process to the current trigram model.
+                    documents_trigram_model.add_file_counts(next(all_file_counts))
+                    continue
                 
-                # Adds sentence from this file to the current trigram model.
-                documents_trigram_model.add_sentences_to_model(all_sentences)
+                # Adds every sentence from this file to the current trigram model while the file is read.
+                documents_trigram_model.add_sentences_to_model(get_sentences_per_document.iter_sentences(file_path))
                 
             all_trigram_models[document_name] = documents_trigram_model
             
             # Adds current document's model to entire_corpus_model trigram model
-            entire_corpus_model.add_all_counts(documents_trigram_model.unigram_count, documents_trigram_model.bigram_count, documents_trigram_model.trigram_count, documents_trigram_model.all_words_count)
+            if add_all_model:
+                entire_corpus_model.add_all_counts(documents_trigram_model.unigram_count, documents_trigram_model.bigram_count, documents_trigram_model.trigram_count, documents_trigram_model.all_words_count)
             
             # Added one document from "corpus"
             if len(all_paths) <= 3:
@@ -72,8 +152,9 @@ class N_Gram_And_TF_IDF_Models:
             else:
                 print(f'\t\t- Added "{document_name}" document model with all files in "{document_name}" folder.')
     
-        all_trigram_models[self.ALL_MODEL_NAME] = entire_corpus_model
-        print('\t\t- Added "ALL" model which includes all the documents\n')
+        if add_all_model:
+            all_trigram_models[self.ALL_MODEL_NAME] = entire_corpus_model
+            print('\t\t- Added "ALL" model which includes all the documents\n')
 
         return all_trigram_models
     
@@ -86,23 +167,145 @@ class N_Gram_And_TF_IDF_Models:
         
         df = Documents_Frequency(end_symbol=self.END_SYMBOL)
         
-        # Iterate over all trigram models and add it to the document frequency model.
-        for model_name, model in self.all_trigram_models.items():
-            if model_name == self.ALL_MODEL_NAME:
+        with metrics.timer('tf_idf_build'):
+            # Iterate over all trigram models and add it to the document frequency model.
+            for model_name, model in self.all_trigram_models.items():
+                if model_name == self.ALL_MODEL_NAME:
+                    continue
+                
+                df.add_one_document(model_name, model.unigram_count)
+            
+            # Finalize the model
+            df.finalize_document_frequency()
+        
+        return df
+    
+    
+    
+    def update_models_from_corpus(self, binary=True, top_words_count=3, pruning=None, quantization_bits=None):
+        """
+        Updates the models in the "model" folder with only the files in the "corpus" folder that were added, changed, or removed since the models were saved.
+        The corpus manifest in the "model" folder has the files that are already in the models. If there isn't a manifest all the models are created again.
+        Only the files of the changed models, the TF-IDF models, and the manifest are saved again.
+        If pruning is given, it's a dict() with the arguments of prune_models(). The counts of pruned models can't be updated, so all the models are created again and pruned.
+        quantization_bits is used for the top words tables of the saved models, see save_models_to_files().
+        
+        Returns a dict() where the keys are the document name and values are the trigram models. Also returns an Documents_Frequency object instance. 
+        """
+        manifest_path = self.path.get_manifest_path()
+        
+        # Without a manifest we don't know which files are in the models
+        if not isfile(manifest_path) or pruning is not None:
+            self.create_models_from_corpus()
+            self.fix_n_grams_model()
+            
+            if pruning is not None:
+                self.prune_models(**pruning)
+            
+            self.save_models_to_files(top_words_count=top_words_count, binary=binary, quantization_bits=quantization_bits)
+            
+            return self.all_trigram_models, self.df
+        
+        self.manifest = Corpus_Manifest()
+        self.manifest.get_manifest_from_file(manifest_path)
+        
+        self.get_models_from_models_folder(lazy=True)
+        
+        # Get all paths to all document in the "corpus" folder and compare them to the manifest
+        all_document_paths_from_corpus = self.path.get_all_documents_file_from_corpus()
+        new_files, changed_documents, removed_documents = self.manifest.get_changes(all_document_paths_from_corpus)
+        
+        if not new_files and not changed_documents:
+            print('\t\t- The models are up to date with the "corpus" folder')
+            return self.all_trigram_models, self.df
+        
+        # The "ALL" model is changed with the counts of every changed document
+        entire_corpus_model = self.get_trigram_model_to_update(self.ALL_MODEL_NAME)
+        
+        # Documents where only new files were added. Only the new files are counted and added to the models.
+        for document_name, all_paths in new_files.items():
+            if document_name in changed_documents: continue
+            
+            new_files_model = self.trigram_model_from_paths(document_name, all_paths)
+            
+            if document_name in self.all_trigram_models:
+                documents_trigram_model = self.get_trigram_model_to_update(document_name)
+            else:
+                documents_trigram_model = Trigram_Model(model_name=document_name, start_symbol=self.START_SYMBOL, end_symbol=self.END_SYMBOL, vocabulary=self.vocabulary)
+                self.all_trigram_models[document_name] = documents_trigram_model
+            
+            documents_trigram_model.add_all_counts(new_files_model.unigram_count, new_files_model.bigram_count, new_files_model.trigram_count, new_files_model.all_words_count)
+            entire_corpus_model.add_all_counts(new_files_model.unigram_count, new_files_model.bigram_count, new_files_model.trigram_count, new_files_model.all_words_count)
+            
+            print(f'\t\t- Added {len(all_paths)} new files to the "{document_name}" document model')
+        
+        # Documents with a changed or removed file. The old counts of a file aren't saved, so the whole document is counted again.
+        for document_name in changed_documents:
+            if document_name in self.all_trigram_models:
+                old_trigram_model = self.get_trigram_model_to_update(document_name)
+                entire_corpus_model.remove_all_counts(old_trigram_model.unigram_count, old_trigram_model.bigram_count, old_trigram_model.trigram_count, old_trigram_model.all_words_count)
+                
+                del self.all_trigram_models[document_name]
+            
+            if document_name in removed_documents:
+                self.df.remove_document(document_name)
+                self.path.remove_trigram_model_files([document_name])
+                
+                print(f'\t\t- Removed the "{document_name}" document model')
                 continue
             
-            df.add_one_document(model_name, model.unigram_count)
+            documents_trigram_model = self.trigram_model_from_paths(document_name, all_document_paths_from_corpus[document_name])
+            self.all_trigram_models[document_name] = documents_trigram_model
+            
+            entire_corpus_model.add_all_counts(documents_trigram_model.unigram_count, documents_trigram_model.bigram_count, documents_trigram_model.trigram_count, documents_trigram_model.all_words_count)
+            
+            print(f'\t\t- Counted the "{document_name}" document model again')
         
-        # Finalize the model
-        df.finalize_document_frequency()
+        updated_model_names = [document_name for document_name in list(new_files) + list(changed_documents) if document_name not in removed_documents]
+        updated_model_names = list(dict.fromkeys(updated_model_names))
         
-        return df
+        # Update the TF-IDF models with the new unigram counts of the documents. The start symbol count from fix_n_gram_count() isn't part of the document.
+        for document_name in updated_model_names:
+            unigram_count = self.all_trigram_models[document_name].unigram_count
+            self.df.update_document(document_name, {word: count for word, count in unigram_count.items() if word != self.START_SYMBOL})
+        
+        for model_name in updated_model_names + [self.ALL_MODEL_NAME]:
+            self.all_trigram_models[model_name].fix_n_gram_count()
+        
+        self.save_models_to_files(top_words_count=top_words_count, binary=binary, model_names=updated_model_names + [self.ALL_MODEL_NAME], quantization_bits=quantization_bits)
+        
+        return self.all_trigram_models, self.df
     
+    def get_trigram_model_to_update(self, model_name):
+        """
+        Returns the trigram model of model_name as a Trigram_Model that can be updated. A read-only Sorted_Array_Model is changed to a Trigram_Model with self.vocabulary.
+        """
+        trigram_model = self.all_trigram_models[model_name]
+        
+        if isinstance(trigram_model, Sorted_Array_Model):
+            trigram_model = trigram_model.to_trigram_model(self.vocabulary)
+            self.all_trigram_models[model_name] = trigram_model
+        
+        return trigram_model
     
+    def trigram_model_from_paths(self, model_name, all_paths):
+        """
+        Returns a new Trigram_Model with the counts of the files in all_paths.
+        """
+        get_sentences = self.get_sentences()
+        
+        trigram_model = Trigram_Model(model_name=model_name, start_symbol=self.START_SYMBOL, end_symbol=self.END_SYMBOL, vocabulary=self.vocabulary)
+        
+        for file_path in all_paths:
+            trigram_model.add_sentences_to_model(get_sentences.iter_sentences(file_path))
+        
+        return trigram_model
     
-    def get_models_from_models_folder(self):
+    def get_models_from_models_folder(self, lazy=False, max_loaded_models=None, compact=False):
         """
         Creates new n-gram and TF-IDF model based on the documents in the "model" folder.
+        If lazy is True only the ALL_MODEL_NAME model and the TF-IDF models are loaded up front. Every other document's model is loaded the first time it's used, and at most "max_loaded_models" of them are kept in memory (None means no limit).
+        If compact is True the counts of txt models are stored in sorted NumPy arrays (Sorted_Array_Model) and the top words tables in NumPy arrays, so more models fit in memory. Binary models already use the arrays.
         
         Returns a dict() where the keys are the document name and values are the Trigram_Gram_Model object instances. Also returns an Documents_Frequency object instance. 
         """
@@ -113,147 +316,367 @@ class N_Gram_And_TF_IDF_Models:
         if not all_models_path_from_model: 
             return self.all_trigram_models, self.df
         
+        # Keys are model names and values are the top words table file path of the model
+        all_top_words_tables_path = {self.path.get_model_name_from_path(path): path for path in all_models_path_from_model.get('all_top_words_tables', [])}
+        
         # Add all n-gram models from the "model" folder.
-        self.all_trigram_models = {}
-        for trigram_model_file_path in all_models_path_from_model['all_trigram_models']:
-            document_trigram_model = Trigram_Model(model_name="", start_symbol=self.START_SYMBOL, end_symbol=self.END_SYMBOL)
-            
-            current_model_name = document_trigram_model.get_model_from_file(trigram_model_file_path)
-            
-            self.all_trigram_models[current_model_name] = document_trigram_model
+        self.vocabulary = Vocabulary()
+        self.compact_models = compact
+        if lazy:
+            all_model_paths = {}
+            for trigram_model_file_path in all_models_path_from_model['all_trigram_models']:
+                model_name = self.path.get_model_name_from_path(trigram_model_file_path)
+                
+                all_model_paths[model_name] = (trigram_model_file_path, all_top_words_tables_path.get(model_name))
             
-            print(f'\t\t- Added "{current_model_name}" document\'s model from the file "{trigram_model_file_path}".')
+            self.all_trigram_models = Lazy_Trigram_Models(all_model_paths, self.trigram_model_from_file, pinned_models=[self.ALL_MODEL_NAME], max_loaded_models=max_loaded_models)
+        else:
+            self.all_trigram_models = {}
+            for trigram_model_file_path in all_models_path_from_model['all_trigram_models']:
+                model_name = self.path.get_model_name_from_path(trigram_model_file_path)
+                
+                document_trigram_model = self.trigram_model_from_file(trigram_model_file_path, all_top_words_tables_path.get(model_name))
+                
+                self.all_trigram_models[document_trigram_model.model_name] = document_trigram_model
         
         # Add all TF-IDF models from the "model" folder.
         self.df = Documents_Frequency(self.END_SYMBOL)
         
         document_frequency_model_file_path = all_models_path_from_model['document_frequency_model.txt']
-        self.df.get_document_frequency_from_file(document_frequency_model_file_path)
+        with metrics.timer('tf_idf_load'):
+            self.df.get_document_frequency_from_file(document_frequency_model_file_path)
         print(f'\t\t- Added "document_frequency_model" model from the file "{document_frequency_model_file_path}".')  
 
         bag_and_count_model_file_path = all_models_path_from_model["bag_model.txt"]
-        self.df.get_bag_and_count_model_from_file(bag_and_count_model_file_path)
+        with metrics.timer('tf_idf_load'):
+            self.df.get_bag_and_count_model_from_file(bag_and_count_model_file_path)
         print(f'\t\t- Added "bag_model" model from the file "{bag_and_count_model_file_path}".')
     
         return self.all_trigram_models, self.df
     
+    def trigram_model_from_file(self, trigram_model_file_path, top_words_table_file_path=None):
+        """
+        Loads one trigram model and its top words table. Binary files are opened as Sorted_Array_Model with their own vocabulary, txt files share self.vocabulary.
+        Returns the trigram model.
+        """
+        if trigram_model_file_path.endswith(self.path.binary_model_extension):
+            trigram_model = Sorted_Array_Model(model_name="", start_symbol=self.START_SYMBOL, end_symbol=self.END_SYMBOL)
+        else:
+            trigram_model = Trigram_Model(model_name="", start_symbol=self.START_SYMBOL, end_symbol=self.END_SYMBOL, vocabulary=self.vocabulary)
+        
+        with metrics.timer('model_load'):
+            current_model_name = trigram_model.get_model_from_file(trigram_model_file_path)
+            
+            # The counts of a txt model are copied to sorted arrays and the dicts are freed
+            if self.compact_models and isinstance(trigram_model, Trigram_Model):
+                sorted_array_model = Sorted_Array_Model()
+                sorted_array_model.add_trigram_model(trigram_model)
+                trigram_model = sorted_array_model
+        
+        metrics.add('models_loaded')
+        print(f'\t\t- Added "{current_model_name}" document\'s model from the file "{trigram_model_file_path}".')
+        
+        # Add the top words table to the trigram model. The table uses the vocabulary of its model.
+        if top_words_table_file_path is not None:
+            top_words_table = Top_Words_Table(vocabulary=trigram_model.vocabulary)
+            
+            try:
+                with metrics.timer('top_words_load'):
+                    top_words_table.get_table_from_file(top_words_table_file_path)
+                    
+                    if self.compact_models:
+                        top_words_table.compact()
+            except ValueError as error:
+                # Tables saved by older versions are skipped, the next words are calculated with the linear interpolation until the models are saved again
+                print(f'\t\t- Skipped the "{current_model_name}" top words table: {error}')
+                return trigram_model
+            
+            trigram_model.top_words_table = top_words_table
+            print(f'\t\t- Added "{current_model_name}" top words table from the file "{top_words_table_file_path}".')
+        
+        return trigram_model
     
-    def save_models_to_files(self):
+    
+    def save_models_to_files(self, top_words_count=3, binary=True, model_names=None, quantization_bits=None):
         """
         Creates new files with the current n-gram and TF-IDF models.
+        If binary is True the trigram models are saved as binary files that can be opened with mmap, otherwise as txt files.
+        If model_names is given only those trigram models are saved and the files of the other models are kept.
+        Also compiles and saves the top "top_words_count" words for every context of every trigram model. If quantization_bits is 8 or 16 the probabilities of the tables are quantized.
         """
+        if model_names is None:
+            model_names = list(self.all_trigram_models)
+        
         # Get the output file paths.
-        all_models_output_path = self.path.get_output_file_paths_to_new_models(all_trigram_models=self.all_trigram_models)
+        all_models_output_path = self.path.get_output_file_paths_to_new_models(all_trigram_models=model_names, binary=binary, remove_old_models=len(model_names) == len(self.all_trigram_models))
+        
+        # Compile the top words tables before saving so they are saved next to the models
+        self.compile_top_words_tables(top_words_count, model_names, quantization_bits)
         
         # Loop through all the trigram models and save the models to the file path.
-        for trigram_model in self.all_trigram_models.values():
-            # Saves the current trigram model to a file.
-            trigram_model.save_model_to_file(all_models_output_path['all_trigram_models'])
+        for model_name in model_names:
+            trigram_model = self.all_trigram_models[model_name]
+            
+            with metrics.timer('model_save'):
+                # Binary files are saved from the sorted arrays
+                if binary and isinstance(trigram_model, Trigram_Model):
+                    sorted_array_model = Sorted_Array_Model()
+                    sorted_array_model.add_trigram_model(trigram_model)
+                    
+                    model_words = sorted_array_model.save_model_to_file(all_models_output_path['all_trigram_models'])
+                elif isinstance(trigram_model, Sorted_Array_Model):
+                    model_words = trigram_model.save_model_to_file(all_models_output_path['all_trigram_models'])
+                else:
+                    # Saves the current trigram model to a file.
+                    trigram_model.save_model_to_file(all_models_output_path['all_trigram_models'])
+                    model_words = None
+            
+            metrics.add('models_saved')
+            
+            # Saves the current trigram model's top words table next to the model. A table next to a binary model uses the word IDs of the model file, so it's loaded without changing them.
+            if trigram_model.top_words_table is not None:
+                with metrics.timer('top_words_save'):
+                    trigram_model.top_words_table.save_table_to_file(all_models_output_path['all_top_words_tables'], model_words)
         
         # Add the document frequency and bag of words and number of appears in document to the files.
-        self.df.save_models_to_file(all_models_output_path['document_frequency_model.txt'], all_models_output_path["bag_model.txt"])
+        with metrics.timer('tf_idf_save'):
+            self.df.save_models_to_file(all_models_output_path['document_frequency_model.txt'], all_models_output_path["bag_model.txt"])
+        
+        # Save the corpus files that are in the models. Pruned models don't have a manifest, so an old manifest is removed and the models are created again by update_models_from_corpus().
+        if self.manifest is not None:
+            self.manifest.save_manifest_to_file(self.path.get_manifest_path())
+        elif isfile(self.path.get_manifest_path()):
+            remove(self.path.get_manifest_path())
+    
+    
+    def compile_top_words_tables(self, top_words_count=3, model_names=None, quantization_bits=None):
+        """
+        Calculates the linear interpolation for every context "word2 word1" in every trigram model, or only the models in model_names, and stores the top "top_words_count" words in a Top_Words_Table for that model.
+        If quantization_bits is 8 or 16 the tables store quantized probabilities and rank the words by them.
+        Sorted_Array_Model models are read-only and keep the table they already have. A Sorted_Array_Model without a table, like the views of an N_Gram_Store, gets a table compiled from a Trigram_Model copy of its counts that shares its vocabulary.
+        """
+        if model_names is None:
+            model_names = list(self.all_trigram_models)
         
+        for model_name in model_names:
+            trigram_model = self.all_trigram_models[model_name]
+            
+            counts_model = trigram_model
+            if isinstance(trigram_model, Sorted_Array_Model):
+                if trigram_model.top_words_table is not None: continue
+                
+                counts_model = trigram_model.to_trigram_model(trigram_model.vocabulary)
+            
+            linear_interpolation = Calculate_Linear_Interpolation(counts_model.unigram_count, counts_model.bigram_count, counts_model.trigram_count, counts_model.all_words_count, self.END_SYMBOL, self.START_SYMBOL, counts_model.get_successor_index(), vocabulary=counts_model.vocabulary)
+            
+            top_words_table = Top_Words_Table(model_name, top_words_count, trigram_model.vocabulary, quantization_bits)
+            with metrics.timer('top_words_compile'):
+                top_words_table.compile_table(linear_interpolation)
+            
+            trigram_model.top_words_table = top_words_table
+            print(f'\t\t- Compiled the top {top_words_count} words table for the "{model_name}" model')
+        
+        return self.all_trigram_models
     
-    def fix_n_grams_model(self):
+    def convert_text_models_to_binary(self):
         """
-        Add 2 start symbol to the bigram_count based on how many end symbols are in the unigram count. Adds 1 start symbol to the unigram_count based on how many end symbols are in the unigram count.
+        Converts every txt trigram model in the "model" folder to a binary file next to it. The txt files are kept, but the binary files are used when loading the models.
         """
-        for trigram_model in self.all_trigram_models.values():
-            trigram_model.fix_n_gram_count()
+        all_models_path_from_model = self.path.get_all_models_files_from_model()
+        
+        for trigram_model_file_path in all_models_path_from_model.get('all_trigram_models', []):
+            if not trigram_model_file_path.endswith(self.path.text_model_extension): continue
+            
+            trigram_model = Trigram_Model(model_name="", start_symbol=self.START_SYMBOL, end_symbol=self.END_SYMBOL)
+            current_model_name = trigram_model.get_model_from_file(trigram_model_file_path)
+            
+            sorted_array_model = Sorted_Array_Model()
+            sorted_array_model.add_trigram_model(trigram_model)
+            
+            binary_model_file_path = self.path.get_binary_model_path(trigram_model_file_path)
+            sorted_array_model.save_model_to_file({current_model_name: binary_model_file_path})
+    
+    def compact_trigram_models(self):
+        """
+        Replaces every trigram model with a read-only Sorted_Array_Model that stores the counts in sorted NumPy arrays, and stores the top words tables in NumPy arrays. Must be called after fix_n_grams_model().
+        The predictions don't change, but the models use much less memory and can't be updated or saved as txt files anymore. They can still be saved as binary files.
+        """
+        for model_name, trigram_model in self.all_trigram_models.items():
+            if isinstance(trigram_model, Trigram_Model):
+                sorted_array_model = Sorted_Array_Model()
+                sorted_array_model.add_trigram_model(trigram_model)
+                
+                self.all_trigram_models[model_name] = trigram_model = sorted_array_model
+            
+            if trigram_model.top_words_table is not None:
+                trigram_model.top_words_table.compact()
+            
+            print(f'\t\t- Compacted the "{model_name}" model into sorted arrays')
         
         return self.all_trigram_models
+    
+    def prune_models(self, min_counts=(1, 1, 1), max_vocabulary_size=None, min_tf_idf_count=1, unknown_word='<UNK>', report_sentences=1000):
+        """
+        Makes the models smaller by removing the rare n-grams and words. Must be called after fix_n_grams_model().
+        min_counts is the min (unigram, bigram, trigram) counts and max_vocabulary_size is the max number of words in every trigram model, see Trigram_Model.prune(). Words that appear less than min_tf_idf_count times in all the documents are removed from the TF-IDF model.
+        Prints a report with the size of the models and the perplexity of the ALL_MODEL_NAME model on "report_sentences" sentences from the corpus, before and after.
         
+        Returns the report as a dict().
+        """
+        all_sentences = self.get_report_sentences(report_sentences)
         
+        report = {
+            'models': {},
+            'perplexity_before': self.get_perplexity(self.ALL_MODEL_NAME, all_sentences),
+            'tf_idf_words_before': len(self.df.all_document_frequency),
+        }
         
-class Auto_Complete_And_TF_IDF:
-    def __init__(self, START_SYMBOL="<*>", END_SYMBOL="<STOP>", ALL_MODEL_NAME="ALL") -> None:
-        # Class variables
-        self.START_SYMBOL = START_SYMBOL
-        self.END_SYMBOL = END_SYMBOL
-        self.ALL_MODEL_NAME = ALL_MODEL_NAME  
+        min_unigram_count, min_bigram_count, min_trigram_count = min_counts
+        
+        for model_name in list(self.all_trigram_models):
+            trigram_model = self.get_trigram_model_to_update(model_name)
+            
+            report['models'][model_name] = trigram_model.prune(min_unigram_count, min_bigram_count, min_trigram_count, max_vocabulary_size, unknown_word)
         
-        self.current_model_name = None
-        self.current_linear_interpolation = None 
+        self.df.prune(min_tf_idf_count)
         
-        self.all_user_sentences = None
+        report['perplexity_after'] = self.get_perplexity(self.ALL_MODEL_NAME, all_sentences, unknown_word)
+        report['tf_idf_words_after'] = len(self.df.all_document_frequency)
+        
+        # The counts of the corpus files can't be removed from pruned models, so they can't be updated with the manifest
+        self.manifest = None
+        
+        self.print_pruning_report(report)
+        
+        return report
     
-    def update_current_name_and_linear_interpolation(self, model_name, trigram_model):
+    def get_report_sentences(self, sentence_count=1000):
         """
-        Takes a model name and trigram model object.
-        Updates self.current_model_name and self.current_linear_interpolation with the new model.
+        Returns a 2d list with up to "sentence_count" sentences from the corpus, the same number of sentences from every document.
         """
-        self.current_model_name = model_name
+        all_document_paths_from_corpus = self.path.get_all_documents_file_from_corpus()
+        if not all_document_paths_from_corpus or sentence_count <= 0: return []
+        
+        get_sentences = self.get_sentences()
+        sentences_per_document = max(sentence_count // len(all_document_paths_from_corpus), 1)
         
-        trigram_model_all_info = trigram_model.get_model_information()
+        all_sentences = []
+        for all_paths in all_document_paths_from_corpus.values():
+            document_sentences = chain.from_iterable(get_sentences.iter_sentences(file_path) for file_path in all_paths)
             
-        self.current_linear_interpolation = Calculate_Linear_Interpolation(trigram_model_all_info[1], trigram_model_all_info[2], trigram_model_all_info[3], trigram_model_all_info[4], self.END_SYMBOL, self.START_SYMBOL)
+            all_sentences.extend(islice(document_sentences, sentences_per_document))
         
+        return all_sentences[:sentence_count]
     
-    def show_first_word_in_sentence(self, model_name, trigram_model, show):
+    def get_perplexity(self, model_name, all_sentences, unknown_word=None):
         """
-        Takes a model name and trigram model object, and predicts the first word of a sentence.
-        Prints the word and the probability
-        """        
-        if model_name != self.current_model_name:
-            self.update_current_name_and_linear_interpolation(model_name, trigram_model)
-        
+        Returns the perplexity of the trigram model on the sentences, or None if there aren't any sentences. If unknown_word is given, the words that aren't in the model are replaced with it.
+        """
+        if not all_sentences or model_name not in self.all_trigram_models: return None
         
-        self.current_linear_interpolation.show_next_word(model_name, show, self.START_SYMBOL, self.START_SYMBOL)
+        trigram_model_all_info = self.all_trigram_models[model_name].get_model_information()
+        linear_interpolation = Calculate_Linear_Interpolation(trigram_model_all_info[1], trigram_model_all_info[2], trigram_model_all_info[3], trigram_model_all_info[4], self.END_SYMBOL, self.START_SYMBOL, vocabulary=trigram_model_all_info[5])
         
-    def get_user_sentences(self, user_sentence):
+        return linear_interpolation.perplexity(all_sentences, unknown_word)
+    
+    def print_pruning_report(self, report):
         """
-        Takes a string that represents the user sentence so far. 
-        Returns a 2d list of all the sentence and it's words.
+        Prints the number of n-grams of every model before and after pruning, the size of the binary files (12 bytes for every n-gram), and the perplexity.
         """
-        user_input_sentence = Get_Sentences(END_SYMBOL=self.END_SYMBOL)
+        all_n_grams_before = 0
+        all_n_grams_after = 0
         
-        self.all_user_sentences = user_input_sentence.sentences_from_user(user_sentence)
+        for model_name, model_report in report['models'].items():
+            n_grams_before = sum(model_report['before'].values())
+            n_grams_after = sum(model_report['after'].values())
+            
+            all_n_grams_before += n_grams_before
+            all_n_grams_after += n_grams_after
+            
+            sizes = ', '.join(f'{order}: {model_report["before"][order]:,} -> {model_report["after"][order]:,}' for order in model_report['before'])
+            print(f'\t\t- Pruned the "{model_name}" model ({sizes})')
         
-        return self.all_user_sentences
+        print(f'\t\t- All models: {all_n_grams_before:,} -> {all_n_grams_after:,} n-grams (about {12 * all_n_grams_before:,} -> {12 * all_n_grams_after:,} bytes)')
+        print(f'\t\t- TF-IDF model: {report["tf_idf_words_before"]:,} -> {report["tf_idf_words_after"]:,} words')
         
-    def show_next_word(self, model_name, trigram_model, show):
+        if report['perplexity_before'] is not None:
+            print(f'\t\t- Perplexity of the "{self.ALL_MODEL_NAME}" model: {report["perplexity_before"]:.2f} -> {report["perplexity_after"]:.2f}')
+    
+    def share_trigram_models(self):
         """
-        Takes the model name and the trigram model object. Also takes show which is how many top probabilites should be shown.
+        Moves the counts of every document model into one N_Gram_Store and replaces the models with read-only views of it. The ALL_MODEL_NAME model is the total column of the store, so the counts of the documents are only stored once and never merged one n-gram at a time.
+        The document models are finished with fix_n_gram_count() first. The predictions are the same as with the Trigram_Model of every document and the ALL_MODEL_NAME model made with add_all_counts().
         
-        Return the next word based on the the previous two words in the last sentence in self.all_user_sentences
+        Returns a dict() where the keys are the model names and values are the views.
         """
-        if model_name != self.current_model_name:
-            self.update_current_name_and_linear_interpolation(model_name, trigram_model)
+        all_document_models = {}
+        for model_name in list(self.all_trigram_models):
+            if model_name == self.ALL_MODEL_NAME: continue
+            
+            all_document_models[model_name] = self.get_trigram_model_to_update(model_name)
+            all_document_models[model_name].fix_n_gram_count()
         
-        if len(self.all_user_sentences[-1]) == 2:
-            self.current_linear_interpolation.show_next_word(model_name, show, self.START_SYMBOL, self.all_user_sentences[-1][-2])
-        else:
-            self.current_linear_interpolation.show_next_word(model_name, show, self.all_user_sentences[-1][-3], self.all_user_sentences[-1][-2])
+        self.n_gram_store = N_Gram_Store(self.vocabulary, self.START_SYMBOL, self.END_SYMBOL)
         
-    def find_most_similar_model(self, all_user_sentences, df, in_place="True"):
-        """
-        Takes the user sentence and takes a Documents_Frequency object. 
+        with metrics.timer('share'):
+            self.n_gram_store.add_trigram_models(all_document_models)
         
-        Adds the user sentence to the Documents_Frequency model. Converts the Documents_Frequency to TF-IDF. Uses Cosine_Similarity to find the document that is most similar to the last document(user's sentence document).
-        Returns the model name of the most similar document.
-        """
-        # Create the trigram model for the user sentence and then add the sentences to the model.
-        user_sentences_model = Trigram_Model("USER", self.START_SYMBOL, self.END_SYMBOL)
-        user_sentences_model.add_sentences_to_model(all_user_sentences)
-
-        # Add the user's trigram model to our document frequency.
-        df.add_one_document(user_sentences_model.model_name, user_sentences_model.unigram_count)
-        df.finalize_document_frequency()
+        self.all_trigram_models = {model_name: self.n_gram_store.get_document_model(model_name) for model_name in all_document_models}
+        self.all_trigram_models[self.ALL_MODEL_NAME] = self.n_gram_store.get_total_model(self.ALL_MODEL_NAME)
         
-        # Calculate the TF_IDF and find the most similar document
-        tf_idf = TF_IDF()
-        similarity = Cosine_Similarity()
-        if in_place:
-            tf_idf.calculate_TF_IDF(df.all_document_frequency, df.total_number_of_documents, df.bag_of_words_and_document_count)
-            
-            model_name = similarity.calculate_similarity(df.all_documents_name, df.all_document_frequency)
-        else:
-            tf_idf_matrix = tf_idf.calculate_new_TF_IDF(df.all_document_frequency, df.total_number_of_documents, df.bag_of_words_and_document_count)
+        print(f'\t\t- Stored {len(all_document_models)} document models and the "{self.ALL_MODEL_NAME}" model in one n-gram table ({self.n_gram_store.get_size_in_bytes():,} bytes)\n')
+        
+        return self.all_trigram_models
+    
+    def fix_n_grams_model(self):
+        """
+        Add 2 start symbol to the bigram_count based on how many end symbols are in the unigram count. Adds 1 start symbol to the unigram_count based on how many end symbols are in the unigram count.
+        Read-only Sorted_Array_Model models are made from finished models, so they are skipped.
+        """
+        for trigram_model in self.all_trigram_models.values():
+            if isinstance(trigram_model, Sorted_Array_Model): continue
             
-            model_name = similarity.calculate_similarity(df.all_documents_name, tf_idf_matrix)
-
-        return model_name
+            trigram_model.fix_n_gram_count()
+        
+        return self.all_trigram_models
+        
+        
+        
+class Auto_Complete_And_TF_IDF:
+    """
+    Prints the predictions of one user for the input() loop of main.py. The user's text and the model of the most similar document are kept by an Autocomplete_Session, this class only shows its predictions on the console.
+    """
+    def __init__(self, session) -> None:
+        # Autocomplete_Session from Prediction_Engine.create_session()
+        self.session = session
+        self.prediction_engine = session.prediction_engine
     
+    def add_user_text(self, user_text):
+        """
+        Takes the next words of the user. When a sentence is finished, the session changes the model to the most similar document.
+        Returns the model name.
+        """
+        return self.session.add_text(user_text)
+    
+    def show_first_word_in_sentence(self):
+        """
+        Predicts the first word of a sentence with the current model. Prints the words and the probabilities.
+        """
+        self.show_top_words(self.prediction_engine.START_SYMBOL, self.prediction_engine.START_SYMBOL)
     
+    def show_next_word(self):
+        """
+        Predicts the next word based on the previous two words of the unfinished sentence with the current model. Prints the words and the probabilities.
+        """
+        word2, word1 = self.prediction_engine.get_context(self.session.user_sentences.get_open_sentence())
+        
+        self.show_top_words(word2, word1)
+    
+    def show_top_words(self, word2, word1):
+        """
+        Prints the most likely words after "word2 word1" with the current model of the session.
+        """
+        model_name = self.session.model_name
+        show_top = self.session.show_top or self.prediction_engine.show_top
         
-        
\ No newline at end of file
+        self.prediction_engine.get_linear_interpolation(model_name).show_next_word(model_name, show_top, word2, word1)
@@ -0,0 +1,457 @@
+"""
+Benchmark suite for every stage of the models. Times the tokenization (Get_Sentences), the counting (Trigram_Model), saving and loading the models, Calculate_Linear_Interpolation.predict_next_words() per call, completing a word one keystroke at a time, and find_most_similar_model() per sentence.
+Runs on the "corpus" folder and on synthetic corpora. The synthetic corpora use the first "tokens_per_document" tokens of every document of the "corpus" folder, and a corpus with scale N has N copies of every document where every copy adds a different suffix to its words. So the 10x and 100x corpora have 10 and 100 times the documents and the different words of that sample, while the tokens per document stay the same.
+
+The results are saved as JSON so runs can be compared. With --metrics, the instrumentation metrics of every corpus are saved with the results, but the times include the cost of recording them. With --compare, every time is compared to an older results file and the exit code is 1 if a time is slower than --threshold times the old time.
+
+Run from the "src" folder:
+    python -m benchmarks.benchmark_suite
+    python -m benchmarks.benchmark_suite --scales 1 10 --output new_results.json --compare old_results.json
+"""
+
+import json
+import platform
+import sys
+
+from argparse import ArgumentParser
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from io import StringIO
+from os import chdir, getcwd, makedirs, symlink, walk
+from os.path import abspath, getsize, join
+from random import Random
+from shutil import copytree
+from string import ascii_lowercase, punctuation
+from subprocess import CalledProcessError, run
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+import numpy as np
+
+from path_to_files import Path_To_Files
+
+from instrumentation import metrics
+
+from auto_complete_and_TF_IDF import N_Gram_And_TF_IDF_Models
+
+from prediction_engine import Prediction_Engine
+
+from N_Gram_Model import Get_Sentences, Vocabulary, Trigram_Model, Calculate_Linear_Interpolation
+
+START_SYMBOL = "<*>"
+END_SYMBOL = "<STOP>"
+ALL_MODEL_NAME = "ALL"
+
+# Times that are compared with --compare
+COMPARED_METRICS = ('seconds', 'mean_us', 'p50_us', 'p95_us')
+
+def get_word_suffix(copy_number):
+    """
+    Returns the suffix added to the words of the "copy_number" copy of a document. The first copy doesn't have a suffix. Only letters are used so the tokenizer keeps the suffix.
+    """
+    suffix = ''
+    while copy_number > 0:
+        copy_number, letter = divmod(copy_number - 1, len(ascii_lowercase))
+        suffix = ascii_lowercase[letter] + suffix
+    
+    return suffix
+
+def get_document_tokens(all_document_paths_from_corpus, tokens_per_document):
+    """
+    Returns a dict() where keys are the document names and values are the first "tokens_per_document" tokens of the document's files.
+    """
+    all_document_tokens = {}
+    for document_name, all_paths in all_document_paths_from_corpus.items():
+        tokens = []
+        for file_path in all_paths:
+            with open(file_path, errors="ignore") as file:
+                for line in file:
+                    tokens.extend(line.split())
+                    if len(tokens) >= tokens_per_document: break
+            
+            if len(tokens) >= tokens_per_document: break
+        
+        all_document_tokens[document_name] = tokens[:tokens_per_document]
+    
+    return all_document_tokens
+
+def create_synthetic_corpus(corpus_path, all_document_tokens, scale):
+    """
+    Creates "scale" copies of every document in all_document_tokens in the corpus_path folder. The words of every copy have a different suffix, added before the punctuation at the end of the word so the sentences end at the same words.
+    """
+    for copy_number in range(scale):
+        suffix = get_word_suffix(copy_number)
+        
+        for document_name, tokens in all_document_tokens.items():
+            document_path = join(corpus_path, f'{document_name}_{copy_number}')
+            makedirs(document_path)
+            
+            synthetic_tokens = []
+            for token in tokens:
+                # Tokens that don't start with a letter are skipped by the tokenizer anyway
+                if token[0].isalpha():
+                    word = token.rstrip(punctuation)
+                    token = word + suffix + token[len(word):]
+                
+                synthetic_tokens.append(token)
+            
+            with open(join(document_path, f'{document_name}.txt'), 'w') as file:
+                file.write(' '.join(synthetic_tokens))
+
+def get_folder_size(folder_path):
+    """
+    Returns the size in bytes of all the files in the folder.
+    """
+    return sum(getsize(join(path, file)) for path, _, files in walk(folder_path) for file in files)
+
+def get_call_times(all_times):
+    """
+    Takes a list with the seconds of every call. Returns a dict() with the mean and percentiles in microseconds.
+    """
+    all_times = np.array(all_times) * 1e6
+    
+    return {
+        'calls': len(all_times),
+        'mean_us': float(all_times.mean()),
+        'p50_us': float(np.percentile(all_times, 50)),
+        'p95_us': float(np.percentile(all_times, 95)),
+        'p99_us': float(np.percentile(all_times, 99)),
+    }
+
+def benchmark_tokenize(all_document_paths_from_corpus, repeat):
+    """
+    Tokenizes every file with Get_Sentences "repeat" times. Returns the stage results and the sentences of every document from the last run.
+    """
+    best_time = float('inf')
+    all_document_sentences = {}
+    
+    for _ in range(repeat):
+        get_sentences = Get_Sentences(END_SYMBOL)
+        
+        start = perf_counter()
+        all_document_sentences = {document_name: [sentence for file_path in all_paths for sentence in get_sentences.iter_sentences(file_path)] for document_name, all_paths in all_document_paths_from_corpus.items()}
+        best_time = min(best_time, perf_counter() - start)
+    
+    token_count = sum(len(sentence) for all_sentences in all_document_sentences.values() for sentence in all_sentences)
+    
+    return {'seconds': best_time, 'tokens': token_count, 'tokens_per_second': token_count / best_time}, all_document_sentences
+
+def benchmark_count(all_document_sentences, repeat):
+    """
+    Counts the sentences of every document into its Trigram_Model and the "ALL" model, the same as N_Gram_And_TF_IDF_Models.trigram_models_from_files(), "repeat" times.
+    Returns the stage results and the models from the last run.
+    """
+    best_time = float('inf')
+    models = None
+    
+    for _ in range(repeat):
+        models = N_Gram_And_TF_IDF_Models(START_SYMBOL, END_SYMBOL, ALL_MODEL_NAME)
+        
+        start = perf_counter()
+        models.vocabulary = Vocabulary()
+        entire_corpus_model = Trigram_Model(model_name=ALL_MODEL_NAME, start_symbol=START_SYMBOL, end_symbol=END_SYMBOL, vocabulary=models.vocabulary)
+        
+        models.all_trigram_models = {}
+        for document_name, all_sentences in all_document_sentences.items():
+            documents_trigram_model = Trigram_Model(model_name=document_name, start_symbol=START_SYMBOL, end_symbol=END_SYMBOL, vocabulary=models.vocabulary)
+            documents_trigram_model.add_sentences_to_model(all_sentences)
+            
+            models.all_trigram_models[document_name] = documents_trigram_model
+            entire_corpus_model.add_all_counts(documents_trigram_model.unigram_count, documents_trigram_model.bigram_count, documents_trigram_model.trigram_count, documents_trigram_model.all_words_count)
+        
+        models.all_trigram_models[ALL_MODEL_NAME] = entire_corpus_model
+        best_time = min(best_time, perf_counter() - start)
+    
+    token_count = sum(len(sentence) for all_sentences in all_document_sentences.values() for sentence in all_sentences)
+    
+    return {'seconds': best_time, 'tokens_per_second': token_count / best_time}, models
+
+def benchmark_tf_idf(models):
+    """
+    Creates the document frequency model of the documents.
+    """
+    start = perf_counter()
+    models.df = models.df_model_from_corpus()
+    seconds = perf_counter() - start
+    
+    models.fix_n_grams_model()
+    
+    return {'seconds': seconds}
+
+def benchmark_save(models):
+    """
+    Saves the models to the "model" folder as binary files, including compiling the top words tables.
+    """
+    start = perf_counter()
+    models.save_models_to_files(binary=True)
+    seconds = perf_counter() - start
+    
+    return {'seconds': seconds, 'bytes': get_folder_size('model')}
+
+def benchmark_load(lazy):
+    """
+    Loads the models from the "model" folder. Returns the stage results and the loaded models.
+    """
+    models = N_Gram_And_TF_IDF_Models(START_SYMBOL, END_SYMBOL, ALL_MODEL_NAME)
+    
+    start = perf_counter()
+    models.get_models_from_models_folder(lazy=lazy)
+    seconds = perf_counter() - start
+    
+    return {'seconds': seconds}, models
+
+def benchmark_predict(trigram_model, all_sentences, calls, random, show_top=3):
+    """
+    Times Calculate_Linear_Interpolation.predict_next_words() and getting the top "show_top" words for "calls" random contexts from the sentences.
+    The top words table isn't used, so every call calculates the probabilities.
+    """
+    all_contexts = []
+    for _ in range(calls):
+        sentence = [START_SYMBOL, START_SYMBOL] + random.choice(all_sentences)
+        index = random.randrange(2, len(sentence))
+        
+        all_contexts.append((sentence[index - 2], sentence[index - 1]))
+    
+    trigram_model_all_info = trigram_model.get_model_information()
+    linear_interpolation = Calculate_Linear_Interpolation(trigram_model_all_info[1], trigram_model_all_info[2], trigram_model_all_info[3], trigram_model_all_info[4], END_SYMBOL, START_SYMBOL, trigram_model.get_successor_index(), vocabulary=trigram_model_all_info[5])
+    
+    all_times = []
+    for word2, word1 in all_contexts:
+        start = perf_counter()
+        linear_interpolation.predict_next_words(word2, word1, show_top)
+        linear_interpolation.get_next_words(show_top)
+        all_times.append(perf_counter() - start)
+    
+    return get_call_times(all_times)
+
+def benchmark_complete_word(trigram_model, all_sentences, calls, random, show_top=3):
+    """
+    Times Calculate_Linear_Interpolation.get_top_words_with_prefix() for every keystroke of "calls" random words from the sentences, like a user typing the word one character at a time.
+    """
+    all_keystrokes = []
+    for _ in range(calls):
+        sentence = [START_SYMBOL, START_SYMBOL] + random.choice(all_sentences)
+        index = random.randrange(2, len(sentence))
+        
+        for length in range(1, len(sentence[index]) + 1):
+            all_keystrokes.append((sentence[index - 2], sentence[index - 1], sentence[index][:length]))
+    
+    trigram_model_all_info = trigram_model.get_model_information()
+    linear_interpolation = Calculate_Linear_Interpolation(trigram_model_all_info[1], trigram_model_all_info[2], trigram_model_all_info[3], trigram_model_all_info[4], END_SYMBOL, START_SYMBOL, trigram_model.get_successor_index(), prefix_index=trigram_model.get_prefix_index(), vocabulary=trigram_model_all_info[5])
+    
+    all_times = []
+    for word2, word1, prefix in all_keystrokes:
+        start = perf_counter()
+        linear_interpolation.get_top_words_with_prefix(show_top, word2, word1, prefix)
+        all_times.append(perf_counter() - start)
+    
+    return get_call_times(all_times)
+
+def benchmark_route(df, all_sentences, calls, random):
+    """
+    Times Prediction_Engine.find_most_similar_model() for "calls" random sentences. The TF-IDF index is built by the first call, so it's timed separately.
+    """
+    # Only the TF-IDF models are used to find the most similar document
+    prediction_engine = Prediction_Engine({}, df, START_SYMBOL, END_SYMBOL, ALL_MODEL_NAME)
+    
+    all_user_sentences = [[random.choice(all_sentences)] for _ in range(calls)]
+    
+    start = perf_counter()
+    df.get_tf_idf_index()
+    index_seconds = perf_counter() - start
+    
+    all_times = []
+    for user_sentences in all_user_sentences:
+        start = perf_counter()
+        prediction_engine.find_most_similar_model(user_sentences)
+        all_times.append(perf_counter() - start)
+    
+    results = get_call_times(all_times)
+    results['index_build_seconds'] = index_seconds
+    
+    return results
+
+def benchmark_corpus(corpus_path, arguments, random):
+    """
+    Runs every stage on the corpus in corpus_path. The models are saved in a temporary "model" folder.
+    Returns a dict() with the corpus information and the results of every stage.
+    """
+    current_path = getcwd()
+    
+    with TemporaryDirectory() as benchmark_path:
+        # Path_To_Files uses the "corpus" and "model" folders in the current folder
+        try:
+            symlink(corpus_path, join(benchmark_path, 'corpus'))
+        except OSError:
+            copytree(corpus_path, join(benchmark_path, 'corpus'))
+        
+        makedirs(join(benchmark_path, 'model', 'all_trigram_models'))
+        makedirs(join(benchmark_path, 'model', 'tf_idf'))
+        
+        chdir(benchmark_path)
+        try:
+            with redirect_stdout(StringIO()):
+                all_document_paths_from_corpus = Path_To_Files().get_all_documents_file_from_corpus()
+            
+            stages = {}
+            stages['tokenize'], all_document_sentences = benchmark_tokenize(all_document_paths_from_corpus, arguments.repeat)
+            stages['count'], models = benchmark_count(all_document_sentences, arguments.repeat)
+            
+            with redirect_stdout(StringIO()):
+                stages['tf_idf'] = benchmark_tf_idf(models)
+                stages['save'] = benchmark_save(models)
+                
+                # Only the saved models are used from now on, so the models in memory are removed before loading
+                vocabulary_size = len(models.vocabulary)
+                del models
+                
+                stages['load'] = benchmark_load(lazy=False)[0]
+                stages['load_lazy'], loaded_models = benchmark_load(lazy=True)
+            
+            all_sentences = [sentence for all_sentences in all_document_sentences.values() for sentence in all_sentences]
+            
+            stages['predict_next_words'] = benchmark_predict(loaded_models.all_trigram_models[ALL_MODEL_NAME], all_sentences, arguments.predict_calls, random)
+            stages['complete_word'] = benchmark_complete_word(loaded_models.all_trigram_models[ALL_MODEL_NAME], all_sentences, arguments.predict_calls, random)
+            stages['find_most_similar_model'] = benchmark_route(loaded_models.df, all_sentences, arguments.route_sentences, random)
+        finally:
+            chdir(current_path)
+    
+    return {
+        'documents': len(all_document_paths_from_corpus),
+        'files': sum(len(all_paths) for all_paths in all_document_paths_from_corpus.values()),
+        'tokens': stages['tokenize']['tokens'],
+        'vocabulary': vocabulary_size,
+        'stages': stages,
+    }
+
+def get_git_commit():
+    """
+    Returns the current git commit, or None if it can't be found.
+    """
+    try:
+        return run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, CalledProcessError):
+        return None
+
+def compare_results(results, old_results, threshold):
+    """
+    Compares every time in results to the same time in old_results. Prints the ratio of every time and returns the list of times that are slower than "threshold" times the old time.
+    """
+    regressions = []
+    
+    print(f'\n\tComparing to the results from {old_results["metadata"].get("date")}')
+    for corpus_name, corpus_results in results['corpora'].items():
+        old_corpus_results = old_results['corpora'].get(corpus_name)
+        if old_corpus_results is None: continue
+        
+        for stage_name, stage_results in corpus_results['stages'].items():
+            old_stage_results = old_corpus_results['stages'].get(stage_name, {})
+            
+            for metric in COMPARED_METRICS:
+                if metric not in stage_results or not old_stage_results.get(metric): continue
+                
+                ratio = stage_results[metric] / old_stage_results[metric]
+                name = f'{corpus_name}.{stage_name}.{metric}'
+                
+                if ratio > threshold:
+                    regressions.append(name)
+                    print(f'\t\t- REGRESSION {name}: {old_stage_results[metric]:.6g} -> {stage_results[metric]:.6g} ({ratio:.2f}x)')
+                else:
+                    print(f'\t\t- {name}: {old_stage_results[metric]:.6g} -> {stage_results[metric]:.6g} ({ratio:.2f}x)')
+    
+    return regressions
+
+def get_arguments():
+    parser = ArgumentParser(description='Benchmarks the tokenization, counting, saving, loading, prediction and routing of the models.')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100], help='Scale 1 is the "corpus" folder, every other scale is a synthetic corpus with that many times the documents and words.')
+    parser.add_argument('--tokens-per-document', type=int, default=10000, help='Number of tokens in every document of the synthetic corpora.')
+    parser.add_argument('--predict-calls', type=int, default=1000, help='Number of predict_next_words() calls, and of words completed one keystroke at a time.')
+    parser.add_argument('--route-sentences', type=int, default=500, help='Number of find_most_similar_model() calls.')
+    parser.add_argument('--repeat', type=int, default=1, help='Number of times the tokenization and counting are timed. The fastest time is used.')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the random contexts and sentences.')
+    parser.add_argument('--output', default='benchmark_results.json', help='Path to the JSON results file.')
+    parser.add_argument('--compare', help='Path to an older JSON results file to compare to.')
+    parser.add_argument('--metrics', action='store_true', help='Turns on the instrumentation metrics and saves a snapshot for every corpus.')
+    parser.add_argument('--threshold', type=float, default=1.2, help='A time is a regression if it is slower than threshold times the old time.')
+    
+    return parser.parse_args()
+
+def main():
+    arguments = get_arguments()
+    
+    with redirect_stdout(StringIO()):
+        all_document_paths_from_corpus = Path_To_Files().get_all_documents_file_from_corpus()
+    
+    if not all_document_paths_from_corpus:
+        print('\n\tNo documents found in the "corpus" folder.')
+        return 1
+    
+    results = {
+        'metadata': {
+            'date': datetime.now(timezone.utc).isoformat(),
+            'git_commit': get_git_commit(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+        },
+        'parameters': vars(arguments),
+        'corpora': {},
+    }
+    
+    for scale in arguments.scales:
+        # The same seed for every corpus so the runs are the same
+        random = Random(arguments.seed)
+        
+        if arguments.metrics:
+            metrics.reset()
+            metrics.enable()
+        
+        if scale == 1:
+            corpus_name = 'corpus'
+            print(f'\n\tBenchmarking the "corpus" folder')
+            
+            results['corpora'][corpus_name] = benchmark_corpus(abspath('corpus'), arguments, random)
+        else:
+            corpus_name = f'synthetic_{scale}x'
+            print(f'\n\tBenchmarking the synthetic corpus with {scale}x documents and words')
+            
+            with TemporaryDirectory() as corpus_path:
+                all_document_tokens = get_document_tokens(all_document_paths_from_corpus, arguments.tokens_per_document)
+                create_synthetic_corpus(corpus_path, all_document_tokens, scale)
+                
+                results['corpora'][corpus_name] = benchmark_corpus(corpus_path, arguments, random)
+        
+        corpus_results = results['corpora'][corpus_name]
+        stages = corpus_results['stages']
+        
+        if arguments.metrics:
+            corpus_results['metrics'] = metrics.snapshot()
+        
+        print(f'\t\t- Documents: {corpus_results["documents"]}, tokens: {corpus_results["tokens"]}, vocabulary: {corpus_results["vocabulary"]}')
+        print(f'\t\t- Tokenize: {stages["tokenize"]["seconds"]:.3f}s ({stages["tokenize"]["tokens_per_second"]:,.0f} tokens/sec)')
+        print(f'\t\t- Count: {stages["count"]["seconds"]:.3f}s ({stages["count"]["tokens_per_second"]:,.0f} tokens/sec)')
+        print(f'\t\t- TF-IDF: {stages["tf_idf"]["seconds"]:.3f}s')
+        print(f'\t\t- Save: {stages["save"]["seconds"]:.3f}s ({stages["save"]["bytes"]:,} bytes)')
+        print(f'\t\t- Load: {stages["load"]["seconds"]:.3f}s, lazy load: {stages["load_lazy"]["seconds"]:.3f}s')
+        print(f'\t\t- predict_next_words: {stages["predict_next_words"]["mean_us"]:.1f}us per call (p95 {stages["predict_next_words"]["p95_us"]:.1f}us)')
+        print(f'\t\t- complete_word: {stages["complete_word"]["mean_us"]:.1f}us per keystroke (p95 {stages["complete_word"]["p95_us"]:.1f}us)')
+        print(f'\t\t- find_most_similar_model: {stages["find_most_similar_model"]["mean_us"]:.1f}us per sentence (p95 {stages["find_most_similar_model"]["p95_us"]:.1f}us)')
+    
+    with open(arguments.output, 'w') as output_file:
+        json.dump(results, output_file, indent=4)
+    
+    print(f'\n\tSaved the results to "{arguments.output}"')
+    
+    if arguments.compare:
+        with open(arguments.compare) as file:
+            old_results = json.load(file)
+        
+        regressions = compare_results(results, old_results, arguments.threshold)
+        if regressions:
+            print(f'\n\t{len(regressions)} times are slower than {arguments.threshold}x the old times.')
+            return 1
+    
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""
+Accuracy and memory report of the compact storage. Creates the trigram models from the "corpus" folder and compiles the top words table of every model with exact probabilities and with 16 and 8 bit quantized probabilities.
+For every quantization level prints how many contexts have a different top word, a different order or different top words than the exact table, and the relative error of the probabilities.
+Also prints the memory of the counts and the tables stored in dicts and in the compact NumPy arrays.
+
+Run from the "src" folder:
+    python -m benchmarks.quantization_report
+    python -m benchmarks.quantization_report --models ALL --top 5 --output quantization_report.json
+"""
+
+import json
+
+from argparse import ArgumentParser
+from contextlib import redirect_stdout
+from io import StringIO
+from sys import getsizeof
+
+from auto_complete_and_TF_IDF import N_Gram_And_TF_IDF_Models
+
+from N_Gram_Model import Sorted_Array_Model
+
+START_SYMBOL = "<*>"
+END_SYMBOL = "<STOP>"
+ALL_MODEL_NAME = "ALL"
+
+def get_dict_bytes(n_gram_count, count_keys=True):
+    """
+    Returns the bytes of a dict() of counts: the dict, the keys if count_keys is True, and the counts that aren't small ints shared by Python.
+    """
+    size = getsizeof(n_gram_count) + sum(getsizeof(count) for count in n_gram_count.values() if count > 256)
+    
+    if count_keys:
+        size += sum(getsizeof(key) for key in n_gram_count)
+    
+    return size
+
+def get_table_dict_bytes(top_words_table):
+    """
+    Returns the bytes of the dict() of a Top_Words_Table: the dict, the packed contexts, the tuples and the probabilities. The words are shared with the vocabulary.
+    """
+    size = getsizeof(top_words_table.top_words)
+    
+    for context, top_words in top_words_table.top_words.items():
+        size += getsizeof(context) + getsizeof(top_words) + sum(getsizeof(word_and_p) + getsizeof(word_and_p[1]) for word_and_p in top_words)
+    
+    return size
+
+def get_count_bytes(trigram_model):
+    """
+    Returns the bytes of the counts of a Trigram_Model stored in dicts and in the sorted arrays of a Sorted_Array_Model.
+    """
+    dict_bytes = get_dict_bytes(trigram_model.unigram_count, count_keys=False) + get_dict_bytes(trigram_model.bigram_count) + get_dict_bytes(trigram_model.trigram_count)
+    
+    sorted_array_model = Sorted_Array_Model()
+    sorted_array_model.add_trigram_model(trigram_model)
+    
+    unigram_count = sorted_array_model.unigram_count
+    array_bytes = unigram_count.word_ids.nbytes + unigram_count.id_counts.keys.nbytes + unigram_count.id_counts.counts.nbytes
+    for n_gram_count in (sorted_array_model.bigram_count, sorted_array_model.trigram_count):
+        array_bytes += n_gram_count.keys.nbytes + n_gram_count.counts.nbytes
+    
+    return dict_bytes, array_bytes
+
+def compare_tables(exact_table, quantized_table):
+    """
+    Compares the top words of every context of the quantized table to the exact table.
+    Returns a dict() with the fraction of contexts with a different top word, order and set of words, and the mean and max relative error of the probabilities of the words in both tables.
+    """
+    top_word_changes = 0
+    order_changes = 0
+    set_changes = 0
+    
+    all_errors = []
+    for context, exact_top_words in exact_table.top_words.items():
+        quantized_top_words = quantized_table.top_words[context]
+        
+        exact_words = [word for word, _ in exact_top_words]
+        quantized_words = [word for word, _ in quantized_top_words]
+        
+        top_word_changes += exact_words[:1] != quantized_words[:1]
+        order_changes += exact_words != quantized_words
+        set_changes += set(exact_words) != set(quantized_words)
+        
+        exact_probabilities = dict(exact_top_words)
+        all_errors.extend(abs(p - exact_probabilities[word]) / exact_probabilities[word] for word, p in quantized_top_words if word in exact_probabilities)
+    
+    contexts_count = max(len(exact_table.top_words), 1)
+    
+    return {
+        'top_word_changed': top_word_changes / contexts_count,
+        'order_changed': order_changes / contexts_count,
+        'words_changed': set_changes / contexts_count,
+        'mean_relative_error': sum(all_errors) / len(all_errors) if all_errors else 0.0,
+        'max_relative_error': max(all_errors, default=0.0),
+    }
+
+def report_model(models, model_name, top_words_count, all_quantization_bits):
+    """
+    Compiles the tables of one model with exact and quantized probabilities. Returns a dict() with the memory of the counts and tables and the comparison of every quantization level.
+    """
+    trigram_model = models.all_trigram_models[model_name]
+    
+    dict_bytes, array_bytes = get_count_bytes(trigram_model)
+    
+    all_tables = {}
+    for quantization_bits in (None,) + tuple(all_quantization_bits):
+        with redirect_stdout(StringIO()):
+            models.compile_top_words_tables(top_words_count, [model_name], quantization_bits)
+        
+        all_tables[quantization_bits] = trigram_model.top_words_table
+    
+    exact_table = all_tables[None]
+    report = {
+        'contexts': len(exact_table.top_words),
+        'counts_dict_bytes': dict_bytes,
+        'counts_array_bytes': array_bytes,
+        'table_dict_bytes': get_table_dict_bytes(exact_table),
+        'levels': {},
+    }
+    
+    for quantization_bits in all_quantization_bits:
+        report['levels'][quantization_bits] = compare_tables(exact_table, all_tables[quantization_bits])
+    
+    # The tables are compared before compact() because it empties the dicts
+    for quantization_bits, top_words_table in all_tables.items():
+        top_words_table.compact()
+        
+        if quantization_bits is None:
+            report['table_compact_bytes'] = top_words_table.get_size_in_bytes()
+        else:
+            report['levels'][quantization_bits]['table_compact_bytes'] = top_words_table.get_size_in_bytes()
+    
+    return report
+
+def get_arguments():
+    parser = ArgumentParser(description='Compares the top words tables with quantized probabilities to the exact tables, and the memory of the dicts and the compact arrays.')
+    parser.add_argument('--models', nargs='+', help='Names of the models to report. By default every model.')
+    parser.add_argument('--top', type=int, default=3, help='Number of words in the top words tables.')
+    parser.add_argument('--bits', type=int, nargs='+', default=[16, 8], choices=(8, 16), help='Quantization levels to compare to the exact probabilities.')
+    parser.add_argument('--output', help='Path to a JSON file for the report.')
+    
+    return parser.parse_args()
+
+def main():
+    arguments = get_arguments()
+    
+    models = N_Gram_And_TF_IDF_Models(START_SYMBOL=START_SYMBOL, END_SYMBOL=END_SYMBOL, ALL_MODEL_NAME=ALL_MODEL_NAME)
+    with redirect_stdout(StringIO()):
+        models.create_models_from_corpus()
+        models.fix_n_grams_model()
+    
+    if not models.all_trigram_models:
+        print('\n\tNo documents found in the "corpus" folder.')
+        return
+    
+    all_reports = {}
+    for model_name in arguments.models or list(models.all_trigram_models):
+        report = all_reports[model_name] = report_model(models, model_name, arguments.top, arguments.bits)
+        
+        print(f'\n\t"{model_name}" model: {report["contexts"]:,} contexts, top {arguments.top} words')
+        print(f'\t\t- Counts: {report["counts_dict_bytes"]:,} bytes in dicts -> {report["counts_array_bytes"]:,} bytes in arrays')
+        print(f'\t\t- Table: {report["table_dict_bytes"]:,} bytes in a dict -> {report["table_compact_bytes"]:,} bytes in arrays')
+        
+        for quantization_bits, level in report['levels'].items():
+            print(f'\t\t- {quantization_bits} bits: {level["table_compact_bytes"]:,} bytes, top word changed {level["top_word_changed"]:.3%}, order changed {level["order_changed"]:.3%}, words changed {level["words_changed"]:.3%}, relative error mean {level["mean_relative_error"]:.4%} max {level["max_relative_error"]:.4%}')
+    
+    if arguments.output:
+        with open(arguments.output, 'w') as output_file:
+            json.dump(all_reports, output_file, indent=4)
+        
+        print(f'\n\tSaved the report to "{arguments.output}"')
+
+if __name__ == '__main__':
+    main()
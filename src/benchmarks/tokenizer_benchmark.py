@@ -0,0 +1,61 @@
+"""
+Micro-benchmark of Get_Sentences. Reads every file in the "corpus" folder with the original tokenizer and with the fast tokenizer and prints the tokens per second of each.
+Also checks that both tokenizers return the same sentences.
+
+Run from the "src" folder:
+    python -m benchmarks.tokenizer_benchmark
+"""
+
+from time import perf_counter
+
+from path_to_files import Path_To_Files
+
+from N_Gram_Model import Get_Sentences
+
+def count_tokens(all_file_paths):
+    """
+    Returns the number of tokens, the same as split() on every line, in all the files.
+    """
+    token_count = 0
+    for file_path in all_file_paths:
+        with open(file_path, errors="ignore") as file:
+            for line in file:
+                token_count += len(line.split())
+    
+    return token_count
+
+def time_tokenizer(all_file_paths, fast_tokenizer, repeat=3):
+    """
+    Reads all the files with a new Get_Sentences "repeat" times. Returns the fastest time in seconds and the sentences from the last run.
+    """
+    best_time = float('inf')
+    all_sentences = []
+    
+    for _ in range(repeat):
+        get_sentences = Get_Sentences("<STOP>", fast_tokenizer=fast_tokenizer)
+        
+        start = perf_counter()
+        all_sentences = [sentence for file_path in all_file_paths for sentence in get_sentences.iter_sentences(file_path)]
+        best_time = min(best_time, perf_counter() - start)
+    
+    return best_time, all_sentences
+
+def main():
+    all_document_paths_from_corpus = Path_To_Files().get_all_documents_file_from_corpus()
+    all_file_paths = [file_path for all_paths in all_document_paths_from_corpus.values() for file_path in all_paths]
+    
+    if not all_file_paths: return
+    
+    token_count = count_tokens(all_file_paths)
+    
+    original_time, original_sentences = time_tokenizer(all_file_paths, fast_tokenizer=False)
+    fast_time, fast_sentences = time_tokenizer(all_file_paths, fast_tokenizer=True)
+    
+    print(f'\n\tFiles: {len(all_file_paths)}, tokens: {token_count}')
+    print(f'\t\t- Original tokenizer: {original_time:.3f}s, {token_count / original_time:,.0f} tokens/sec')
+    print(f'\t\t- Fast tokenizer: {fast_time:.3f}s, {token_count / fast_time:,.0f} tokens/sec')
+    print(f'\t\t- Speedup: {original_time / fast_time:.2f}x')
+    print(f'\t\t- Same sentences: {original_sentences == fast_sentences}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Keeps track of the corpus files that were already added to the models. Saved in the "model" folder next to the models so the models can be updated with only the new or changed files.
+self.all_files example = {
+                            "corpus/Coronavirus/20-01.txt": ("Coronavirus", 113530, 1695025142.25, "9f86d081884c7d65...")
+                         }
+"""
+
+from hashlib import sha256
+from os import stat
+
+class Corpus_Manifest:
+    def __init__(self) -> None:
+        # Keys are the files path and values are (document name, size, mtime, content hash)
+        self.all_files = dict()
+    
+    def add_corpus(self, all_document_paths_from_corpus):
+        """
+        Takes dictionary where keys are the document name and values are all the paths to file that belong to that document. Adds every file to the manifest.
+        """
+        for document_name, all_paths in all_document_paths_from_corpus.items():
+            for file_path in all_paths:
+                self.all_files[file_path] = self.get_file_entry(document_name, file_path)
+    
+    def get_file_entry(self, document_name, file_path):
+        """
+        Returns (document name, size, mtime, content hash) of the file.
+        """
+        file_stat = stat(file_path)
+        
+        return (document_name, file_stat.st_size, file_stat.st_mtime, self.get_file_hash(file_path))
+    
+    def get_file_hash(self, file_path):
+        """
+        Returns the sha256 of the file's content.
+        """
+        file_hash = sha256()
+        with open(file_path, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b''):
+                file_hash.update(block)
+        
+        return file_hash.hexdigest()
+    
+    def get_changes(self, all_document_paths_from_corpus):
+        """
+        Takes dictionary where keys are the document name and values are all the paths to file that belong to that document.
+        Compares the files to the manifest. Files with the same size and mtime are not read again, other files are only changed if their content hash is different.
+        
+        Returns (new_files, changed_documents, removed_documents) where:
+        new_files = dict() where keys are document names and values are the new files of the document
+        changed_documents = set() of the documents that have a changed or removed file and must be counted again
+        removed_documents = set() of the documents that don't have any files anymore
+        Also updates the manifest with the current files.
+        """
+        new_files = dict()
+        changed_documents = set()
+        
+        current_files = dict()
+        for document_name, all_paths in all_document_paths_from_corpus.items():
+            for file_path in all_paths:
+                old_entry = self.all_files.get(file_path)
+                file_stat = stat(file_path)
+                
+                # Same file as before
+                if old_entry is not None and old_entry[0] == document_name and old_entry[1] == file_stat.st_size and old_entry[2] == file_stat.st_mtime:
+                    current_files[file_path] = old_entry
+                    continue
+                
+                entry = self.get_file_entry(document_name, file_path)
+                current_files[file_path] = entry
+                
+                if old_entry is None:
+                    new_files.setdefault(document_name, []).append(file_path)
+                elif old_entry[0] != document_name or old_entry[3] != entry[3]:
+                    changed_documents.add(document_name)
+                    changed_documents.add(old_entry[0])
+        
+        # Files that were removed from the corpus
+        for file_path, old_entry in self.all_files.items():
+            if file_path not in current_files:
+                changed_documents.add(old_entry[0])
+        
+        removed_documents = {document_name for document_name in changed_documents if not all_document_paths_from_corpus.get(document_name)}
+        
+        self.all_files = current_files
+        
+        return new_files, changed_documents, removed_documents
+    
+    def save_manifest_to_file(self, file_path):
+        """
+        Saves the manifest to file_path. Every line is "path\tdocument\tsize\tmtime\thash".
+        """
+        with open(file_path, 'w') as output_file:
+            for path, (document_name, size, mtime, file_hash) in self.all_files.items():
+                line = path + '\t' + document_name + '\t' + str(size) + '\t' + repr(mtime) + '\t' + file_hash + '\n'
+                output_file.write(line)
+        
+        print(f'\t\t- Added the corpus manifest to the file "{file_path}"')
+    
+    def get_manifest_from_file(self, file_path):
+        """
+        Gets the manifest from file_path.
+        """
+        with open(file_path) as file:
+            for line in file:
+                path, document_name, size, mtime, file_hash = line.rstrip('\n').split('\t')
+                
+                self.all_files[path] = (document_name, int(size), float(mtime), file_hash)
@@ -0,0 +1,168 @@
+"""
+Opt-in timers and counters for the stages of the models. Nothing is recorded until metrics.enable() is called, and when it's off every call returns right away.
+Counters are numbers that only go up. Summaries keep the count, sum, and max of every value, and timers are summaries of seconds.
+The metrics don't take a lock, so when many threads record at the same time a few values can be lost.
+self.counters example = {"tokens": 2102400, "files_read": 42}
+self.summaries example = {"tokenize_seconds": [42, 1.804, 0.201], "interpolation_candidates": [1000, 81789000, 81789]}
+
+Use:
+    from instrumentation import metrics
+    
+    metrics.enable()
+    ...
+    print(metrics.snapshot())
+    print(metrics.prometheus_text())
+"""
+
+from time import perf_counter
+
+class Metrics:
+    def __init__(self) -> None:
+        # Nothing is recorded when it's False
+        self.enabled = False
+        
+        # Keys are the counter names and values are the counts
+        self.counters = dict()
+        
+        # Keys are the summary names and values are [count, sum, max]
+        self.summaries = dict()
+    
+    def enable(self):
+        self.enabled = True
+    
+    def disable(self):
+        self.enabled = False
+    
+    def reset(self):
+        """
+        Removes all the recorded counters and summaries.
+        """
+        self.counters.clear()
+        self.summaries.clear()
+    
+    def add(self, name, value=1):
+        """
+        Adds value to the counter.
+        """
+        if not self.enabled: return
+        
+        self.counters[name] = self.counters.get(name, 0) + value
+    
+    def observe(self, name, value):
+        """
+        Adds one value to the summary.
+        """
+        if not self.enabled: return
+        
+        summary = self.summaries.get(name)
+        if summary is None:
+            self.summaries[name] = [1, value, value]
+            return
+        
+        summary[0] += 1
+        summary[1] += value
+        if value > summary[2]:
+            summary[2] = value
+    
+    def timer(self, name):
+        """
+        Returns a context manager that adds the seconds inside it to the "name_seconds" summary. Returns a shared context manager that does nothing when it's off.
+        """
+        if not self.enabled: return NO_TIMER
+        
+        return Timer(self, f'{name}_seconds')
+    
+    def time_iterator(self, name, iterator):
+        """
+        Takes an iterator. When it's on, returns an iterator with the same items that adds the seconds spent getting the items to the "name_seconds" summary, one value for the whole iterator. The time spent by the code using the items isn't included.
+        Returns the same iterator when it's off.
+        """
+        if not self.enabled: return iterator
+        
+        return self.timed_items(f'{name}_seconds', iter(iterator))
+    
+    def timed_items(self, summary_name, iterator):
+        """
+        Yields the items of the iterator and adds the seconds spent in next() to the summary when the iterator ends.
+        """
+        seconds = 0
+        while True:
+            start = perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                break
+            finally:
+                seconds += perf_counter() - start
+            
+            yield item
+        
+        self.observe(summary_name, seconds)
+    
+    def snapshot(self):
+        """
+        Returns a copy of the metrics as a dict() of dicts that can be saved as JSON.
+        snapshot example = {
+                                "counters": {"tokens": 2102400},
+                                "summaries": {"tokenize_seconds": {"count": 42, "sum": 1.804, "max": 0.201}}
+                           }
+        """
+        return {
+            'counters': dict(self.counters),
+            'summaries': {name: {'count': count, 'sum': total, 'max': max_value} for name, (count, total, max_value) in self.summaries.items()},
+        }
+    
+    def prometheus_text(self, prefix='autocomplete'):
+        """
+        Returns the metrics in the Prometheus text format. Counters end with "_total", and every summary has "_count", "_sum", and "_max" lines.
+        """
+        lines = []
+        
+        for name, count in sorted(self.counters.items()):
+            metric_name = f'{prefix}_{name}_total'
+            
+            lines.append(f'# TYPE {metric_name} counter')
+            lines.append(f'{metric_name} {count}')
+        
+        for name, (count, total, max_value) in sorted(self.summaries.items()):
+            metric_name = f'{prefix}_{name}'
+            
+            lines.append(f'# TYPE {metric_name} summary')
+            lines.append(f'{metric_name}_count {count}')
+            lines.append(f'{metric_name}_sum {total}')
+            lines.append(f'# TYPE {metric_name}_max gauge')
+            lines.append(f'{metric_name}_max {max_value}')
+        
+        return '\n'.join(lines) + '\n'
+
+class Timer:
+    """
+    Context manager that adds the seconds inside it to a summary of Metrics.
+    """
+    def __init__(self, metrics, summary_name) -> None:
+        self.metrics = metrics
+        self.summary_name = summary_name
+        self.start = None
+    
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+    
+    def __exit__(self, *exception):
+        self.metrics.observe(self.summary_name, perf_counter() - self.start)
+        return False
+
+class No_Timer:
+    """
+    Context manager that does nothing. Used when the metrics are off.
+    """
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exception):
+        return False
+
+NO_TIMER = No_Timer()
+
+# The metrics shared by all the models
+metrics = Metrics()
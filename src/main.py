@@ -9,20 +9,28 @@ Predicts the next word in a sentence by calculating the Linear Interpolation usi
 When prompted either load either the existing models or create new models from the corpus. When prompted enter a word/words and the application will predict the next word based on the most similar document.
 """
 
+from argparse import ArgumentParser
+from os import cpu_count
+
 from auto_complete_and_TF_IDF import N_Gram_And_TF_IDF_Models, Auto_Complete_And_TF_IDF
 
-def predict_next_work(all_trigram_models, df, START_SYMBOL = "<*>", END_SYMBOL = "<STOP>", ALL_MODEL_NAME = "ALL"):
+from prediction_engine import Prediction_Engine
+
+def predict_next_work(all_trigram_models, df, START_SYMBOL = "<*>", END_SYMBOL = "<STOP>", ALL_MODEL_NAME = "ALL", route_window_size=None, route_decay=None):
     """
     Takes all trigram models and DF models. Also takes the name of the ALL_MODEL_NAME
     Prompts the user for words and predict the next word. When a sentence ends, uses df model to calculate TF-IDF and changes models to the most similar document. For the following sentence uses the new trigram model.
+    route_window_size and route_decay make the most similar document follow the recent sentences, see Running_Query_Counts.
     """
-    auto_complete = Auto_Complete_And_TF_IDF(START_SYMBOL, END_SYMBOL, ALL_MODEL_NAME)
+    prediction_engine = Prediction_Engine(all_trigram_models, df, START_SYMBOL, END_SYMBOL, ALL_MODEL_NAME)
     
-    model_name = ALL_MODEL_NAME
-    sentence_string = ''
-    sentence_count = 1
+    # The session keeps the user's sentences and the current model, auto_complete prints its predictions
+    auto_complete = Auto_Complete_And_TF_IDF(prediction_engine.create_session(show_top=3, window_size=route_window_size, decay=route_decay))
+    user_sentences = auto_complete.session.user_sentences
     
-    show = 3
+    # Raw text of the unfinished sentence, only kept to show it to the user
+    sentence_string = ''
+    finished_count = 0
     
     print("\n-----------------------------------------------------------------------------------------------------------------------\n")
     
@@ -34,11 +42,11 @@ def predict_next_work(all_trigram_models, df, START_SYMBOL = "<*>", END_SYMBOL =
         if user_input == 'c' or user_input == 'C': break
         if user_input == 'n' or user_input == 'N': break
         
-        if user_input == 'r' or user_input == 'R': predict_next_work(all_trigram_models, df, START_SYMBOL, END_SYMBOL, ALL_MODEL_NAME)
+        if user_input == 'r' or user_input == 'R': predict_next_work(all_trigram_models, df, START_SYMBOL, END_SYMBOL, ALL_MODEL_NAME, route_window_size, route_decay)
         
         # If user_input is empty then show the first word of the sentence.
         if not user_input:
-            auto_complete.show_first_word_in_sentence(model_name=model_name, trigram_model=all_trigram_models[model_name], show=show)
+            auto_complete.show_first_word_in_sentence()
             continue
             
         # If user_input isn't a word we skip the word
@@ -48,11 +56,12 @@ def predict_next_work(all_trigram_models, df, START_SYMBOL = "<*>", END_SYMBOL =
         # Add current user_input to user's sentence so far.
         sentence_string = ' '.join([sentence_string, user_input])
         
-        all_user_sentences = auto_complete.get_user_sentences(sentence_string)
-                
-        # Finds the document that is most similar to the user's sentence. Uses that document for text autocomplete.    
-        if len(all_user_sentences) != sentence_count:
-            model_name = auto_complete.find_most_similar_model(all_user_sentences, df, False)
+        # Only the new words are split into sentences. When a sentence ends, the session uses the most similar document for text autocomplete.
+        model_name = auto_complete.add_user_text(user_input)
+        
+        # When a sentence ends the display string starts over, so it never grows past one sentence
+        sentence_finished = user_sentences.get_finished_count() != finished_count
+        finished_count = user_sentences.get_finished_count()
         
         # Use the current model and the last 2 words the user inputted to calculate the next word
         if model_name not in all_trigram_models:
@@ -60,43 +69,116 @@ def predict_next_work(all_trigram_models, df, START_SYMBOL = "<*>", END_SYMBOL =
             return
         
         # If there wasn't any valid words to continue
-        if not all_user_sentences: continue
-        if not all_user_sentences[-1]: continue
+        if not user_sentences.sentences: continue
         
         # Show the next work based on the previous two words
-        auto_complete.show_next_word(model_name=model_name, trigram_model=all_trigram_models[model_name], show=show)
-        
+        auto_complete.show_next_word()
         
-        if len(all_user_sentences) != sentence_count:
-                df.remove_last_document()
-                sentence_count += 1
-                
         print("\n-----------------------------------------------------------------------------------------------------------------------\n")
         
         print("\n\tSentence so far: ", sentence_string)
+        
+        if sentence_finished:
+            # The words after the end of the finished sentence are the start of the next one
+            sentence_string = ' '.join(user_sentences.get_open_sentence())
+
+
+def predict_batch(arguments, START_SYMBOL = "<*>", END_SYMBOL = "<STOP>", ALL_MODEL_NAME = "ALL", MAX_LOADED_MODELS = None):
+    """
+    Loads the models from the "model" folder and predicts every request in the "arguments.batch" JSONL file without asking for words. Writes the results to the "arguments.output" JSONL file.
+    """
+    n_gram_tf_idf_models = N_Gram_And_TF_IDF_Models(START_SYMBOL=START_SYMBOL, END_SYMBOL=END_SYMBOL, ALL_MODEL_NAME=ALL_MODEL_NAME)
+    all_trigram_models, df = n_gram_tf_idf_models.get_models_from_models_folder(lazy=True, max_loaded_models=MAX_LOADED_MODELS, compact=arguments.compact)
+    
+    if not df or not all_trigram_models:
+        print('\n\t - No n-gram and TF-IDF models found in the "model" folder.')
+        return
+    
+    prediction_engine = Prediction_Engine(all_trigram_models, df, START_SYMBOL, END_SYMBOL, ALL_MODEL_NAME, show_top=arguments.top)
+    prediction_engine.predict_jsonl(arguments.batch, arguments.output, workers=arguments.workers)
+
+def get_arguments():
+    parser = ArgumentParser(description='Predicts the next word in a sentence. Asks for words, or predicts a batch of requests from a JSONL file with --batch.')
+    parser.add_argument('--batch', help='Path to a JSONL file with one request per line, like {"id": 1, "text": "The virus is"} or {"id": 2, "context": ["virus", "is"], "model": "ALL", "top": 5}. Uses the models in the "model" folder.')
+    parser.add_argument('--output', default='predictions.jsonl', help='Path to the JSONL file with the results of --batch.')
+    parser.add_argument('--workers', type=int, help='Number of worker processes for --batch. By default the requests are predicted in this process.')
+    parser.add_argument('--top', type=int, default=3, help='Number of words predicted for every request that doesn\'t have "top".')
+    parser.add_argument('--min-counts', type=int, nargs=3, metavar=('UNIGRAM', 'BIGRAM', 'TRIGRAM'), help='Prune the new models: words with a lower count are replaced with "<UNK>", and bigrams and trigrams with a lower count are removed.')
+    parser.add_argument('--max-vocabulary', type=int, help='Prune the new models: only keep this many of the most common words in every model, the other words are replaced with "<UNK>".')
+    parser.add_argument('--min-tf-idf-count', type=int, help='Prune the new TF-IDF model: remove the words that appear less than this many times in all the documents.')
+    parser.add_argument('--quantize-bits', type=int, choices=(8, 16), help='Store the probabilities of the saved top words tables in 8 or 16 bits. By default they are stored exactly.')
+    parser.add_argument('--route-window', type=int, help='Find the most similar document to only this many of the last sentences, so the model follows the topic of the recent text.')
+    parser.add_argument('--route-decay', type=float, help='Find the most similar document with the counts of the older sentences multiplied by this factor (between 0 and 1) for every new sentence. Can\'t be used with --route-window.')
+    parser.add_argument('--no-token-cache', action='store_true', help='Tokenize every corpus file when the models are created or updated, instead of reading the files that were already tokenized from "model/token_cache".')
+    parser.add_argument('--shared-store', action='store_true', help='Store the new document models in one n-gram table, where the "ALL" model is the total of the documents instead of a copy of all their counts.')
+    parser.add_argument('--compact', action='store_true', help='Keep the counts and the top words tables of the loaded models in compact NumPy arrays, so more models fit in memory.')
+    
+    arguments = parser.parse_args()
+    
+    if arguments.route_window is not None and arguments.route_decay is not None:
+        parser.error('Use either --route-window or --route-decay, not both.')
+    if arguments.route_window is not None and arguments.route_window < 1:
+        parser.error('--route-window must be at least 1.')
+    if arguments.route_decay is not None and not 0 < arguments.route_decay <= 1:
+        parser.error('--route-decay must be more than 0 and at most 1.')
+    
+    return arguments
 
+def get_pruning(arguments):
+    """
+    Returns a dict() with the arguments of N_Gram_And_TF_IDF_Models.prune_models(), or None if the models shouldn't be pruned.
+    """
+    if arguments.min_counts is None and arguments.max_vocabulary is None and arguments.min_tf_idf_count is None:
+        return None
+    
+    return {
+        'min_counts': tuple(arguments.min_counts or (1, 1, 1)),
+        'max_vocabulary_size': arguments.max_vocabulary,
+        'min_tf_idf_count': arguments.min_tf_idf_count or 1,
+    }
 
 def main():
     START_SYMBOL = "<*>"
     END_SYMBOL = "<STOP>"
     ALL_MODEL_NAME = "ALL"
     
-    n_gram_tf_idf_models = N_Gram_And_TF_IDF_Models(START_SYMBOL=START_SYMBOL, END_SYMBOL=END_SYMBOL, ALL_MODEL_NAME=ALL_MODEL_NAME)
+    # Max number of document models kept in memory when the models are loaded from the "model" folder. ALL_MODEL_NAME is always kept.
+    MAX_LOADED_MODELS = 3
+    
+    arguments = get_arguments()
+    if arguments.batch:
+        predict_batch(arguments, START_SYMBOL, END_SYMBOL, ALL_MODEL_NAME, MAX_LOADED_MODELS)
+        return
+    
+    # How the new models are pruned, or None
+    pruning = get_pruning(arguments)
+    
+    n_gram_tf_idf_models = N_Gram_And_TF_IDF_Models(START_SYMBOL=START_SYMBOL, END_SYMBOL=END_SYMBOL, ALL_MODEL_NAME=ALL_MODEL_NAME, use_token_cache=not arguments.no_token_cache)
     all_trigram_models = None
     df = None
     
     # Check if the user wants to get older n-gram models and TF-IDF models from the "model" folder
     get_all_models_from_model = input('\n\tDo you get all models from the "model" folder? (Y/N): ')
     if get_all_models_from_model == 'Y' or get_all_models_from_model == 'y':
-        all_trigram_models, df = n_gram_tf_idf_models.get_models_from_models_folder()
+        all_trigram_models, df = n_gram_tf_idf_models.get_models_from_models_folder(lazy=True, max_loaded_models=MAX_LOADED_MODELS, compact=arguments.compact)
+    
+    # Check if the user wants to update the models in the "model" folder with only the added, changed, or removed files in the "corpus" folder
+    update_models_from_corpus = input('\n\tDo you want to update the models in the "model" folder with the changes in the "corpus" folder? (Y/N): ')
+    if update_models_from_corpus == 'Y' or update_models_from_corpus == 'y':
+        all_trigram_models, df = n_gram_tf_idf_models.update_models_from_corpus(pruning=pruning, quantization_bits=arguments.quantize_bits)
     
     # Check if user wants to get create new n-gram models and TF-IDF models from the corpus
     get_all_sentences_from_corpus = input('\n\tDo you want to create new models from the "corpus" folder? (Y/N): ')
     if get_all_sentences_from_corpus == 'Y' or get_all_sentences_from_corpus == 'y':
-        all_trigram_models, df = n_gram_tf_idf_models.create_models_from_corpus()
+        # Count the corpus files in worker processes when there is more than one CPU
+        all_trigram_models, df = n_gram_tf_idf_models.create_models_from_corpus(parallel=(cpu_count() or 1) > 1, shared_store=arguments.shared_store)
         
         # Fix N-Grams models by adding "START_SYMBOL START_SYMBOL" and "START_SYMBOL" to the bigram count and unigram count based on how many END_SYMBOL are in the unigram count.
         all_trigram_models = n_gram_tf_idf_models.fix_n_grams_model()
+        
+        # Remove the rare n-grams and words, and print how much smaller the models are
+        if pruning is not None:
+            n_gram_tf_idf_models.prune_models(**pruning)
     
      
     # If there is no n-gram and TF-IDF models than return.
@@ -109,11 +191,11 @@ def main():
     if get_all_sentences_from_corpus == 'Y' or get_all_sentences_from_corpus == 'y':
         save_update_models = input('\n\tDo you want to save the updated models to the "model" folder? (Y/N): ')
         if save_update_models == 'Y' or save_update_models == 'y':
-            n_gram_tf_idf_models.save_models_to_files()
+            n_gram_tf_idf_models.save_models_to_files(quantization_bits=arguments.quantize_bits)
 
     
     # Get user input and display the next word based on the most similar document.  
-    predict_next_work(all_trigram_models, df, START_SYMBOL, END_SYMBOL, ALL_MODEL_NAME)
+    predict_next_work(all_trigram_models, df, START_SYMBOL, END_SYMBOL, ALL_MODEL_NAME, arguments.route_window, arguments.route_decay)
     
     
 if __name__ == '__main__':
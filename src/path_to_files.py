@@ -6,8 +6,8 @@ Return the paths to the files in the model or corpus folder.
 #!  - Instead of showing missing_folder_or_file_msg, create the folder/file for the user. 
 """
 
-from os.path import isdir, isfile, join
-from os import listdir, remove
+from os.path import basename, isdir, isfile, join, splitext
+from os import listdir, makedirs, remove
 
 class Path_To_Files:
     def __init__(self) -> None:
@@ -25,6 +25,13 @@ class Path_To_Files:
         # Keys are the type of model it is. Values is the path to file.
         self.all_models_with_paths = {}
         
+        # Extension of the top words table files saved next to the trigram models
+        self.top_words_extension = '.top_words'
+        
+        # Extensions of the txt and binary trigram model files
+        self.text_model_extension = '.txt'
+        self.binary_model_extension = '.bin'
+        
     def missing_folder_or_file_msg(self, folder_name, folder_path, type_of_dir):            
         error_msg = f'\n\tMissing "{folder_name}" {type_of_dir}. \n\tMake sure {type_of_dir} is in the path "\{folder_path}" from "auto_complete_and_TF_IDF.py" file'
         
@@ -72,62 +79,77 @@ class Path_To_Files:
         
             self.all_files_path_in_document = []
             
-    def get_output_file_paths_to_new_models(self, all_trigram_models, all_trigram_models_name='all_trigram_models', document_frequency_model_name='document_frequency_model.txt', bag_and_count_model_name="bag_model.txt"):
+    def get_output_file_paths_to_new_models(self, all_trigram_models, all_trigram_models_name='all_trigram_models', document_frequency_model_name='document_frequency_model.txt', bag_and_count_model_name="bag_model.txt", binary=False, remove_old_models=True):
         """
         Takes a dict() with document names as the keys. Also takes optional arguments for trigram, document_frequency, and bag_and_count models folder and file names.
+        If binary is True the trigram models output paths are binary files, otherwise txt files.
+        If remove_old_models is False only the files of the models in all_trigram_models are removed, the other models in the folder are kept.
         
         Returns a dict() where the keys are the optional arguments and values are the outpath path to it's respective model.
         For all_trigram_models_name the values is a list with all the files output path. 
+        The "model" folder and its trigram and TF-IDF folders are created if they don't exist, so no old model is removed without a path to save the new one.
         """
         
         model_directory_path = 'model'
-        if isdir(model_directory_path):
-            # Updates the output file paths for all the trigram models
-            self.get_new_trigram_models_output_paths(model_directory_path, all_trigram_models, all_trigram_models_name)
-            
-            # Updates the output files path for the TF-IDF models.
-            self.get_new_TF__IDF_models_output_paths(model_directory_path, document_frequency_model_name, bag_and_count_model_name)
-        else:
-            self.missing_folder_or_file_msg('model', model_directory_path, "folder")
+        
+        # "all_trigram_models" isn't in git, so it's missing in a fresh checkout
+        makedirs(join(model_directory_path, all_trigram_models_name), exist_ok=True)
+        makedirs(join(model_directory_path, 'tf_idf'), exist_ok=True)
+        
+        # Updates the output file paths for all the trigram models
+        self.get_new_trigram_models_output_paths(model_directory_path, all_trigram_models, all_trigram_models_name, binary=binary, remove_old_models=remove_old_models)
+        
+        # Updates the output files path for the TF-IDF models.
+        self.get_new_TF__IDF_models_output_paths(model_directory_path, document_frequency_model_name, bag_and_count_model_name)
 
         return self.all_models_with_output_paths
     
-    def get_new_trigram_models_output_paths(self, model_directory_path, all_trigram_models, all_trigram_models_name):
+    def get_new_trigram_models_output_paths(self, model_directory_path, all_trigram_models, all_trigram_models_name, all_top_words_tables_name='all_top_words_tables', binary=False, remove_old_models=True):
         """
         Takes the "model" folder's name. All the trigram_models. Also takes the trigram_models folder name.
         
         Updates self.all_models_with_output_paths with all_trigram_models_name as the keys and the values is a dict() with document name as keys and the values is the files output path.
+        Also updates self.all_models_with_output_paths with all_top_words_tables_name as the keys and the values is a dict() with document name as keys and the values is the top words table output path.
         """
         all_trigram_models_path = join(model_directory_path, all_trigram_models_name)
             
         if isdir(all_trigram_models_path):
-            all_document_txt_path = self.add_trigram_model_output_path(all_trigram_models_path, all_trigram_models)
+            model_extension = self.binary_model_extension if binary else self.text_model_extension
+            
+            all_document_txt_path, all_top_words_path = self.add_trigram_model_output_path(all_trigram_models_path, all_trigram_models, model_extension, remove_old_models)
             
             self.all_models_with_output_paths[all_trigram_models_name] = all_document_txt_path
+            self.all_models_with_output_paths[all_top_words_tables_name] = all_top_words_path
         else:
             self.missing_folder_or_file_msg(all_trigram_models_name, all_trigram_models_path, 'folder')
     
-    def add_trigram_model_output_path(self, trigram_model_path, all_trigram_models):
+    def add_trigram_model_output_path(self, trigram_model_path, all_trigram_models, model_extension='.txt', remove_old_models=True):
         """
         Takes the trigram_model_path so far and takes all_trigram_models to get the names of all trigram models.
-        Loop through all trigram models and create a path to save the models as txt file.
+        Loop through all trigram models and create a path to save the models as a "model_extension" file and a path to save the top words table next to it.
         """
         # Removes all pre-existing models
-        for file in listdir(trigram_model_path):
-            remove_model_file_path = join(trigram_model_path, file)
-            remove(remove_model_file_path)
+        if remove_old_models:
+            for file in listdir(trigram_model_path):
+                remove_model_file_path = join(trigram_model_path, file)
+                remove(remove_model_file_path)
         
         all_document_txt_path = {}
+        all_top_words_path = {}
         
         # Goes through all the trigram models and gets the models name. Creates the outfile path.
         for document_name in all_trigram_models:
-            trigram_model_file_path = join(trigram_model_path, f'{document_name}.txt')
+            trigram_model_file_path = join(trigram_model_path, f'{document_name}{model_extension}')
             
             if isfile(trigram_model_file_path): remove(trigram_model_file_path)
             
+            # Remove the file of the same model in the other format so the old model isn't loaded
+            self.remove_trigram_model_files([document_name], trigram_model_path, keep_extension=model_extension)
+            
             all_document_txt_path[document_name] = (trigram_model_file_path)
+            all_top_words_path[document_name] = join(trigram_model_path, f'{document_name}{self.top_words_extension}')
         
-        return all_document_txt_path
+        return all_document_txt_path, all_top_words_path
             
     def get_new_TF__IDF_models_output_paths(self, model_directory_path, document_frequency_model_name, bag_and_count_model_name):
         """
@@ -182,21 +204,34 @@ class Path_To_Files:
         
         return self.all_models_with_paths
             
-    def add_trigram_model_from_model(self, models_directory_path, all_trigram_models_name):
+    def add_trigram_model_from_model(self, models_directory_path, all_trigram_models_name, all_top_words_tables_name='all_top_words_tables'):
         """
         Takes the path so far and takes the name for the trigram model folder.
-        Gets the trigram models files path from the "models" folder.
+        Gets the trigram models files path and the top words tables files path from the "models" folder.
         """
         trigram_model_paths = join(models_directory_path, all_trigram_models_name)
         
         if isdir(trigram_model_paths):
-            all_trigram_model_files = listdir(trigram_model_paths)
+            all_files = listdir(trigram_model_paths)
+            
+            # Top words tables are saved next to the trigram models
+            all_top_words_table_files = [file for file in all_files if file.endswith(self.top_words_extension)]
+            all_trigram_model_files = [file for file in all_files if not file.endswith(self.top_words_extension)]
+            
+            # If a model has a binary file and a txt file, only use the binary file
+            binary_model_names = {splitext(file)[0] for file in all_trigram_model_files if file.endswith(self.binary_model_extension)}
+            all_trigram_model_files = [file for file in all_trigram_model_files if file.endswith(self.binary_model_extension) or splitext(file)[0] not in binary_model_names]
             
             all_models_file_path = self.add_trigram_model_paths(trigram_model_paths, all_trigram_model_files)
             
             # Check if there was any models
             if all_models_file_path:
                 self.all_models_with_paths[all_trigram_models_name] = all_models_file_path
+            
+            all_tables_file_path = self.add_trigram_model_paths(trigram_model_paths, all_top_words_table_files)
+            
+            if all_tables_file_path:
+                self.all_models_with_paths[all_top_words_tables_name] = all_tables_file_path
         else:
             self.missing_folder_or_file_msg(all_trigram_models_name, trigram_model_paths, 'folder')
     
@@ -240,4 +275,40 @@ class Path_To_Files:
                 self.all_models_with_paths[document_frequency_model_name] = join(tf_idf_model_paths, document_frequency_model_name)
             else:
                 self.all_models_with_paths[bag_and_count_model_name] = join(tf_idf_model_paths, bag_and_count_model_name)
+    
+    def remove_trigram_model_files(self, model_names, trigram_model_path=join('model', 'all_trigram_models'), keep_extension=None):
+        """
+        Removes the txt, binary, and top words table files of the models in model_names. Files with keep_extension aren't removed.
+        """
+        for model_name in model_names:
+            for extension in (self.text_model_extension, self.binary_model_extension, self.top_words_extension):
+                if extension == keep_extension: continue
+                
+                model_file_path = join(trigram_model_path, f'{model_name}{extension}')
+                
+                if isfile(model_file_path): remove(model_file_path)
+    
+    def get_manifest_path(self, manifest_name='manifest.txt'):
+        """
+        Returns the path to the corpus manifest in the "model" folder.
+        """
+        return join('model', manifest_name)
+    
+    def get_token_cache_path(self, token_cache_name='token_cache'):
+        """
+        Returns the path to the folder of the tokenized corpus files in the "model" folder.
+        """
+        return join('model', token_cache_name)
+    
+    def get_binary_model_path(self, text_model_path):
+        """
+        Takes the path to a txt trigram model. Returns the path to the binary file of the same model.
+        """
+        return splitext(text_model_path)[0] + self.binary_model_extension
+    
+    def get_model_name_from_path(self, file_path):
+        """
+        Takes the path to a trigram model or a top words table. Returns the name of the model, which is the file name without the extension.
+        """
+        return splitext(basename(file_path))[0]
                       
\ No newline at end of file
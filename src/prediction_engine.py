@@ -0,0 +1,387 @@
+'''
+Predicts the next words without the input() loop of main.py. The predictions are returned as lists of (word, probability) instead of printed.
+A batch of requests can be predicted at once, for example from a JSONL file where every line is one request. The loaded models, linear interpolations, and TF-IDF indexes are reused by every request.
+request example = {"id": 1, "text": "The virus is"}                             predicts after the last 2 words of the text. Uses the most similar document to the finished sentences
+request example = {"id": 2, "context": ["virus", "is"], "model": "ALL", "top": 5}   predicts after "virus is" with the "ALL" model
+request example = {"id": 3, "text": "The virus is", "prefix": "sp"}               only predicts the words that start with "sp", for a word the user is still typing
+result example = {"id": 1, "model": "Coronavirus", "predictions": [["a", 0.12], ["the", 0.1], ["not", 0.05]]}
+
+Prediction_Engine only has the shared models, which aren't changed after they are loaded, so one engine can be used by many threads at the same time.
+The state of one user, like the text so far and the model of the most similar document, is kept in an Autocomplete_Session. Every user gets their own session, and all the sessions use the same engine.
+The input() loop of main.py also uses an Autocomplete_Session, and Auto_Complete_And_TF_IDF only prints its predictions.
+'''
+
+import json
+
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from io import StringIO
+from itertools import islice
+from threading import Lock
+
+from auto_complete_and_TF_IDF import N_Gram_And_TF_IDF_Models
+
+from N_Gram_Model import User_Sentences, Lazy_Trigram_Models, Calculate_Linear_Interpolation
+
+from TF_IDF import Running_Query_Counts
+
+# Prediction_Engine used by a worker process. Worker processes started with fork already have the engine of the main process.
+worker_engine = None
+
+class Prediction_Engine:
+    def __init__(self, all_trigram_models, df, START_SYMBOL="<*>", END_SYMBOL="<STOP>", ALL_MODEL_NAME="ALL", show_top=3) -> None:
+        # Class variables
+        self.START_SYMBOL = START_SYMBOL
+        self.END_SYMBOL = END_SYMBOL
+        self.ALL_MODEL_NAME = ALL_MODEL_NAME
+        
+        # How many words are predicted when a request doesn't say
+        self.show_top = show_top
+        
+        # The n-gram and TF-IDF models. They aren't changed by the predictions.
+        self.all_trigram_models = all_trigram_models
+        self.df = df
+        
+        # Keys are model names and values are (trigram model, Calculate_Linear_Interpolation of the model). The linear interpolations are shared by all the threads.
+        self.all_linear_interpolations = dict()
+        
+        # Only one thread at a time creates linear interpolations. Getting one that was already created doesn't take the lock.
+        self.lock = Lock()
+    
+    def get_linear_interpolation(self, model_name):
+        """
+        Returns the Calculate_Linear_Interpolation of the model. It's only created once for every loaded model.
+        The successor index and the prefix index are built before the linear interpolation is shared, so the threads only read it.
+        """
+        trigram_model = self.all_trigram_models[model_name]
+        
+        trigram_model_and_interpolation = self.all_linear_interpolations.get(model_name)
+        if trigram_model_and_interpolation is not None and trigram_model_and_interpolation[0] is trigram_model:
+            return trigram_model_and_interpolation[1]
+        
+        with self.lock:
+            # Another thread may have created the linear interpolation while this thread was waiting
+            trigram_model_and_interpolation = self.all_linear_interpolations.get(model_name)
+            if trigram_model_and_interpolation is not None and trigram_model_and_interpolation[0] is trigram_model:
+                return trigram_model_and_interpolation[1]
+            
+            trigram_model_all_info = trigram_model.get_model_information()
+            linear_interpolation = Calculate_Linear_Interpolation(trigram_model_all_info[1], trigram_model_all_info[2], trigram_model_all_info[3], trigram_model_all_info[4], self.END_SYMBOL, self.START_SYMBOL, trigram_model.get_successor_index(), trigram_model.top_words_table, trigram_model.get_prefix_index(), vocabulary=trigram_model_all_info[5])
+            
+            self.all_linear_interpolations[model_name] = (trigram_model, linear_interpolation)
+            
+            # Don't keep the models that were removed from memory by Lazy_Trigram_Models
+            if isinstance(self.all_trigram_models, Lazy_Trigram_Models):
+                for other_model_name in list(self.all_linear_interpolations):
+                    if not self.all_trigram_models.is_loaded(other_model_name):
+                        self.all_linear_interpolations.pop(other_model_name, None)
+        
+        return linear_interpolation
+    
+    def predict_next_words(self, word2, word1, model_name=None, show_top=None):
+        """
+        Returns a list of (word, probability) with the "show_top" most likely words after "word2 word1" in the model.
+        """
+        if model_name is None:
+            model_name = self.ALL_MODEL_NAME
+        
+        if show_top is None:
+            show_top = self.show_top
+        
+        return self.get_linear_interpolation(model_name).get_top_words(show_top, word2, word1)
+    
+    def complete_word(self, word2, word1, prefix, model_name=None, show_top=None):
+        """
+        Returns a list of (word, probability) with the "show_top" most likely words after "word2 word1" in the model that start with the prefix.
+        """
+        if model_name is None:
+            model_name = self.ALL_MODEL_NAME
+        
+        if show_top is None:
+            show_top = self.show_top
+        
+        return self.get_linear_interpolation(model_name).get_top_words_with_prefix(show_top, word2, word1, prefix)
+    
+    def split_user_text(self, user_text):
+        """
+        Takes the user's text. Returns a 2d list of the finished sentences, with the END_SYMBOL, and a list with the words of the unfinished sentence.
+        """
+        user_sentences = User_Sentences(self.END_SYMBOL)
+        user_sentences.add_text(user_text)
+        
+        return user_sentences.get_finished_sentences(), user_sentences.get_open_sentence()
+    
+    def get_context(self, sentence):
+        """
+        Takes the words of the unfinished sentence, or of a context. Returns the last 2 words, where the start of the sentence is START_SYMBOL.
+        """
+        context = [self.START_SYMBOL, self.START_SYMBOL] + sentence[-2:]
+        
+        return context[-2], context[-1]
+    
+    def predict(self, user_text, model_name=None, show_top=None):
+        """
+        Takes the user's text. Returns the model name and a list of (word, probability) with the most likely next words.
+        If model_name isn't given, uses the most similar document to the finished sentences, or the ALL_MODEL_NAME model if no sentence is finished.
+        """
+        all_sentences, sentence = self.split_user_text(user_text)
+        
+        if model_name is None:
+            model_name = self.find_most_similar_model(all_sentences)
+        
+        word2, word1 = self.get_context(sentence)
+        
+        return model_name, self.predict_next_words(word2, word1, model_name, show_top)
+    
+    def create_session(self, show_top=None, window_size=None, decay=None):
+        """
+        Returns a new Autocomplete_Session for one user that uses this engine.
+        window_size and decay are used to find the most similar document to the recent sentences, see Running_Query_Counts.
+        """
+        return Autocomplete_Session(self, show_top, window_size, decay)
+    
+    def get_word_counts(self, all_sentences):
+        """
+        Takes a 2d list of sentences. Returns a dict where keys are the words and values are how many times they appear, the same as the unigram count of a Trigram_Model with the sentences.
+        """
+        word_counts = {}
+        
+        for sentence in all_sentences:
+            for word in sentence:
+                word_counts[word] = word_counts.get(word, 0) + 1
+        
+        return word_counts
+    
+    def find_most_similar_model(self, all_sentences):
+        """
+        Takes the finished sentences. Returns the model name of the most similar document, or ALL_MODEL_NAME if there aren't any sentences.
+        Only the words in the sentences are scored against the precomputed TF-IDF of the documents. The Documents_Frequency isn't changed.
+        """
+        if not all_sentences: return self.ALL_MODEL_NAME
+        
+        query_counts = self.df.get_query_counts(self.get_word_counts(all_sentences))
+        
+        return self.df.get_tf_idf_index().find_most_similar_document(query_counts) or self.ALL_MODEL_NAME
+    
+    def find_most_similar_models(self, all_user_texts, top_k=3):
+        """
+        Takes a list of user texts. Scores all the texts at once with the Document_Matrix of the Documents_Frequency. The Documents_Frequency isn't changed.
+        Returns a list with one (model name of the most similar document, [(model name, similarity)]) tuple for every text, where the list has the top "top_k" documents.
+        """
+        all_query_counts = []
+        for user_text in all_user_texts:
+            user_sentences = User_Sentences(self.END_SYMBOL)
+            user_sentences.add_text(user_text)
+            
+            all_query_counts.append(self.df.get_query_counts(self.get_word_counts(user_sentences.sentences)))
+        
+        return self.df.get_document_matrix().find_most_similar_documents(all_query_counts, top_k)
+    
+    def predict_batch(self, all_requests):
+        """
+        Takes a list of requests. Returns a list with the result of every request in the same order.
+        The texts that need the most similar document are scored together with the Document_Matrix, and the requests are predicted model by model so every lazy model is loaded once.
+        """
+        all_results = [None] * len(all_requests)
+        all_contexts = [None] * len(all_requests)
+        all_model_names = [None] * len(all_requests)
+        
+        # Requests that need the most similar document
+        routed_requests = []
+        all_query_counts = []
+        
+        for index, request in enumerate(all_requests):
+            if 'context' in request:
+                all_contexts[index] = self.get_context(list(request['context']))
+                all_model_names[index] = request.get('model', self.ALL_MODEL_NAME)
+                continue
+            
+            all_sentences, sentence = self.split_user_text(request.get('text', ''))
+            all_contexts[index] = self.get_context(sentence)
+            
+            if 'model' in request:
+                all_model_names[index] = request['model']
+            elif not all_sentences:
+                all_model_names[index] = self.ALL_MODEL_NAME
+            else:
+                routed_requests.append(index)
+                all_query_counts.append(self.df.get_query_counts(self.get_word_counts(all_sentences)))
+        
+        if routed_requests:
+            all_most_similar = self.df.get_document_matrix().find_most_similar_documents(all_query_counts, top_k=1)
+            
+            for index, (model_name, _) in zip(routed_requests, all_most_similar):
+                all_model_names[index] = model_name or self.ALL_MODEL_NAME
+        
+        # Predict the requests of one model after another
+        for index in sorted(range(len(all_requests)), key=lambda index: str(all_model_names[index])):
+            request = all_requests[index]
+            model_name = all_model_names[index]
+            
+            result = {'id': request.get('id'), 'model': model_name}
+            
+            if model_name not in self.all_trigram_models:
+                result['error'] = f'Cant find "{model_name}" model.'
+            else:
+                word2, word1 = all_contexts[index]
+                
+                if request.get('prefix'):
+                    top_words = self.complete_word(word2, word1, request['prefix'], model_name, request.get('top'))
+                else:
+                    top_words = self.predict_next_words(word2, word1, model_name, request.get('top'))
+                
+                result['predictions'] = [[word, probability] for word, probability in top_words]
+            
+            all_results[index] = result
+        
+        return all_results
+    
+    def predict_jsonl(self, input_file_path, output_file_path, workers=None, batch_size=1000):
+        """
+        Reads one request from every line of the input JSONL file and writes one result to every line of the output JSONL file, in the same order.
+        The requests are predicted "batch_size" at a time. If workers is given, the batches are predicted in that many worker processes.
+        Returns the number of requests.
+        """
+        global worker_engine
+        
+        request_count = 0
+        
+        with open(input_file_path) as input_file, open(output_file_path, 'w') as output_file:
+            all_batches = iter_request_batches(input_file, batch_size)
+            
+            if workers is None:
+                all_batch_results = map(self.predict_batch, all_batches)
+                
+                request_count = write_results(output_file, all_batch_results)
+            else:
+                # Worker processes started with fork use this engine, others load the models from the "model" folder
+                worker_engine = self
+                
+                with ProcessPoolExecutor(max_workers=workers, initializer=init_prediction_worker, initargs=(self.START_SYMBOL, self.END_SYMBOL, self.ALL_MODEL_NAME, self.show_top)) as executor:
+                    all_batch_results = executor.map(predict_batch_in_worker, all_batches)
+                    
+                    request_count = write_results(output_file, all_batch_results)
+        
+        print(f'\t\t- Predicted {request_count} requests from "{input_file_path}" to "{output_file_path}"')
+        
+        return request_count
+
+class Autocomplete_Session:
+    """
+    The state of one user. Only the user's text and the name of the current model are stored here, the models are in the shared Prediction_Engine.
+    A session is used by one thread at a time, but many sessions can predict at the same time without locks.
+    """
+    def __init__(self, prediction_engine, show_top=None, window_size=None, decay=None) -> None:
+        self.prediction_engine = prediction_engine
+        
+        # How many words are predicted. None means the engine's show_top.
+        self.show_top = show_top
+        
+        # Sentences of the user so far. Every input only splits the new words.
+        self.user_sentences = User_Sentences(prediction_engine.END_SYMBOL)
+        
+        # Word counts of the finished sentences. Every finished sentence is only added once, so routing doesn't get slower as the session grows.
+        self.running_query_counts = Running_Query_Counts(prediction_engine.df, window_size, decay)
+        
+        # Model of the most similar document to the finished sentences
+        self.model_name = prediction_engine.ALL_MODEL_NAME
+    
+    def add_text(self, user_text):
+        """
+        Adds the next words of the user. Only the new words are split into sentences. When a sentence is finished, changes the model to the most similar document to the finished sentences.
+        Returns the model name.
+        """
+        finished_count = self.user_sentences.add_text(user_text)
+        
+        if finished_count:
+            all_finished = self.user_sentences.get_finished_count()
+            self.running_query_counts.add_sentences(self.user_sentences.sentences[all_finished - finished_count:all_finished])
+            
+            self.model_name = self.running_query_counts.find_most_similar_document() or self.prediction_engine.ALL_MODEL_NAME
+        
+        return self.model_name
+    
+    def route(self):
+        """
+        Changes the model to the most similar document to the finished sentences and the unfinished sentence, without waiting for the sentence to end.
+        Returns the model name.
+        """
+        self.model_name = self.running_query_counts.find_most_similar_document(self.user_sentences.get_open_sentence()) or self.prediction_engine.ALL_MODEL_NAME
+        
+        return self.model_name
+    
+    def predict_next_words(self, show_top=None):
+        """
+        Returns a list of (word, probability) with the most likely words after the last 2 words of the unfinished sentence, with the current model.
+        """
+        if show_top is None:
+            show_top = self.show_top
+        
+        word2, word1 = self.prediction_engine.get_context(self.user_sentences.get_open_sentence())
+        
+        return self.prediction_engine.predict_next_words(word2, word1, self.model_name, show_top)
+    
+    def complete_word(self, prefix, show_top=None):
+        """
+        Takes the start of the word the user is typing. Returns a list of (word, probability) with the most likely next words that start with it, with the current model.
+        """
+        if show_top is None:
+            show_top = self.show_top
+        
+        word2, word1 = self.prediction_engine.get_context(self.user_sentences.get_open_sentence())
+        
+        return self.prediction_engine.complete_word(word2, word1, prefix, self.model_name, show_top)
+    
+    def reset(self):
+        """
+        Removes the user's text and goes back to the ALL_MODEL_NAME model.
+        """
+        self.user_sentences.reset()
+        self.running_query_counts.reset()
+        self.model_name = self.prediction_engine.ALL_MODEL_NAME
+
+def iter_request_batches(input_file, batch_size):
+    """
+    Yields lists with up to "batch_size" requests from the lines of the JSONL file. Empty lines are skipped.
+    """
+    all_requests = (json.loads(line) for line in input_file if line.strip())
+    
+    while True:
+        batch = list(islice(all_requests, batch_size))
+        if not batch: return
+        
+        yield batch
+
+def write_results(output_file, all_batch_results):
+    """
+    Writes every result as one line of JSON. Returns the number of results.
+    """
+    result_count = 0
+    for batch_results in all_batch_results:
+        for result in batch_results:
+            output_file.write(json.dumps(result) + '\n')
+        
+        result_count += len(batch_results)
+    
+    return result_count
+
+def init_prediction_worker(START_SYMBOL, END_SYMBOL, ALL_MODEL_NAME, show_top):
+    """
+    Creates the Prediction_Engine of a worker process with the models in the "model" folder. Worker processes started with fork already have the engine.
+    """
+    global worker_engine
+    
+    if worker_engine is not None: return
+    
+    n_gram_tf_idf_models = N_Gram_And_TF_IDF_Models(START_SYMBOL=START_SYMBOL, END_SYMBOL=END_SYMBOL, ALL_MODEL_NAME=ALL_MODEL_NAME)
+    
+    with redirect_stdout(StringIO()):
+        all_trigram_models, df = n_gram_tf_idf_models.get_models_from_models_folder(lazy=True)
+    
+    worker_engine = Prediction_Engine(all_trigram_models, df, START_SYMBOL, END_SYMBOL, ALL_MODEL_NAME, show_top)
+
+def predict_batch_in_worker(all_requests):
+    """
+    Predicts a batch of requests with the worker process's engine. Must be a module function so it can be sent to a worker process.
+    """
+    return worker_engine.predict_batch(all_requests)
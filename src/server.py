@@ -0,0 +1,271 @@
+"""
+HTTP server that loads the models once and serves many users from one process. Uses asyncio, so many connections are handled at the same time, and the predictions run in a pool of threads so the event loop never waits for them. All the threads share the same Prediction_Engine.
+Requests sent one after another on the same connection (pipelining) are all started right away and their responses are sent in the same order.
+Every request is timed with the instrumentation metrics, which can be read from "/metrics".
+
+Endpoints:
+    GET  /health             {"status": "ok"}
+    POST /predict            {"text": "The virus is"} or {"context": ["virus", "is"], "model": "ALL", "top": 5}, or a list of them. Add "prefix": "sp" to complete a partly typed word.
+                             -> {"id": null, "model": "ALL", "predictions": [["now", 0.16], ["a", 0.12], ["part", 0.11]]}, or a list of them
+    POST /route              {"texts": ["The virus is spreading."], "top_k": 3}
+                             -> {"results": [{"model": "Coronavirus", "scores": [["Coronavirus", 0.2], ["Globel_Web", 0.1]]}]}
+    GET  /metrics            the metrics in the Prometheus text format
+
+Run from the "src" folder:
+    python server.py --port 8000 --threads 8
+    python server.py --port 8000 --max-loaded-models 50 --compact
+    python server.py --unix /tmp/autocomplete.sock
+"""
+
+import asyncio
+import json
+
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+from auto_complete_and_TF_IDF import N_Gram_And_TF_IDF_Models
+
+from prediction_engine import Prediction_Engine
+
+from instrumentation import metrics
+
+# Requests with a bigger body are refused
+MAX_BODY_SIZE = 1 << 20
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+class Prediction_Server:
+    def __init__(self, prediction_engine, executor_threads=4) -> None:
+        # Prediction_Engine with the loaded models. Only used in the executor.
+        self.prediction_engine = prediction_engine
+        
+        # Runs the predictions so the event loop isn't blocked. The predictions only read the models and the linear interpolations, loading a model and creating its linear interpolation take the locks of Lazy_Trigram_Models and Prediction_Engine.
+        self.executor = ThreadPoolExecutor(max_workers=executor_threads)
+        
+        # Keys are (method, path) and values are the methods that return the response for the request body
+        self.all_routes = {
+            ('GET', '/health'): self.health,
+            ('POST', '/predict'): self.predict,
+            ('POST', '/route'): self.route,
+            ('GET', '/metrics'): self.get_metrics,
+        }
+    
+    async def handle_connection(self, reader, writer):
+        """
+        Reads the requests of one connection. Every request is started as soon as it's read, and the responses are written in the same order by write_responses().
+        """
+        all_responses = asyncio.Queue()
+        response_writer = asyncio.ensure_future(self.write_responses(all_responses, writer))
+        
+        try:
+            while True:
+                request = await self.read_request(reader)
+                if request is None: break
+                
+                method, path, close_connection, body, error_status = request
+                
+                if error_status is not None:
+                    await all_responses.put(asyncio.ensure_future(self.error_response(error_status)))
+                    break
+                
+                await all_responses.put(asyncio.ensure_future(self.handle_request(method, path, body)))
+                
+                if close_connection: break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            # No more requests. write_responses() stops after the responses that were already started.
+            await all_responses.put(None)
+            await response_writer
+    
+    async def write_responses(self, all_responses, writer):
+        """
+        Writes the response of every request in the same order as the requests, then closes the connection.
+        """
+        try:
+            while True:
+                response = await all_responses.get()
+                if response is None: break
+                
+                writer.write(await response)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+    
+    async def read_request(self, reader):
+        """
+        Reads one HTTP request. Returns (method, path, close connection after the request, body, error status), or None when the connection was closed.
+        """
+        request_line = await reader.readline()
+        if not request_line: return None
+        
+        parts = request_line.decode('latin-1').split()
+        if len(parts) != 3:
+            return None, None, True, b'', 400
+        
+        method, path, version = parts
+        
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''): break
+            
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        
+        # HTTP/1.1 keeps the connection open unless the client closes it, HTTP/1.0 closes it unless the client keeps it open
+        connection = headers.get('connection', '').lower()
+        close_connection = connection == 'close' or (version == 'HTTP/1.0' and connection != 'keep-alive')
+        
+        try:
+            content_length = int(headers.get('content-length', 0))
+        except ValueError:
+            return method, path, True, b'', 400
+        
+        if content_length > MAX_BODY_SIZE:
+            return method, path, True, b'', 413
+        
+        body = await reader.readexactly(content_length) if content_length > 0 else b''
+        
+        return method, path.split('?')[0], close_connection, body, None
+    
+    async def handle_request(self, method, path, body):
+        """
+        Runs the endpoint of the request and returns the HTTP response as bytes. The latency of every request is added to the metrics.
+        """
+        start = perf_counter()
+        
+        endpoint = self.all_routes.get((method, path))
+        if endpoint is None:
+            status = 405 if any(route_path == path for _, route_path in self.all_routes) else 404
+            response = self.get_response(status, {'error': STATUS_TEXT[status]})
+            endpoint_name = 'unknown'
+        else:
+            endpoint_name = endpoint.__name__
+            
+            try:
+                response = await endpoint(body)
+            except (ValueError, KeyError, TypeError) as error:
+                response = self.get_response(400, {'error': str(error)})
+            except Exception as error:
+                response = self.get_response(500, {'error': str(error)})
+        
+        seconds = perf_counter() - start
+        metrics.add('requests')
+        metrics.observe('request_seconds', seconds)
+        metrics.observe(f'{endpoint_name}_request_seconds', seconds)
+        
+        return response
+    
+    async def error_response(self, status):
+        metrics.add('bad_requests')
+        
+        return self.get_response(status, {'error': STATUS_TEXT[status]})
+    
+    async def run_in_executor(self, function, *arguments):
+        """
+        Runs the function in the executor and returns the result, so the event loop can handle other requests at the same time.
+        """
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *arguments)
+    
+    async def health(self, body):
+        return self.get_response(200, {'status': 'ok'})
+    
+    async def predict(self, body):
+        """
+        Predicts one request, or a list of requests, with Prediction_Engine.predict_batch().
+        """
+        request = json.loads(body or b'{}')
+        
+        if isinstance(request, list):
+            return self.get_response(200, await self.run_in_executor(self.prediction_engine.predict_batch, request))
+        
+        all_results = await self.run_in_executor(self.prediction_engine.predict_batch, [request])
+        
+        return self.get_response(200, all_results[0])
+    
+    async def route(self, body):
+        """
+        Finds the most similar documents for every text with Prediction_Engine.find_most_similar_models().
+        """
+        request = json.loads(body or b'{}')
+        
+        all_user_texts = request['texts'] if 'texts' in request else [request['text']]
+        top_k = int(request.get('top_k', 3))
+        
+        all_most_similar = await self.run_in_executor(self.prediction_engine.find_most_similar_models, all_user_texts, top_k)
+        
+        all_results = [{'model': model_name, 'scores': [[name, score] for name, score in scores]} for model_name, scores in all_most_similar]
+        
+        return self.get_response(200, {'results': all_results})
+    
+    async def get_metrics(self, body):
+        return self.get_response(200, metrics.prometheus_text(), content_type='text/plain; version=0.0.4')
+    
+    def get_response(self, status, content, content_type='application/json'):
+        """
+        Returns the HTTP response as bytes. Content that isn't a string is sent as JSON.
+        """
+        if not isinstance(content, str):
+            content = json.dumps(content)
+        
+        body = content.encode()
+        head = f'HTTP/1.1 {status} {STATUS_TEXT[status]}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n\r\n'
+        
+        return head.encode('latin-1') + body
+
+async def serve(prediction_server, host='127.0.0.1', port=8000, unix_path=None):
+    """
+    Serves the requests until the process is stopped. Uses a Unix socket if unix_path is given.
+    """
+    if unix_path is not None:
+        server = await asyncio.start_unix_server(prediction_server.handle_connection, path=unix_path)
+        print(f'\n\tServing on "{unix_path}"')
+    else:
+        server = await asyncio.start_server(prediction_server.handle_connection, host, port)
+        print(f'\n\tServing on http://{host}:{port}')
+    
+    async with server:
+        await server.serve_forever()
+
+def get_arguments():
+    parser = ArgumentParser(description='Serves next word predictions and the most similar documents over HTTP with the models in the "model" folder.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--unix', help='Path to a Unix socket to serve on instead of the host and port.')
+    parser.add_argument('--max-loaded-models', type=int, help='Max number of document models kept in memory. By default all the models that were used are kept.')
+    parser.add_argument('--top', type=int, default=3, help='Number of words predicted for every request that doesn\'t have "top".')
+    parser.add_argument('--threads', type=int, default=4, help='Number of threads that run the predictions at the same time.')
+    parser.add_argument('--compact', action='store_true', help='Keep the counts and the top words tables of the loaded models in compact NumPy arrays, so more models fit in memory.')
+    
+    return parser.parse_args()
+
+def main():
+    START_SYMBOL = "<*>"
+    END_SYMBOL = "<STOP>"
+    ALL_MODEL_NAME = "ALL"
+    
+    arguments = get_arguments()
+    
+    # The models are loaded once and used by every request
+    n_gram_tf_idf_models = N_Gram_And_TF_IDF_Models(START_SYMBOL=START_SYMBOL, END_SYMBOL=END_SYMBOL, ALL_MODEL_NAME=ALL_MODEL_NAME)
+    all_trigram_models, df = n_gram_tf_idf_models.get_models_from_models_folder(lazy=True, max_loaded_models=arguments.max_loaded_models, compact=arguments.compact)
+    
+    if not df or not all_trigram_models:
+        print('\n\t - No n-gram and TF-IDF models found in the "model" folder.')
+        return
+    
+    metrics.enable()
+    
+    prediction_engine = Prediction_Engine(all_trigram_models, df, START_SYMBOL, END_SYMBOL, ALL_MODEL_NAME, show_top=arguments.top)
+    
+    try:
+        asyncio.run(serve(Prediction_Server(prediction_engine, arguments.threads), arguments.host, arguments.port, arguments.unix))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()